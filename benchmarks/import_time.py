@@ -0,0 +1,129 @@
+# ==============================
+# benchmarks/import_time.py
+# ==============================
+# Cold-start import profile for the Streamlit app.
+#
+# Runs `python -X importtime -c "import <module>"` in a fresh interpreter,
+# reports the slowest imports, and fails when:
+#   - the module's cumulative import time exceeds its budget, or
+#   - a heavy dependency that should load lazily (Google SDKs, plotly,
+#     the mic recorder component) is imported eagerly.
+#
+# Usage:
+#   python -m benchmarks.import_time
+#   python -m benchmarks.import_time --module src.pipeline --budget-ms 400
+#   python -m benchmarks.import_time --top 30 --output import_profile.json
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import budget per entry module (milliseconds, best of --repeats)
+IMPORT_BUDGETS_MS = {
+    "streamlit_app": 1000,
+}
+
+# Must not be imported while importing the app (they load on first use)
+EAGER_IMPORT_DENYLIST = [
+    "google.cloud.bigquery",
+    "google.cloud.storage",
+    "google.cloud.documentai",
+    "google.genai",
+    "plotly.express",
+    "streamlit_mic_recorder",
+]
+
+
+# -----------------------------
+# Profiling
+# -----------------------------
+def profile_imports(module):
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Returns:
+        list[dict]: One entry per imported module with 'module',
+            'self_ms' and 'cumulative_ms', in import order.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return entries
+
+
+def total_ms(entries, module):
+    """Cumulative import time of the entry module itself."""
+    for entry in reversed(entries):
+        if entry["module"] == module:
+            return entry["cumulative_ms"]
+    return 0.0
+
+
+def eager_imports(entries, denylist=EAGER_IMPORT_DENYLIST):
+    """Denylisted modules that were actually imported."""
+    imported = {entry["module"] for entry in entries}
+    return [name for name in denylist if name in imported]
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import time report")
+    parser.add_argument("--module", default="streamlit_app", help="Entry module to import")
+    parser.add_argument("--budget-ms", type=float, help="Override the module's import budget")
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh interpreters to run (best is used)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--output", help="Write the profile as JSON")
+    args = parser.parse_args(argv)
+
+    runs = [profile_imports(args.module) for _ in range(args.repeats)]
+    entries = min(runs, key=lambda e: total_ms(e, args.module))
+    total = total_ms(entries, args.module)
+    budget = args.budget_ms or IMPORT_BUDGETS_MS.get(args.module)
+
+    print(f"import {args.module}: {total:.1f} ms" + (f" (budget {budget:.0f} ms)" if budget else ""))
+    print("\nSlowest imports (self time):")
+    for entry in sorted(entries, key=lambda e: e["self_ms"], reverse=True)[:args.top]:
+        print(f"  {entry['self_ms']:>8.1f} ms  {entry['cumulative_ms']:>8.1f} ms cum  {entry['module']}")
+
+    eager = eager_imports(entries)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"module": args.module, "total_ms": total, "budget_ms": budget,
+                       "eager_imports": eager, "imports": entries}, f, indent=2)
+        print(f"\n✅ Profile written to {args.output}")
+
+    failed = False
+    if eager:
+        print(f"\n❌ Imported eagerly (should load on first use): {', '.join(eager)}")
+        failed = True
+    if budget and total > budget:
+        print(f"\n❌ Over budget by {total - budget:.1f} ms")
+        failed = True
+    if not failed:
+        print("\n✅ Within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+# ==============================
+# benchmarks/run_benchmarks.py
+# ==============================
+# Offline benchmark suite for the analysis hot path:
+#   - extract_word_level          (ml_transcribe_result → word arrays)
+#   - compute_speech_metrics      (disfluency detection + summary)
+#   - build_progress_df           (progress dashboard preparation)
+#   - build_analysis_row          (JSON serialization done by
+#                                  insert_analysis_result_with_embedding)
+#
+# No Google Cloud access is needed: inputs come from benchmarks/synthetic.py.
+# Results are written as JSON so runs can be compared between releases.
+#
+# Usage:
+#   python -m benchmarks.run_benchmarks
+#   python -m benchmarks.run_benchmarks --sizes 1000 100000 --density 0.2
+#   python -m benchmarks.run_benchmarks --baseline benchmarks/results/v1.json
+#   python -m benchmarks.run_benchmarks --benchmarks extract_word_level \
+#       --sizes 100 1000 10000 100000 1000000 --rows 4      (scaling sweep)
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.analyze_stammer import extract_word_level, compute_speech_metrics, build_analysis_row
+from streamlit_utils.streamlit_helpers import build_progress_df
+from benchmarks.synthetic import make_transcripts_df, make_progress_df
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+BENCHMARKS = ["extract_word_level", "compute_speech_metrics", "build_analysis_row", "build_progress_df"]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Dimension of gemini-embedding-001 vectors stored with each analysis
+EMBEDDING_DIM = 3072
+
+
+# -----------------------------
+# Timing Helpers
+# -----------------------------
+def time_call(func, repeats):
+    """
+    Run `func` `repeats` times.
+
+    Returns:
+        tuple: (last return value, list of durations in seconds)
+    """
+    durations = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    return result, durations
+
+
+def record(name, words, durations, **extra):
+    """Build one result entry and echo it to stdout."""
+    best = min(durations)
+    entry = {
+        "benchmark": name,
+        "words": words,
+        "best_sec": best,
+        "mean_sec": sum(durations) / len(durations),
+        "repeats": len(durations),
+        "words_per_sec": words / best if best > 0 else None,
+        **extra
+    }
+    print(f"{name:<24} {words:>10,} words {best:>10.4f}s {entry['words_per_sec'] or 0:>14,.0f} words/s")
+    return entry
+
+
+def git_commit():
+    """Current git commit, if the suite runs inside the repo checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+# -----------------------------
+# Suite
+# -----------------------------
+def run_suite(sizes, density=0.1, rows=1, words_per_session=100, repeats=3, benchmarks=None):
+    """
+    Time every hot-path stage at each transcript size.
+
+    Args:
+        sizes (list[int]): Total words per run.
+        density (float): Disfluency density of the synthetic speech.
+        rows (int): Recordings the words are spread across.
+        words_per_session (int): Words per stored session when sizing the
+            progress-dashboard input (sessions = words / words_per_session).
+        repeats (int): Timed repetitions per measurement (best is reported).
+        benchmarks (list[str], optional): Subset of BENCHMARKS to report
+            (default: all).
+
+    Returns:
+        list[dict]: One entry per (benchmark, size).
+    """
+    selected = set(benchmarks or BENCHMARKS)
+    results = []
+    embedding = np.random.default_rng(0).standard_normal(EMBEDDING_DIM).tolist()
+
+    def measure(name, func):
+        # Unselected stages still run once: later stages need their output
+        return time_call(func, repeats if name in selected else 1)
+
+    def add(name, words, durations, **extra):
+        if name in selected:
+            results.append(record(name, words, durations, **extra))
+
+    for size in sizes:
+        transcripts = make_transcripts_df(size, rows=rows, disfluency_density=density)
+
+        words_df, durations = measure("extract_word_level", lambda: extract_word_level(transcripts))
+        add("extract_word_level", len(words_df), durations, rows=rows)
+        if selected == {"extract_word_level"}:
+            continue
+
+        (metrics, analysis), durations = measure("compute_speech_metrics", lambda: compute_speech_metrics(words_df))
+        add(
+            "compute_speech_metrics", len(words_df), durations,
+            detector_timings=analysis.attrs.get("detector_timings", {})
+        )
+
+        result_dict = {
+            "transcript": " ".join(transcripts["transcripts"]),
+            "metrics": metrics,
+            "therapy_plan": "Practice slow reading for 5 minutes daily.",
+            "words_df": analysis,
+        }
+        row, durations = measure("build_analysis_row", lambda: build_analysis_row(result_dict, embedding))
+        add(
+            "build_analysis_row", len(words_df), durations,
+            row_bytes=len(json.dumps(row))
+        )
+
+        sessions = max(size // words_per_session, 1)
+        progress_input = make_progress_df(sessions)
+        _, durations = measure("build_progress_df", lambda: build_progress_df(progress_input))
+        add("build_progress_df", size, durations, sessions=sessions)
+
+    return results
+
+
+def compare(results, baseline_path, tolerance):
+    """
+    Print the slowdown of each benchmark relative to a saved baseline.
+
+    Returns:
+        list[str]: Benchmarks that regressed by more than `tolerance`.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r["benchmark"], r["words"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\nComparison with {baseline_path}:")
+    for r in results:
+        base = baseline.get((r["benchmark"], r["words"]))
+        if not base:
+            continue
+        ratio = r["best_sec"] / base["best_sec"] if base["best_sec"] else float("inf")
+        flag = "  ⚠️ regression" if ratio > 1 + tolerance else ""
+        print(f"{r['benchmark']:<24} {r['words']:>10,} words  x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(f"{r['benchmark']}@{r['words']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline analysis hot-path benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--density", type=float, default=0.1, help="Disfluency density (0-1)")
+    parser.add_argument("--rows", type=int, default=1, help="Recordings to spread the words across")
+    parser.add_argument("--words-per-session", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, help="Subset to run (default: all)")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Previous result JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging")
+    args = parser.parse_args(argv)
+
+    results = run_suite(
+        args.sizes, density=args.density, rows=args.rows,
+        words_per_session=args.words_per_session, repeats=args.repeats, benchmarks=args.benchmarks
+    )
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "config": {
+            "sizes": args.sizes,
+            "density": args.density,
+            "rows": args.rows,
+            "words_per_session": args.words_per_session,
+            "repeats": args.repeats,
+            "benchmarks": args.benchmarks or BENCHMARKS,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"❌ Regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# ==============================
+# benchmarks/synthetic.py
+# ==============================
+# Synthetic Speech-to-Text payloads for offline benchmarks.
+# Produces ml_transcribe_result JSON shaped like the rows that
+# ML.TRANSCRIBE writes to the transcripts table, with a configurable
+# number of words and density of disfluencies.
+
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+VOCAB = [
+    "the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "please",
+    "speak", "slowly", "and", "clearly", "today", "morning", "reading", "practice",
+    "every", "word", "confidence", "library", "session", "breathing", "sentence",
+]
+FILLERS = ["uh", "um", "ah", "er", "hmm"]
+
+# Words per recognition result segment (STT splits long audio into results)
+SEGMENT_WORDS = 25
+
+
+# -----------------------------
+# Word Generation
+# -----------------------------
+def generate_words(n_words, disfluency_density=0.1, seed=0):
+    """
+    Generate (word, start, end) tuples with injected disfluencies.
+
+    Args:
+        n_words (int): Number of words to produce.
+        disfluency_density (float): Probability that a word is a disfluency
+            (filler, repetition, prolongation, part-word repetition or block).
+        seed (int): Random seed.
+
+    Returns:
+        list[tuple[str, float, float]]
+    """
+    rng = random.Random(seed)
+    words = []
+    t = 0.0
+    prev = rng.choice(VOCAB)
+
+    for _ in range(n_words):
+        gap = rng.uniform(0.02, 0.3)
+        word = rng.choice(VOCAB)
+
+        if rng.random() < disfluency_density:
+            kind = rng.randrange(5)
+            if kind == 0:
+                word = rng.choice(FILLERS)
+            elif kind == 1:
+                word = prev
+            elif kind == 2:
+                word = word[0] * 4 + word[1:]
+            elif kind == 3:
+                word = f"{word[0]}-{word[0]}-{word}"
+            else:
+                gap = rng.uniform(1.6, 4.0)
+
+        start = t + gap
+        end = start + rng.uniform(0.12, 0.6)
+        words.append((word, start, end))
+        prev, t = word, end
+
+    return words
+
+
+def make_transcribe_payload(uri, words):
+    """
+    Build an ml_transcribe_result JSON string for (word, start, end) tuples.
+    """
+    results = []
+    for i in range(0, len(words), SEGMENT_WORDS):
+        segment = words[i:i + SEGMENT_WORDS]
+        results.append({
+            "alternatives": [{
+                "transcript": " ".join(w for w, _, _ in segment),
+                "words": [
+                    {"word": w, "start_offset": f"{s:.3f}s", "end_offset": f"{e:.3f}s", "confidence": 0.9}
+                    for w, s, e in segment
+                ]
+            }],
+            "language_code": "en-us"
+        })
+
+    return json.dumps({
+        "results": {uri: {"inline_result": {"transcript": {"results": results}}}}
+    })
+
+
+# -----------------------------
+# Table-shaped Fixtures
+# -----------------------------
+def make_transcripts_df(total_words, rows=1, disfluency_density=0.1, seed=0):
+    """
+    Build a transcripts-table-shaped DataFrame holding `total_words` words
+    spread evenly across `rows` recordings.
+    """
+    per_row = max(total_words // rows, 1)
+    records = []
+    for r in range(rows):
+        uri = f"gs://synthetic/audio/{r:06d}.mp3"
+        words = generate_words(per_row, disfluency_density, seed=seed + r)
+        records.append({
+            "uri": uri,
+            "content_type": "audio/mpeg",
+            "transcripts": " ".join(w for w, _, _ in words),
+            "ml_transcribe_result": make_transcribe_payload(uri, words),
+            "ml_transcribe_status": "",
+        })
+    return pd.DataFrame(records)
+
+
+def make_progress_df(n_sessions, seed=0):
+    """
+    Build a DataFrame shaped like fetch_progress_data's result
+    (run_id, metrics JSON, processed_at).
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    records = []
+    for i in range(n_sessions):
+        total = rng.randint(20, 400)
+        metrics = {
+            "total_words": total,
+            "filler_count": rng.randint(0, total // 10),
+            "repetitions": rng.randint(0, total // 20),
+            "severity_score": round(rng.uniform(0, 0.5), 4),
+        }
+        records.append({
+            "run_id": f"run-{i}",
+            "metrics": json.dumps(metrics),
+            "processed_at": start + timedelta(hours=i),
+        })
+    return pd.DataFrame(records)
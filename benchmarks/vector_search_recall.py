@@ -0,0 +1,295 @@
+# ==============================
+# benchmarks/vector_search_recall.py
+# ==============================
+# Recall@k vs latency for vector search parameters.
+#
+# Embeddings come from an export (.npy, or .npz with an 'embeddings'
+# array; see --export) or are synthetic (clustered, same dimensionality).
+# Held-out rows perturbed with noise are the queries, and exact cosine
+# top-k over the remaining rows is the ground truth.
+#
+# Backends and the parameter each sweeps:
+#   ivf        local IVFIndex (case index)       --nprobe
+#              at --precision float32/float16/int8
+#              (stored as the case index stores it;
+#              reports bytes per row)
+#   bigquery   VECTOR_SEARCH on a call site's    --fractions
+#              table; ground truth is the same
+#              query with use_brute_force
+#
+# The operating point is the cheapest setting whose mean recall@k
+# reaches --target-recall; record it in src/config.py
+# (CASE_INDEX_NPROBE / VECTOR_SEARCH_FRACTION_<SITE>).
+#
+# Usage:
+#   python -m benchmarks.vector_search_recall --rows 200000 --dim 768
+#   python -m benchmarks.vector_search_recall --embeddings cases.npy --k 3
+#   python -m benchmarks.vector_search_recall --export cases --embeddings cases.npy
+#   python -m benchmarks.vector_search_recall --backend bigquery --site documents --k 3
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from src.vector_index import (
+    IVFIndex, PRECISIONS, RESCORE_DTYPES, normalize_rows, quantize_rows, storage_bytes_per_row, top_k_cosine,
+    top_k_rescored
+)
+
+DEFAULT_NPROBE = [1, 2, 4, 8, 16, 32, 64]
+DEFAULT_FRACTIONS = [0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0]
+
+# Unique row id per call site, for comparing VECTOR_SEARCH results
+SITE_ID_EXPRESSIONS = {
+    "documents": "CONCAT(base.uri, ':', base.chunk_id)",
+    "cases": "base.run_id",
+    "courses": "base.course_id",
+}
+
+
+# -----------------------------
+# Data
+# -----------------------------
+def synthetic_embeddings(rows, dim, clusters=None, spread=0.35, seed=0):
+    """
+    Clustered unit vectors (topics with per-row noise), closer to real text
+    embeddings than uniform noise, which makes every index look bad.
+    """
+    rng = np.random.default_rng(seed)
+    clusters = clusters or max(8, int(np.sqrt(rows) / 2))
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    vectors = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, 65536):
+        end = min(rows, start + 65536)
+        vectors[start:end] = centers[labels[start:end]] + spread * rng.normal(size=(end - start, dim))
+    return normalize_rows(vectors)
+
+
+def load_embeddings(path):
+    """Load a .npy matrix or the 'embeddings' array of an .npz file."""
+    if path.endswith(".npz"):
+        with np.load(path, allow_pickle=False) as data:
+            return normalize_rows(data["embeddings"])
+    return normalize_rows(np.load(path, mmap_mode="r"))
+
+
+def export_embeddings(bq_client, site, path, limit=None):
+    """Export a call site's embedding column from BigQuery to a .npy file."""
+    from src.bigquery_utils.vector_indexes import VECTOR_INDEXES
+
+    spec = VECTOR_INDEXES[site]
+    query = f"SELECT {spec.column} AS embedding FROM `{spec.table_id}` WHERE ARRAY_LENGTH({spec.column}) > 0"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    vectors = [row.embedding for row in bq_client.query(query).result(page_size=10000)]
+    matrix = np.asarray(vectors, dtype=np.float32)
+    np.save(path, matrix)
+    print(f"✅ Exported {len(matrix)} x {matrix.shape[1] if len(matrix) else 0} embeddings to {path}")
+    return matrix
+
+
+def split_queries(matrix, n_queries, noise=0.05, seed=1):
+    """Hold out n_queries rows as (perturbed) queries; return (base, queries)."""
+    rng = np.random.default_rng(seed)
+    held_out = rng.choice(len(matrix), n_queries, replace=False)
+    keep = np.ones(len(matrix), dtype=bool)
+    keep[held_out] = False
+    queries = np.asarray(matrix[held_out]) + noise * rng.normal(size=(n_queries, matrix.shape[1])).astype(np.float32)
+    return np.asarray(matrix[keep]), normalize_rows(queries)
+
+
+def recall_at_k(found, truth):
+    """Fraction of the exact top-k that was returned."""
+    truth = set(truth)
+    return len(truth & set(found)) / len(truth) if truth else 1.0
+
+
+def summarize(param, recalls, latencies_ms, **extra):
+    latencies_ms = np.asarray(latencies_ms)
+    return {
+        "param": param,
+        "recall": float(np.mean(recalls)),
+        "min_recall": float(np.min(recalls)),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        **extra,
+    }
+
+
+def choose_operating_point(curve, target_recall):
+    """First (cheapest) point reaching target_recall, else the best recall."""
+    for point in curve:
+        if point["recall"] >= target_recall:
+            return point
+    return max(curve, key=lambda p: p["recall"]) if curve else None
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+def sweep_ivf(base, queries, k, nprobes, nlist=None, precision="float32", rescore_factor=4):
+    """Exact baseline plus one curve point per nprobe."""
+    truth, exact_ms = [], []
+    for q in queries:
+        started = time.perf_counter()
+        truth.append(top_k_cosine(base, q, k)[0])
+        exact_ms.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    ivf = IVFIndex.train(base, nlist=nlist)
+    print(f"▶️ IVF trained: {ivf.nlist} lists over {len(base)} rows in {time.perf_counter() - started:.1f}s")
+
+    # Same layout as the case index: ranking rows in RESCORE_DTYPES[precision],
+    # plus int8 codes for the scan
+    stored = base.astype(RESCORE_DTYPES[precision])
+    codes, scales = quantize_rows(base, "int8") if precision == "int8" else (None, None)
+    row_bytes = storage_bytes_per_row(precision, base.shape[1])
+    print(f"▶️ Storage at {precision}: {row_bytes} bytes/row, {row_bytes * len(base) / 2**20:.1f} MiB "
+          f"(float32: {storage_bytes_per_row('float32', base.shape[1]) * len(base) / 2**20:.1f} MiB)")
+
+    def search(q, nprobe):
+        if codes is None:
+            return ivf.search(stored, q, k, nprobe)
+        return top_k_rescored(codes, scales, stored, q, k, rows=ivf.candidates(q, nprobe),
+                              rescore_factor=rescore_factor)
+
+    curve = []
+    for nprobe in sorted({min(p, ivf.nlist) for p in nprobes}):  # nprobe = nlist is exact
+        recalls, latencies = [], []
+        for q, t in zip(queries, truth):
+            started = time.perf_counter()
+            found, _ = search(q, nprobe)
+            latencies.append((time.perf_counter() - started) * 1000)
+            recalls.append(recall_at_k(found, t))
+        curve.append(summarize(nprobe, recalls, latencies, scanned=float(nprobe / ivf.nlist)))
+    baseline = summarize("exact", [1.0], exact_ms)
+    return baseline, curve
+
+
+def _bigquery_search(bq_client, site, embedding, k, options):
+    from google.cloud import bigquery
+    from src.bigquery_utils.vector_indexes import VECTOR_INDEXES
+
+    spec = VECTOR_INDEXES[site]
+    query = f"""
+    SELECT {SITE_ID_EXPRESSIONS[site]} AS id
+    FROM VECTOR_SEARCH(
+        TABLE `{spec.table_id}`,
+        '{spec.column}',
+        (SELECT @embedding AS {spec.column}),
+        top_k => {k},
+        options => '{json.dumps(options)}'
+    )
+    """
+    started = time.perf_counter()
+    rows = bq_client.query(query, job_config=bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ArrayQueryParameter("embedding", "FLOAT64", list(map(float, embedding)))],
+        use_query_cache=False
+    )).result()
+    ids = [row.id for row in rows]
+    return ids, (time.perf_counter() - started) * 1000
+
+
+def sweep_bigquery(bq_client, site, queries, k, fractions):
+    """VECTOR_SEARCH per fraction_lists_to_search against a brute-force baseline."""
+    truth, exact_ms = [], []
+    for q in queries:
+        ids, ms = _bigquery_search(bq_client, site, q, k, {"use_brute_force": True})
+        truth.append(ids)
+        exact_ms.append(ms)
+
+    curve = []
+    for fraction in fractions:
+        recalls, latencies = [], []
+        for q, t in zip(queries, truth):
+            ids, ms = _bigquery_search(bq_client, site, q, k, {"fraction_lists_to_search": fraction})
+            recalls.append(recall_at_k(ids, t))
+            latencies.append(ms)
+        curve.append(summarize(fraction, recalls, latencies))
+    baseline = summarize("brute_force", [1.0], exact_ms)
+    return baseline, curve
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vector search recall@k vs latency")
+    parser.add_argument("--backend", choices=["ivf", "bigquery"], default="ivf")
+    parser.add_argument("--site", choices=sorted(SITE_ID_EXPRESSIONS), default="cases",
+                        help="Call site (bigquery backend / --export)")
+    parser.add_argument("--embeddings", help="Exported embeddings (.npy / .npz); synthetic if omitted")
+    parser.add_argument("--export", metavar="SITE", choices=sorted(SITE_ID_EXPRESSIONS),
+                        help="Export SITE's embeddings from BigQuery to --embeddings and exit")
+    parser.add_argument("--rows", type=int, default=100000, help="Synthetic rows")
+    parser.add_argument("--dim", type=int, default=768, help="Synthetic dimensionality")
+    parser.add_argument("--spread", type=float, default=0.35, help="Synthetic noise around topic centres")
+    parser.add_argument("--queries", type=int, default=200, help="Held-out queries (bigquery: use ~20)")
+    parser.add_argument("--k", type=int, default=3, help="Neighbours per query (the call site's top_k)")
+    parser.add_argument("--nlist", type=int, help="IVF lists (default ~sqrt(rows))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=DEFAULT_NPROBE)
+    parser.add_argument("--fractions", type=float, nargs="+", default=DEFAULT_FRACTIONS)
+    parser.add_argument("--precision", choices=sorted(PRECISIONS), default="float32",
+                        help="ivf: storage precision (int8 rescored from float16)")
+    parser.add_argument("--rescore-factor", type=int, default=4, help="ivf: candidates rescored per result")
+    parser.add_argument("--target-recall", type=float, default=0.99)
+    parser.add_argument("--output", help="Write the curve as JSON")
+    args = parser.parse_args(argv)
+
+    bq_client = None
+    if args.backend == "bigquery" or args.export:
+        from src.clients import get_bq_client
+        bq_client = get_bq_client()
+
+    if args.export:
+        if not args.embeddings:
+            parser.error("--export needs --embeddings (output path)")
+        export_embeddings(bq_client, args.export, args.embeddings)
+        return 0
+
+    if args.embeddings:
+        matrix = load_embeddings(args.embeddings)
+        source = args.embeddings
+    else:
+        matrix = synthetic_embeddings(args.rows, args.dim, spread=args.spread)
+        source = f"synthetic {args.rows}x{args.dim} (spread {args.spread})"
+    base, queries = split_queries(matrix, min(args.queries, len(matrix) // 10 or 1))
+    print(f"▶️ {source}: {len(base)} rows, {len(queries)} queries, k={args.k}")
+
+    if args.backend == "ivf":
+        baseline, curve = sweep_ivf(base, queries, args.k, args.nprobe, args.nlist,
+                                    args.precision, args.rescore_factor)
+        setting = "CASE_INDEX_NPROBE"
+    else:
+        baseline, curve = sweep_bigquery(bq_client, args.site, queries, args.k, args.fractions)
+        setting = f"VECTOR_SEARCH_FRACTION_{args.site.upper()}"
+
+    print(f"\n{'param':>10} {'recall@k':>9} {'min':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for point in [baseline] + curve:
+        print(f"{point['param']!s:>10} {point['recall']:>9.3f} {point['min_recall']:>6.2f} "
+              f"{point['p50_ms']:>8.2f} {point['p95_ms']:>8.2f}")
+
+    chosen = choose_operating_point(curve, args.target_recall)
+    if chosen:
+        mark = "✅" if chosen["recall"] >= args.target_recall else "❌"
+        print(f"\n{mark} Operating point: {setting}={chosen['param']} "
+              f"(recall@{args.k} {chosen['recall']:.3f}, p50 {chosen['p50_ms']:.2f} ms; "
+              f"target {args.target_recall})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"source": source, "backend": args.backend, "site": args.site, "k": args.k,
+                       "precision": args.precision,
+                       "bytes_per_row": storage_bytes_per_row(args.precision, base.shape[1]),
+                       "rows": len(base), "baseline": baseline, "curve": curve,
+                       "operating_point": chosen, "setting": setting}, f, indent=2)
+        print(f"✅ Curve written to {args.output}")
+    return 0 if chosen and chosen["recall"] >= args.target_recall else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
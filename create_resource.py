@@ -4,20 +4,18 @@
 import json,time
 import subprocess
 from google.cloud import bigquery, documentai
-from google.api_core.client_options import ClientOptions
 
 # Custom modules
-from src.clients import get_bq_client, get_storage_client, credentials
+from src.clients import get_bq_client, get_documentai_client, LazyClient
 from src import config
+from src.word_encoding import decode_words_df, encode_words_df_json
+from src.bigquery_utils.vector_indexes import VECTOR_INDEXES, ensure_vector_indexes, wait_until_ready
 
 # ==============================
 # CLIENT INITIALIZATION
 # ==============================
-# BigQuery client for running queries
-bq_client = get_bq_client()
-
-# Google Cloud Storage client for interacting with GCS buckets
-storage_client = get_storage_client()
+# BigQuery client for running queries (shared, created on first use)
+bq_client = LazyClient(get_bq_client)
 
 
 # ==============================
@@ -189,11 +187,7 @@ def create_layout_parser_processor():
     processor_display_name = "layout_parser_processor"
     processor_type = "LAYOUT_PARSER_PROCESSOR"
 
-    opts = ClientOptions(api_endpoint="us-documentai.googleapis.com")
-    client = documentai.DocumentProcessorServiceClient(
-        credentials=credentials, 
-        client_options=opts
-    )
+    client = get_documentai_client("us-documentai.googleapis.com")
 
     parent = client.common_location_path(config.PROJECT_ID, location.lower())
     processor = client.create_processor(
@@ -291,19 +285,18 @@ def create_speech_doc_embeddings_table():
     time.sleep(5)
 
 
-def create_vector_index_if_not_exists():
+def create_vector_index_if_not_exists(rebuild=False):
     """
-    Creates a vector index on the embeddings table for similarity search.
+    Create (or, when sized for a much smaller/larger table, rebuild) the
+    vector index on every embedding column and wait until each new index
+    is ready. Tables too small for an index are skipped; their searches
+    use brute force.
     """
-    sql = f"""
-    CREATE OR REPLACE VECTOR INDEX my_index 
-    ON `{config.PROJECT_ID}.{config.DATASET_ID}.{config.SPEECH_DOCUMENT_EMBEDDINGS_TABLE_ID}`(text_embeddings)
-    OPTIONS(index_type = 'TREE_AH', distance_type = 'COSINE')
-    """
-    bq_client.query(sql).result()
-    print("✅ Vector index created (or replaced).")
-    print("⏳ Waiting 5 seconds to reflect")
-    time.sleep(5)
+    results = ensure_vector_indexes(bq_client, rebuild=rebuild)
+    for site, result in results.items():
+        if result in ("created", "rebuilt"):
+            wait_until_ready(bq_client, VECTOR_INDEXES[site])
+    return results
 
 
 def insert_courses(file_path="data/courses/courses.json"):
@@ -377,6 +370,68 @@ def create_document_ingestion_setup():
     create_speech_doc_embeddings_table()
 
 
+# ==============================
+# MAINTENANCE / MIGRATIONS
+# ==============================
+
+def migrate_words_df_encoding(batch_size=1000):
+    """
+    Re-encode analysis rows whose words_df is still stored as JSON records
+    (one object per word) into the compact columnar format.
+
+    Rows still in the streaming buffer cannot be updated, so only rows
+    processed more than 90 minutes ago are migrated; re-run later for the rest.
+    """
+    table_id = f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.ANALYSIS_RESULTS_EMBEDDINGS_TABLE_ID}"
+    temp_table = f"{config.PROJECT_ID}.{config.DATASET_ID}.temp_words_df_migration"
+
+    select_query = f"""
+    SELECT run_id, TO_JSON_STRING(words_df) AS words_df
+    FROM `{table_id}`
+    WHERE JSON_TYPE(words_df) = 'array'
+      AND processed_at < TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 90 MINUTE)
+    """
+    rows = bq_client.query(select_query).result(page_size=batch_size)
+
+    migrated = 0
+    for page in rows.pages:
+        # 1️⃣ Re-encode the page locally
+        batch = [
+            {"run_id": row["run_id"], "words_df": encode_words_df_json(decode_words_df(row["words_df"]))}
+            for row in page
+        ]
+        if not batch:
+            continue
+
+        # 2️⃣ Load the re-encoded values into a staging table
+        bq_client.load_table_from_json(
+            batch,
+            temp_table,
+            job_config=bigquery.LoadJobConfig(
+                schema=[
+                    bigquery.SchemaField("run_id", "STRING"),
+                    bigquery.SchemaField("words_df", "STRING"),
+                ],
+                write_disposition="WRITE_TRUNCATE"
+            )
+        ).result()
+
+        # 3️⃣ Swap them in
+        merge_query = f"""
+        MERGE `{table_id}` AS t
+        USING `{temp_table}` AS s
+        ON t.run_id = s.run_id
+        WHEN MATCHED THEN UPDATE SET words_df = PARSE_JSON(s.words_df)
+        """
+        bq_client.query(merge_query).result()
+        migrated += len(batch)
+        print(f"✅ Migrated {migrated} rows to compact words_df encoding")
+
+    # 4️⃣ Drop the staging table
+    bq_client.delete_table(temp_table, not_found_ok=True)
+    print(f"✅ words_df migration finished ({migrated} rows)")
+
+
 # ==============================
 # RESOURCE CREATION
 # ==============================
@@ -396,6 +451,7 @@ def create_resources():
 
 def ingest_data():
     insert_courses()
+    create_vector_index_if_not_exists()
 
 # ==============================
 # MAIN
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import json
 import uuid
 from datetime import datetime
@@ -6,11 +7,55 @@ from src import config
 from src.bigquery_utils.embeddings import generate_transcript_embedding
 from src.bigquery_utils.therapy import generate_therapy_plan
 from src.bigquery_utils.retrieval_qa import fetch_top_courses_vector_search
+from src.disfluency import detect_disfluencies, get_detectors
+from src.word_encoding import encode_words_df_json
+from src.write_spool import get_write_spool
+from src.stage_dag import Stage, StageDAG
+
+# Prefer orjson for decoding ml_transcribe_result payloads (falls back to stdlib json)
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+
+def _load_payload(result_json):
+    """
+    Decode a single ml_transcribe_result payload.
+
+    BigQuery may hand the JSON column back either as a string or as an
+    already-decoded dict, so both are accepted.
+    """
+    if isinstance(result_json, (dict, list)):
+        return result_json
+    return _json_loads(result_json)
+
+
+def _parse_offsets(offsets):
+    """
+    Convert Speech-to-Text duration strings (e.g. '1.500s') into float32 seconds.
+
+    All offsets are parsed in a single vectorized call instead of one
+    float() per word.
+    """
+    if not offsets:
+        return np.empty(0, dtype=np.float32)
+
+    parsed = np.fromstring("".join(offsets).replace("s", " "), dtype=np.float32, sep=" ")
+    if len(parsed) != len(offsets):
+        # Malformed offset somewhere in the batch → fall back to per-item parsing
+        parsed = np.array([o.rstrip("s") for o in offsets], dtype=np.float32)
+    return parsed
+
 
 def extract_word_level(transcripts_df):
     """
     Extract word-level transcripts from ml_transcribe_result JSON.
 
+    All rows are parsed in one pass into columnar arrays, so cost grows
+    linearly with the number of words rather than with per-row DataFrame
+    overhead.
+
     Args:
         transcripts_df (pd.DataFrame): DataFrame containing at least columns:
             - 'ml_transcribe_result' : JSON string from transcription
@@ -19,97 +64,86 @@ def extract_word_level(transcripts_df):
     Returns:
         pd.DataFrame: Flattened word-level transcript with columns:
             ['uri', 'word', 'start_time', 'end_time']
+            (start_time / end_time are float32 seconds)
     """
-    all_words = []
-
-    for _, row in transcripts_df.iterrows():
-        uri = row["uri"]
-        result_json = row["ml_transcribe_result"]
+    uris, counts = [], []
+    words, start_times, end_times = [], [], []
 
+    for uri, result_json in zip(transcripts_df["uri"], transcripts_df["ml_transcribe_result"]):
         if not result_json:
             continue
 
+        # A malformed row is skipped whole: nothing is appended until all
+        # of its words and offsets have been read
         try:
-            data = json.loads(result_json)
+            data = _load_payload(result_json)
             # dynamic top-level key (the GCS URI)
-            top_key = list(data["results"].keys())[0]
-
-            results = data["results"][top_key]["inline_result"]["transcript"].get("results", [])
+            top_result = next(iter(data["results"].values()))
+            results = top_result["inline_result"]["transcript"].get("results", [])
 
+            row_words, row_starts, row_ends = [], [], []
             for result in results:
                 alternatives = result.get("alternatives", [])
                 if not alternatives:
                     continue
 
                 words_list = alternatives[0].get("words", [])
-                for word_item in words_list:
-                    all_words.append({
-                        "word": word_item["word"],
-                        "start_time": float(word_item["start_offset"].replace("s","")),
-                        "end_time": float(word_item["end_offset"].replace("s",""))
-                    })
+                row_words.extend([w["word"] for w in words_list])
+                # Zero durations are omitted from the proto JSON
+                row_starts.extend([w.get("start_offset", "0s") for w in words_list])
+                row_ends.extend([w.get("end_offset", "0s") for w in words_list])
+            row_starts, row_ends = _parse_offsets(row_starts), _parse_offsets(row_ends)
         except Exception as e:
             print(f"Error processing {uri}: {e}")
             continue
 
-    return pd.DataFrame(all_words)
+        uris.append(uri)
+        counts.append(len(row_words))
+        words.extend(row_words)
+        start_times.append(row_starts)
+        end_times.append(row_ends)
 
+    empty = [np.empty(0, dtype=np.float32)]
+    return pd.DataFrame({
+        "uri": np.repeat(np.array(uris, dtype=object), counts),
+        "word": np.array(words, dtype=object),
+        "start_time": np.concatenate(start_times or empty),
+        "end_time": np.concatenate(end_times or empty),
+    })
 
-def compute_speech_metrics(words_df, long_pause_thresh=1.5):
-    """
-    Advanced stammer/stuttering analysis for word-level transcripts.
 
-    Args:
-        words_df (pd.DataFrame): Word-level transcript with columns ['word', 'start_time', 'end_time']
-        long_pause_thresh (float): Threshold for long pauses in seconds
+# -----------------------------
+# Severity Scoring
+# -----------------------------
+# Severity level cut-offs (score below → level)
+MILD_SEVERITY_MAX = 0.1
+MODERATE_SEVERITY_MAX = 0.25
 
-    Returns:
-        dict: Summary metrics
-        pd.DataFrame: Word-level analysis with disfluency annotations
+
+def _build_summary(total_words, total_duration, counts, weighted_total):
     """
-    if words_df.empty:
-        return {}, pd.DataFrame()
+    Assemble the summary metrics dict from raw disfluency counts.
 
-    df = words_df.copy()
-    
-    # --- Disfluency detection ---
-    fillers = ["uh", "um", "ah", "er", "hmm"]
-    df["is_filler"] = df["word"].str.lower().str.strip(",.")\
-                        .isin(fillers)
-    
-    # Immediate word repetitions
-    df["prev_word"] = df["word"].shift(1)
-    df["is_repetition"] = df["word"] == df["prev_word"]
-
-    # Prolongations: repeated letters (>2)
-    df["is_prolongation"] = df["word"].str.match(r"([a-zA-Z])\1{2,}", case=False)
-
-    # Inter-word pauses
-    df["next_start"] = df["start_time"].shift(-1)
-    df["pause"] = df["next_start"] - df["end_time"]
-    df["is_block"] = df["pause"] > long_pause_thresh
+    Shared by the batch and streaming analyzers so both score sessions
+    identically.
 
-    # --- Speech metrics ---
-    total_words = len(df)
-    total_duration = df["end_time"].max() - df["start_time"].min()
+    Args:
+        total_words (int): Number of words
+        total_duration (float): Last end time minus first start time
+        counts (dict): Detector summary key -> occurrences
+        weighted_total (float): Sum of detector weight * count
+    """
+    # Cast to native float so float32 timings stay JSON-serializable
+    total_duration = float(total_duration)
     speech_rate = total_words / total_duration if total_duration > 0 else 0
 
-    filler_count = int(df["is_filler"].sum())
-    repetitions = int(df["is_repetition"].sum())
-    prolongations = int(df["is_prolongation"].sum())
-    blocks = int(df["is_block"].sum())
-    long_pause_count = blocks  # same as blocks
-
-    # Weighted severity score
-    # Assign weights: block=3, prolongation=2, repetition=1.5, filler=1
-    severity_score = (
-        3*blocks + 2*prolongations + 1.5*repetitions + 1*filler_count
-    ) / total_words
+    # Weighted severity score (weights live on the registered detectors)
+    severity_score = weighted_total / total_words
 
     # Severity level
-    if severity_score < 0.1:
+    if severity_score < MILD_SEVERITY_MAX:
         severity_level = "Mild"
-    elif severity_score < 0.25:
+    elif severity_score < MODERATE_SEVERITY_MAX:
         severity_level = "Moderate"
     else:
         severity_level = "Severe"
@@ -118,43 +152,251 @@ def compute_speech_metrics(words_df, long_pause_thresh=1.5):
         "total_words": total_words,
         "total_duration_sec": total_duration,
         "speech_rate_wps": speech_rate,
-        "filler_count": filler_count,
-        "repetitions": repetitions,
-        "prolongations": prolongations,
-        "blocks": blocks,
-        "long_pauses": long_pause_count,
-        "severity_score": severity_score,
-        "severity_level": severity_level
+        **counts
     }
+    if "blocks" in counts:
+        summary["long_pauses"] = counts["blocks"]  # same as blocks
+    summary["severity_score"] = severity_score
+    summary["severity_level"] = severity_level
+    return summary
+
+
+def compute_speech_metrics(words_df, long_pause_thresh=1.5, detectors=None):
+    """
+    Advanced stammer/stuttering analysis for word-level transcripts.
+
+    Args:
+        words_df (pd.DataFrame): Word-level transcript with columns ['word', 'start_time', 'end_time']
+        long_pause_thresh (float): Threshold for long pauses in seconds
+        detectors (list[str], optional): Registered detector names
+            (see src.disfluency). Defaults to DEFAULT_DETECTORS.
+
+    Returns:
+        dict: Summary metrics
+        pd.DataFrame: Word-level analysis with disfluency annotations.
+            Per-detector timings are in df.attrs["detector_timings"].
+    """
+    if words_df.empty:
+        return {}, pd.DataFrame()
+
+    # --- Disfluency detection (all detectors over shared arrays) ---
+    arrays, detection = detect_disfluencies(words_df, long_pause_thresh, detectors)
+
+    # --- Speech metrics ---
+    summary = _build_summary(
+        total_words=len(arrays),
+        total_duration=arrays.end_time.max() - arrays.start_time.min(),
+        counts=detection.counts(),
+        weighted_total=detection.weighted_total()
+    )
 
     # Keep only useful columns for word-level analysis
-    df = df[["word", "start_time", "end_time", "pause", 
-             "is_filler", "is_repetition", "is_prolongation", "is_block"]]
+    df = pd.DataFrame({
+        "word": arrays.word,
+        "start_time": arrays.start_time,
+        "end_time": arrays.end_time,
+        "pause": arrays.pause,
+        **detection.masks
+    }, index=words_df.index)
+    df.attrs["detector_timings"] = detection.timings
 
     return summary, df
 
 
-def insert_analysis_result_with_embedding(bq_client, result_dict):
+def compute_speech_metrics_batch(words_df, long_pause_thresh=1.5, detectors=None):
     """
-    Insert analysis result into BigQuery with embeddings.
+    Score many recordings at once in a single grouped, vectorized pass.
+
+    Produces the same per-recording numbers as calling compute_speech_metrics
+    on each URI separately, but without a Python loop over sessions.
+    Repetitions and pauses never span two recordings.
+
+    Args:
+        words_df (pd.DataFrame): Output of extract_word_level with columns
+            ['uri', 'word', 'start_time', 'end_time']. Words of one URI must be
+            contiguous and in time order (as extract_word_level returns them).
+        long_pause_thresh (float): Threshold for long pauses in seconds
+        detectors (list[str], optional): Registered detector names.
+            Defaults to DEFAULT_DETECTORS.
+
+    Returns:
+        pd.DataFrame: One row per URI (index 'uri') with the summary metric columns
+        pd.DataFrame: Word-level analysis with a 'uri' column and disfluency annotations
     """
-    table_id = f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.ANALYSIS_RESULTS_EMBEDDINGS_TABLE_ID}"
+    if words_df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    # --- Disfluency detection (context never crosses a URI boundary) ---
+    arrays, detection = detect_disfluencies(words_df, long_pause_thresh, detectors, group_col="uri")
+
+    df = pd.DataFrame({
+        "uri": words_df["uri"].to_numpy(dtype=object),
+        "word": arrays.word,
+        "start_time": arrays.start_time,
+        "end_time": arrays.end_time,
+        "pause": arrays.pause,
+        **detection.masks
+    }, index=words_df.index)
+    df.attrs["detector_timings"] = detection.timings
+
+    # --- Per-URI aggregation ---
+    aggregations = {
+        "total_words": ("word", "size"),
+        "first_start": ("start_time", "min"),
+        "last_end": ("end_time", "max"),
+    }
+    for detector in detection.detectors:
+        aggregations[detector.summary_key] = (detector.column, "sum")
+    metrics = df.groupby("uri", sort=False).agg(**aggregations)
+
+    # Same arithmetic as _build_summary, column-wise
+    total_duration = (metrics["last_end"] - metrics["first_start"]).astype("float64")
+    metrics["total_duration_sec"] = total_duration
+    metrics["speech_rate_wps"] = (metrics["total_words"] / total_duration).where(total_duration > 0, 0.0)
+
+    count_columns = [d.summary_key for d in detection.detectors]
+    if "blocks" in count_columns:
+        metrics["long_pauses"] = metrics["blocks"]
+        count_columns.append("long_pauses")
+
+    weighted_total = 0
+    for detector in detection.detectors:
+        weighted_total = weighted_total + detector.weight * metrics[detector.summary_key]
+    metrics["severity_score"] = weighted_total / metrics["total_words"]
+    metrics["severity_level"] = np.select(
+        [metrics["severity_score"] < MILD_SEVERITY_MAX, metrics["severity_score"] < MODERATE_SEVERITY_MAX],
+        ["Mild", "Moderate"],
+        default="Severe"
+    )
+
+    metrics = metrics[[
+        "total_words", "total_duration_sec", "speech_rate_wps",
+        *count_columns,
+        "severity_score", "severity_level"
+    ]]
+
+    return metrics, df
 
-    # Convert metrics and words_df to JSON
+
+class SpeechMetricsAccumulator:
+    """
+    Streaming counterpart of compute_speech_metrics.
+
+    Words are fed in chunks as they arrive (e.g. from a live session or a
+    long recording read in pieces) and every counter is updated in place,
+    so the full word list never has to be held in memory. The last word of
+    each chunk is held back until the next chunk arrives (its pause is not
+    known yet) and the word before it is kept as context, which makes
+    summary() identical to running compute_speech_metrics on all words at
+    once.
+
+    Example:
+        acc = SpeechMetricsAccumulator()
+        for chunk in chunks:
+            acc.update(chunk)
+        summary = acc.summary()
+    """
+
+    def __init__(self, long_pause_thresh=1.5, detectors=None):
+        self.long_pause_thresh = long_pause_thresh
+        self.detectors = detectors
+        self.total_words = 0
+        self.counts = {d.summary_key: 0 for d in get_detectors(detectors)}
+        self.detector_timings = {}
+        self._min_start = None
+        self._max_end = None
+        # State carried across chunk boundaries
+        self._held = None
+        self._held_prev_word = None
+
+    def _detect(self, frame):
+        arrays, detection = detect_disfluencies(
+            frame, self.long_pause_thresh, self.detectors, prev_word=self._held_prev_word
+        )
+        for name, seconds in detection.timings.items():
+            self.detector_timings[name] = self.detector_timings.get(name, 0.0) + seconds
+        return arrays, detection
+
+    def update(self, words_chunk):
+        """
+        Add a chunk of words to the running metrics.
+
+        Args:
+            words_chunk (pd.DataFrame | list[dict]): Words with columns
+                ['word', 'start_time', 'end_time'], in time order.
+
+        Returns:
+            SpeechMetricsAccumulator: self, so calls can be chained.
+        """
+        if not isinstance(words_chunk, pd.DataFrame):
+            words_chunk = pd.DataFrame(words_chunk)
+        if words_chunk.empty:
+            return self
+
+        chunk = words_chunk[["word", "start_time", "end_time"]]
+        frame = chunk if self._held is None else pd.concat([self._held, chunk], ignore_index=True)
+
+        # Count every word except the new last one, whose pause is still pending
+        _, detection = self._detect(frame)
+        for key, value in detection.counts(stop=-1).items():
+            self.counts[key] += value
+
+        if len(frame) > 1:
+            self._held_prev_word = frame["word"].iloc[-2]
+        self._held = frame.iloc[-1:]
+
+        starts = chunk["start_time"].to_numpy()
+        ends = chunk["end_time"].to_numpy()
+        chunk_min, chunk_max = starts.min(), ends.max()
+        self._min_start = chunk_min if self._min_start is None else min(self._min_start, chunk_min)
+        self._max_end = chunk_max if self._max_end is None else max(self._max_end, chunk_max)
+        self.total_words += len(chunk)
+        return self
+
+    def summary(self):
+        """
+        Summary metrics for all words seen so far.
+
+        Returns:
+            dict: Same keys and values as compute_speech_metrics' summary
+                (empty dict if no words were added).
+        """
+        if self.total_words == 0:
+            return {}
+
+        # The held-back word is the last one so far: no pause follows it
+        _, detection = self._detect(self._held)
+        counts = {key: self.counts[key] + value for key, value in detection.counts().items()}
+
+        return _build_summary(
+            total_words=self.total_words,
+            total_duration=self._max_end - self._min_start,
+            counts=counts,
+            weighted_total=detection.weighted_total(counts)
+        )
+
+
+def build_analysis_row(result_dict, transcript_embedding):
+    """
+    Serialize an analysis result into a row for the analysis results table.
+
+    Args:
+        result_dict (dict): Analysis with keys 'transcript', 'metrics',
+            'therapy_plan' and 'words_df'.
+        transcript_embedding (list[float]): Embedding of the transcript.
+
+    Returns:
+        dict: JSON-serializable row for insert_rows_json.
+    """
+    # Convert metrics to JSON and words_df to the compact columnar encoding
     metrics_json = json.dumps(result_dict["metrics"])
     words_df_json = (
-        result_dict["words_df"].to_json(orient="records") 
+        encode_words_df_json(result_dict["words_df"])
         if isinstance(result_dict["words_df"], pd.DataFrame) 
         else result_dict["words_df"]
     )
 
-    # Get embedding and convert to native Python list
-    transcript_embedding = generate_transcript_embedding(bq_client, result_dict["transcript"])
-    # if isinstance(transcript_embedding, np.ndarray):
-    #     transcript_embedding = transcript_embedding.tolist()
-
-    # Prepare row
-    row = {
+    return {
         "run_id": str(uuid.uuid4()),
         "transcript": result_dict["transcript"],
         "metrics": metrics_json,
@@ -164,42 +406,143 @@ def insert_analysis_result_with_embedding(bq_client, result_dict):
         "processed_at": datetime.utcnow().isoformat()
     }
 
-    errors = bq_client.insert_rows_json(table_id, [row])
-    if errors:
-        print(f"❌ Insert failed: {errors}")
-    else:
-        print(f"✅ Inserted result with embedding into {table_id} (run_id={row['run_id']})")
-        return transcript_embedding
 
-# Updated analyze_stammer function
-def analyze_stammer(transcripts_df, bq_client,progress_bar,status_text,steps):
-    if transcripts_df.empty:
-        return None
-    
+def insert_analysis_result_with_embedding(bq_client, result_dict, transcript_embedding=None):
+    """
+    Insert analysis result into BigQuery with embeddings.
+    The row is queued in the local write spool and streamed in the background.
+
+    Args:
+        bq_client (bigquery.Client): Initialized BigQuery client
+        result_dict (dict): transcript, metrics, therapy_plan, words_df
+        transcript_embedding (list[float], optional): Precomputed transcript
+            embedding. Generated here when not given.
+
+    Returns:
+        list[float]: The transcript embedding.
+    """
+    table_id = f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.ANALYSIS_RESULTS_EMBEDDINGS_TABLE_ID}"
+
+    # Get embedding and convert to native Python list
+    if transcript_embedding is None:
+        transcript_embedding = generate_transcript_embedding(bq_client, result_dict["transcript"])
+
+    # Prepare row
+    row = build_analysis_row(result_dict, transcript_embedding)
+
+    # Durable write-behind: streamed by the spool flusher with run_id as insertId
+    get_write_spool(bq_client).enqueue(table_id, [row], [row["run_id"]])
+    print(f"✅ Queued result with embedding for {table_id} (run_id={row['run_id']})")
+    return transcript_embedding
+
+# -----------------------------
+# Analysis Stages
+# -----------------------------
+# Module-level names are looked up at call time, so the stage functions
+# below always call the current generate_therapy_plan etc.
+def _metrics_stage(transcripts_df):
     transcript_text = transcripts_df["transcripts"].iloc[0]
-    words_df = extract_word_level(transcripts_df)
-    
-    metrics, words_analysis = compute_speech_metrics(words_df)
-    
-    status_text.text(f"🔬 {steps[3]}...")
-    therapy_plan = generate_therapy_plan(transcript_text, metrics, bq_client)
-    progress_bar.progress(70)
-
-    query_text = f"Therapy guidance: {therapy_plan}. Metrics: severity={metrics['severity_score']}, fillers={metrics['filler_count']}, repetitions={metrics['repetitions']}, long_pauses={metrics['long_pauses']}"
-    
-    status_text.text(f"🔬 {steps[4]}...")
-    top_courses = fetch_top_courses_vector_search(bq_client,query_text, top_k=3)
-    progress_bar.progress(85)
+    metrics, words_analysis = compute_speech_metrics(extract_word_level(transcripts_df))
+    query_text = f"Speech analysis: severity={metrics['severity_score']}, fillers={metrics['filler_count']}, repetitions={metrics['repetitions']}, long_pauses={metrics['long_pauses']}"
+    return transcript_text, metrics, words_analysis, query_text
+
 
+def _therapy_plan_stage(transcript_text, metrics, bq_client):
+    return generate_therapy_plan(transcript_text, metrics, bq_client)
+
+
+def _top_courses_stage(query_text, bq_client):
+    return fetch_top_courses_vector_search(bq_client, query_text, top_k=3)
+
+
+def _embedding_stage(transcript_text, bq_client):
+    return generate_transcript_embedding(bq_client, transcript_text)
+
+
+def _store_stage(transcript_text, metrics, therapy_plan, words_analysis, transcript_embedding, bq_client):
     result = {
         "transcript": transcript_text,
         "metrics": metrics,
         "therapy_plan": therapy_plan,
         "words_df": words_analysis
     }
-    status_text.text(f"🔬 {steps[5]}...")
     # Insert into single table with embeddings
-    transcript_embedding = insert_analysis_result_with_embedding(bq_client, result)
-    progress_bar.progress(90)
+    insert_analysis_result_with_embedding(bq_client, result, transcript_embedding)
+    return result
+
+
+def _remote(**kwargs):
+    """Timeout / retry policy shared by the remote (BigQuery / Gemini) stages."""
+    return dict(timeout=config.PIPELINE_STAGE_TIMEOUT_SECONDS, retries=config.PIPELINE_STAGE_RETRIES,
+                backoff=config.PIPELINE_RETRY_BACKOFF_SECONDS, **kwargs)
+
+
+ANALYSIS_STAGES = [
+    Stage("metrics", _metrics_stage, inputs=("transcripts_df",),
+          outputs=("transcript_text", "metrics", "words_analysis", "query_text"),
+          label="Analyzing stammer patterns"),
+    Stage("therapy_plan", _therapy_plan_stage, inputs=("transcript_text", "metrics", "bq_client"),
+          outputs=("therapy_plan",), label="Generating Therapy Plans", **_remote()),
+    Stage("top_courses", _top_courses_stage, inputs=("query_text", "bq_client"),
+          outputs=("top_courses",), label="Choosing AI-Recommended Courses Based on Your Speech Analysis",
+          **_remote()),
+    Stage("transcript_embedding", _embedding_stage, inputs=("transcript_text", "bq_client"),
+          outputs=("transcript_embedding",), label="Embedding your transcript", **_remote()),
+    # Local spool write: not retried, a failure here is a bug
+    Stage("store", _store_stage,
+          inputs=("transcript_text", "metrics", "therapy_plan", "words_analysis", "transcript_embedding", "bq_client"),
+          outputs=("result",), label="Creating Gamified Exercises Just for You"),
+]
+
+
+def analyze_stammer(transcripts_df, bq_client, progress=None):
+    """
+    Analyze a transcription and run the remote post-transcription stages.
+
+    Runs ANALYSIS_STAGES on a StageDAG: the therapy plan, course search and
+    transcript embedding only depend on the local metrics, so they run
+    concurrently; the insert starts once the plan and embedding are ready.
+    Progress events arrive on the calling thread.
+
+    Args:
+        transcripts_df (pd.DataFrame): ML.TRANSCRIBE row(s) for one recording
+        bq_client (bigquery.Client): Initialized BigQuery client
+        progress (ProgressCallback, optional): Receives stage events
+
+    Returns:
+        tuple: (result dict, transcript embedding, top courses DataFrame)
+
+    Raises:
+        StageError: A stage failed after its retries
+    """
+    if transcripts_df.empty:
+        return None
+
+    run = StageDAG(ANALYSIS_STAGES, max_workers=config.ANALYSIS_MAX_WORKERS).run(
+        {"transcripts_df": transcripts_df, "bq_client": bq_client}, progress
+    )
+    return run.values["result"], run.values["transcript_embedding"], run.values["top_courses"]
+
 
-    return result, transcript_embedding ,top_courses
+def analyze_stammer_batch(transcripts_df, long_pause_thresh=1.5):
+    """
+    Re-score many stored transcriptions (e.g. after a threshold change).
+
+    Only the local metrics are computed; no therapy plans, course searches
+    or embeddings are requested.
+
+    Args:
+        transcripts_df (pd.DataFrame): Rows from the transcripts table with
+            'uri' and 'ml_transcribe_result' columns, one row per recording.
+        long_pause_thresh (float): Threshold for long pauses in seconds
+
+    Returns:
+        pd.DataFrame: Per-URI summary metrics (index 'uri').
+            metrics.to_dict(orient="index") gives one summary dict per URI.
+        pd.DataFrame: Word-level analysis for all URIs
+    """
+    if transcripts_df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    words_df = extract_word_level(transcripts_df)
+    return compute_speech_metrics_batch(words_df, long_pause_thresh=long_pause_thresh)
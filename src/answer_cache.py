@@ -0,0 +1,163 @@
+# ==============================
+# src/answer_cache.py
+# ==============================
+# Semantic cache for chat answers.
+#
+# A stored answer is reused when a new question's embedding is within
+# `max_distance` (cosine) of a previously answered question in the same
+# scope. The scope is the document corpus version plus a key over
+# everything else that shapes the answer (prompt, model, retrieval and
+# generation settings), so a corpus refresh or prompt change never
+# serves an answer built from other inputs.
+#
+# Entries live in SQLite (float32 embedding blobs) and are loaded into a
+# row-normalized matrix per scope, so a lookup is one matrix-vector product.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from src import config
+from src.vector_index import normalize_rows, top_k_cosine
+
+
+def make_context_key(*parts) -> str:
+    """Hex SHA-256 over the settings that shape an answer."""
+    return hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    Thread-safe answer cache keyed by question similarity.
+
+    Args:
+        path (str | None): SQLite file (None keeps entries in memory only)
+        max_distance (float): Max cosine distance for a hit
+        max_entries (int): Entries kept (oldest are evicted first)
+    """
+
+    def __init__(self, path=None, max_distance=0.05, max_entries=5000):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._scopes = {}   # (corpus_version, context_key) → (matrix, [(question, answer)])
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                corpus_version TEXT NOT NULL,
+                context_key TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_scope ON answers(context_key, corpus_version)")
+        self._db.commit()
+
+    def _scope(self, corpus_version, context_key):
+        scope = (corpus_version, context_key)
+        if scope not in self._scopes:
+            rows = self._db.execute(
+                "SELECT question, embedding, answer FROM answers "
+                "WHERE corpus_version = ? AND context_key = ? ORDER BY id",
+                scope
+            ).fetchall()
+            matrix = (
+                normalize_rows(np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows]))
+                if rows else np.empty((0, 0), dtype=np.float32)
+            )
+            self._scopes[scope] = (matrix, [(r[0], r[2]) for r in rows])
+        return self._scopes[scope]
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def lookup(self, embedding, corpus_version, context_key):
+        """
+        Find the answer to the most similar cached question.
+
+        Returns:
+            dict | None: {'question', 'answer', 'distance'} on a hit
+        """
+        with self._lock:
+            matrix, entries = self._scope(corpus_version, context_key)
+            idx, distances = top_k_cosine(matrix, embedding, 1)
+            if len(idx) and distances[0] <= self.max_distance:
+                self.hits += 1
+                question, answer = entries[idx[0]]
+                return {"question": question, "answer": answer, "distance": float(distances[0])}
+            self.misses += 1
+            return None
+
+    def store(self, question, embedding, answer, corpus_version, context_key):
+        """Cache an answer; entries for older corpus versions of the same context are dropped."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM answers WHERE context_key = ? AND corpus_version != ?",
+                (context_key, corpus_version)
+            )
+            self._db.execute(
+                "INSERT INTO answers (corpus_version, context_key, question, embedding, answer, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (corpus_version, context_key, question, vector.tobytes(), answer, time.time())
+            )
+            self._db.execute(
+                "DELETE FROM answers WHERE id NOT IN (SELECT id FROM answers ORDER BY id DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self._db.commit()
+            self._scopes.clear()  # reloaded lazily (evictions may touch any scope)
+
+    def stats(self):
+        """Hit/miss counters and entry count."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0],
+            }
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._db.execute("DELETE FROM answers")
+            self._db.commit()
+            self._scopes.clear()
+
+
+# -----------------------------
+# Shared Instance
+# -----------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """
+    Process-wide answer cache configured from src.config.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticAnswerCache(
+                path=os.path.join(config.CACHE_DIR, "answers.sqlite"),
+                max_distance=config.CHAT_ANSWER_CACHE_MAX_DISTANCE,
+                max_entries=config.CHAT_ANSWER_CACHE_MAX_ENTRIES
+            )
+        return _cache
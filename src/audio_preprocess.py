@@ -0,0 +1,364 @@
+# ==============================
+# src/audio_preprocess.py
+# ==============================
+# Local audio preprocessing before upload:
+#   1. Decode (WAV natively; other formats through ffmpeg when installed)
+#   2. Downmix to mono and resample to the recognizer's rate
+#   3. Trim leading / trailing silence with an energy-based VAD
+#   4. Re-encode compactly (FLAC / Opus through ffmpeg, else 16-bit WAV)
+#   5. Split long recordings at silence into overlapping segments, so they
+#      can be transcribed in parallel
+#
+# The seconds trimmed from the start are returned as offset_seconds (and
+# per segment) so word timestamps can be shifted back onto the original
+# recording.
+
+import io
+import os
+import shutil
+import subprocess
+import wave
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src import config
+
+# codec → (extension, content type, ffmpeg output args)
+CODECS = {
+    "flac": (".flac", "audio/flac", ["-c:a", "flac", "-f", "flac"]),
+    "opus": (".ogg", "audio/ogg", ["-c:a", "libopus", "-b:a", "32k", "-f", "ogg"]),
+    "wav": (".wav", "audio/wav", None),
+}
+
+
+@dataclass
+class AudioSegment:
+    """
+    One piece of a long recording.
+
+    Attributes:
+        data (bytes): Encoded audio
+        filename (str): Suggested filename
+        content_type (str): MIME type of `data`
+        offset_seconds (float): Start within the original recording
+        duration_seconds (float): Segment duration
+    """
+    data: bytes
+    filename: str
+    content_type: str
+    offset_seconds: float
+    duration_seconds: float
+
+    def buffer(self):
+        """Fresh in-memory buffer over the encoded audio."""
+        return io.BytesIO(self.data)
+
+
+@dataclass
+class PreprocessedAudio:
+    """
+    Result of preprocess_audio.
+
+    Attributes:
+        data (bytes): Encoded audio
+        filename (str): Suggested filename (extension matches the codec)
+        content_type (str): MIME type of `data`
+        offset_seconds (float): Audio trimmed from the start of the original
+        duration_seconds (float): Duration after trimming
+        original_duration_seconds (float): Duration of the input
+        sample_rate (int): Output sample rate
+        segments (list[AudioSegment]): Overlapping pieces to transcribe in
+            parallel; empty unless the recording is longer than
+            AUDIO_SEGMENT_MIN_SECONDS
+    """
+    data: bytes
+    filename: str
+    content_type: str
+    offset_seconds: float
+    duration_seconds: float
+    original_duration_seconds: float
+    sample_rate: int
+    segments: list = field(default_factory=list)
+
+    def buffer(self):
+        """Fresh in-memory buffer over the encoded audio."""
+        return io.BytesIO(self.data)
+
+
+# -----------------------------
+# Decode / Encode
+# -----------------------------
+def _read_bytes(source):
+    """Bytes of a path or buffer; buffers are rewound to where they started."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    start = source.tell()
+    data = source.read()
+    source.seek(start)
+    return data
+
+
+def _ffmpeg():
+    return shutil.which("ffmpeg")
+
+
+def _decode_wav(data):
+    """PCM WAV → (float32 samples of shape (frames, channels), sample rate)."""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 2 ** 15
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        samples = (np.where(ints >= 2 ** 23, ints - 2 ** 24, ints)).astype(np.float32) / 2 ** 23
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2 ** 31
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+    return samples.reshape(-1, channels), rate
+
+
+def _decode(data, sample_rate):
+    """
+    Decode audio bytes to float32 samples.
+
+    Returns:
+        tuple | None: (samples (frames, channels), rate), or None when the
+            format can't be decoded here (non-WAV without ffmpeg).
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return _decode_wav(data)
+        except (wave.Error, ValueError) as e:
+            print(f"❌ Could not decode WAV locally: {e}")
+
+    if not _ffmpeg():
+        return None
+
+    # ffmpeg downmixes and resamples while decoding
+    proc = subprocess.run(
+        [_ffmpeg(), "-v", "error", "-i", "pipe:0", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"],
+        input=data, capture_output=True
+    )
+    if proc.returncode != 0:
+        print(f"❌ ffmpeg could not decode audio: {proc.stderr.decode(errors='replace')[-300:]}")
+        return None
+    return (np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32) / 2 ** 15).reshape(-1, 1), sample_rate
+
+
+def _encode(samples, sample_rate, codec):
+    """Mono float32 samples → (bytes, codec actually used)."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+    ffmpeg_args = CODECS[codec][2]
+    if ffmpeg_args and _ffmpeg():
+        proc = subprocess.run(
+            [_ffmpeg(), "-v", "error", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+             *ffmpeg_args, "pipe:1"],
+            input=pcm, capture_output=True
+        )
+        if proc.returncode == 0:
+            return proc.stdout, codec
+        print(f"❌ ffmpeg could not encode {codec}, writing WAV: {proc.stderr.decode(errors='replace')[-300:]}")
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return out.getvalue(), "wav"
+
+
+# -----------------------------
+# Signal Processing
+# -----------------------------
+def downmix(samples):
+    """(frames, channels) → mono (frames,) by averaging channels."""
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples, src_rate, dst_rate, taps=101):
+    """
+    Resample mono audio. Downsampling applies a windowed-sinc low-pass at
+    the new Nyquist frequency (FFT convolution) before interpolating.
+    """
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples.astype(np.float32)
+
+    if dst_rate < src_rate:
+        cutoff = 0.5 * dst_rate / src_rate
+        n = np.arange(taps) - (taps - 1) / 2
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+        kernel /= kernel.sum()
+        size = len(samples) + taps - 1
+        filtered = np.fft.irfft(np.fft.rfft(samples, size) * np.fft.rfft(kernel, size), size)
+        samples = filtered[(taps - 1) // 2:(taps - 1) // 2 + len(samples)]
+
+    duration = len(samples) / src_rate
+    t_out = np.arange(int(round(duration * dst_rate))) / dst_rate
+    return np.interp(t_out, np.arange(len(samples)) / src_rate, samples).astype(np.float32)
+
+
+def find_speech_bounds(samples, sample_rate, frame_ms=None, threshold_db=None, floor_db=None, padding_ms=None):
+    """
+    Energy-based VAD: first and last frame whose RMS level is within
+    `threshold_db` of the loudest frame (and above `floor_db` dBFS).
+
+    Args:
+        samples (np.ndarray): Mono float samples in [-1, 1]
+        sample_rate (int): Samples per second
+
+    Returns:
+        tuple: (start_sample, end_sample) to keep, padded by `padding_ms`.
+            The whole signal when no frame qualifies.
+    """
+    frame_ms = frame_ms or config.AUDIO_VAD_FRAME_MS
+    threshold_db = config.AUDIO_SILENCE_THRESHOLD_DB if threshold_db is None else threshold_db
+    floor_db = config.AUDIO_SILENCE_FLOOR_DB if floor_db is None else floor_db
+    padding_ms = config.AUDIO_TRIM_PADDING_MS if padding_ms is None else padding_ms
+
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return 0, len(samples)
+
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    level_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+    voiced = np.flatnonzero(level_db >= max(level_db.max() - threshold_db, floor_db))
+    if len(voiced) == 0:
+        return 0, len(samples)
+
+    pad = int(sample_rate * padding_ms / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return start, end
+
+
+def split_at_silence(samples, sample_rate, segment_seconds=None, overlap_seconds=None, search_seconds=None, frame_ms=None):
+    """
+    Plan overlapping segments for a long recording.
+
+    Each cut is placed at the quietest frame within `search_seconds` of
+    the next `segment_seconds` boundary; neighbouring segments share
+    `overlap_seconds` of audio around the cut, so a word spanning it is
+    heard whole by at least one of them.
+
+    Returns:
+        list[tuple]: (start_sample, end_sample) per segment
+    """
+    segment_seconds = segment_seconds or config.AUDIO_SEGMENT_SECONDS
+    overlap_seconds = config.AUDIO_SEGMENT_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds
+    search_seconds = config.AUDIO_SEGMENT_SEARCH_SECONDS if search_seconds is None else search_seconds
+    frame_ms = frame_ms or config.AUDIO_VAD_FRAME_MS
+
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return [(0, len(samples))]
+    energy = np.mean(samples[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1)
+
+    segment = int(segment_seconds * sample_rate)
+    search = int(search_seconds * sample_rate)
+    half_overlap = int(overlap_seconds * sample_rate / 2)
+
+    cuts, position = [], 0
+    while len(samples) - position > segment + search:
+        lo = (position + segment - search) // frame
+        hi = min(n_frames, (position + segment + search) // frame + 1)
+        cut = (lo + int(np.argmin(energy[lo:hi]))) * frame + frame // 2
+        cuts.append(cut)
+        position = cut
+
+    bounds = [0, *cuts, len(samples)]
+    return [
+        (max(0, start - half_overlap) if i else 0, min(len(samples), end + half_overlap))
+        for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:]))
+    ]
+
+
+# -----------------------------
+# Preprocessing Stage
+# -----------------------------
+def preprocess_audio(source, filename=None, sample_rate=None, codec=None, segment=None):
+    """
+    Downmix, resample, trim silence and re-encode an audio file.
+
+    Args:
+        source (str | file-like): Local path or binary buffer
+        filename (str, optional): Original filename (used for the output name)
+        sample_rate (int, optional): Target rate (default AUDIO_SAMPLE_RATE)
+        codec (str, optional): 'flac', 'opus' or 'wav' (default
+            AUDIO_PREPROCESS_CODEC). Falls back to WAV without ffmpeg.
+        segment (bool, optional): Split recordings longer than
+            AUDIO_SEGMENT_MIN_SECONDS (default AUDIO_SEGMENT_ENABLED)
+
+    Returns:
+        PreprocessedAudio | None: None when the audio can't be decoded
+            locally or preprocessing wouldn't shrink it; upload the
+            original in that case.
+    """
+    sample_rate = sample_rate or config.AUDIO_SAMPLE_RATE
+    codec = codec or config.AUDIO_PREPROCESS_CODEC
+    segment = config.AUDIO_SEGMENT_ENABLED if segment is None else segment
+    if codec not in CODECS:
+        raise ValueError(f"Unknown audio codec: {codec}")
+
+    data = _read_bytes(source)
+    decoded = _decode(data, sample_rate)
+    if decoded is None:
+        print("▶️ Audio preprocessing skipped (format needs ffmpeg)")
+        return None
+
+    samples, rate = decoded
+    original_duration = len(samples) / rate
+    mono = resample(downmix(samples), rate, sample_rate)
+
+    start, end = find_speech_bounds(mono, sample_rate)
+    speech = mono[start:end]
+    encoded, codec = _encode(speech, sample_rate, codec)
+    trimmed = start > 0 or end < len(mono)
+    long_recording = segment and len(speech) > config.AUDIO_SEGMENT_MIN_SECONDS * sample_rate
+
+    if len(encoded) >= len(data) and not trimmed and not long_recording:
+        print("▶️ Audio preprocessing skipped (no size or duration saving)")
+        return None
+
+    name = filename or (source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "audio"))
+    stem = os.path.splitext(os.path.basename(str(name)))[0]
+    ext, content_type, _ = CODECS[codec]
+
+    segments = []
+    if long_recording:
+        for i, (seg_start, seg_end) in enumerate(split_at_silence(speech, sample_rate)):
+            seg_data, _ = _encode(speech[seg_start:seg_end], sample_rate, codec)
+            segments.append(AudioSegment(
+                data=seg_data,
+                filename=f"{stem}.part{i:03d}{ext}",
+                content_type=content_type,
+                offset_seconds=(start + seg_start) / sample_rate,
+                duration_seconds=(seg_end - seg_start) / sample_rate
+            ))
+    result = PreprocessedAudio(
+        data=encoded,
+        filename=f"{stem}{ext}",
+        content_type=content_type,
+        offset_seconds=start / sample_rate,
+        duration_seconds=(end - start) / sample_rate,
+        original_duration_seconds=original_duration,
+        sample_rate=sample_rate,
+        segments=segments
+    )
+    print(
+        f"✅ Preprocessed audio: {original_duration:.1f}s → {result.duration_seconds:.1f}s, "
+        f"{len(data) / 1024:.0f} KiB → {len(encoded) / 1024:.0f} KiB ({codec})"
+        + (f", {len(segments)} segments" if segments else "")
+    )
+    return result
@@ -4,50 +4,155 @@
 # Functions for generating transcript embeddings and performing
 # semantic search on past cases using BigQuery ML and VECTOR_SEARCH.
 
-from google.cloud import bigquery
+from __future__ import annotations
+
+from src.lazy_imports import lazy_import
 from src import config
+from src.word_encoding import decode_words_df
+from src.embedding_cache import get_embedding_cache, make_cache_key
+from src.case_index import get_case_index
+from src.bigquery_utils.vector_indexes import vector_search_options
 import pandas as pd
 
+bigquery = lazy_import("google.cloud.bigquery")
+
+# Identifies the embedding model in cache keys
+EMBEDDING_MODEL_KEY = f"{config.GENERATIVE_AI_EMBEDDING_MODEL_ID}:{config.GENERATIVE_AI_EMBEDDING_MODEL_ENDPOINT}"
+
+# Task types accepted by ML.GENERATE_EMBEDDING
+EMBEDDING_TASK_TYPES = {
+    "RETRIEVAL_QUERY", "RETRIEVAL_DOCUMENT", "SEMANTIC_SIMILARITY",
+    "CLASSIFICATION", "CLUSTERING", "QUESTION_ANSWERING", "FACT_VERIFICATION",
+}
+
+
+def _embedding_options(task_type=None):
+    """STRUCT options for ML.GENERATE_EMBEDDING."""
+    if task_type is None:
+        return "STRUCT(TRUE AS flatten_json_output)"
+    if task_type not in EMBEDDING_TASK_TYPES:
+        raise ValueError(f"Unsupported embedding task_type: {task_type}")
+    return f"STRUCT(TRUE AS flatten_json_output, '{task_type}' AS task_type)"
+
+
+# -----------------------------
+# Generate Text Embeddings (batched)
+# -----------------------------
+def _query_embeddings(bq_client, texts, task_type=None):
+    """
+    Run one ML.GENERATE_EMBEDDING job for a list of texts (no caching).
+
+    Texts are passed as an array query parameter; the array offset is
+    carried through the model so results come back in input order.
+    """
+    query = f"""
+    SELECT
+        idx,
+        ml_generate_embedding_result AS embedding,
+        ml_generate_embedding_status AS status
+    FROM ML.GENERATE_EMBEDDING(
+        MODEL `{config.PROJECT_ID}.{config.DATASET_ID}.{config.GENERATIVE_AI_EMBEDDING_MODEL_ID}`,
+        (SELECT content, idx FROM UNNEST(@texts) AS content WITH OFFSET AS idx),
+        {_embedding_options(task_type)}
+    )
+    ORDER BY idx
+    """
+
+    job = bq_client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("texts", "STRING", list(texts))]
+        )
+    )
+    df = job.to_dataframe()
+
+    failed = df[df["status"].fillna("") != ""]
+    if len(df) != len(texts) or not failed.empty:
+        detail = failed["status"].iloc[0] if not failed.empty else f"{len(df)} of {len(texts)} rows returned"
+        raise RuntimeError(f"ML.GENERATE_EMBEDDING failed: {detail}")
+
+    return list(df["embedding"])
+
+
+def generate_text_embeddings(bq_client, texts, task_type=None, batch_size=None):
+    """
+    Embed many texts with a handful of BigQuery jobs.
+
+    Cached texts are served from the embedding cache; the remaining unique
+    texts are embedded in sub-batches of at most `batch_size` texts, one
+    ML.GENERATE_EMBEDDING job per sub-batch.
+
+    Args:
+        bq_client (bigquery.Client): Initialized BigQuery client.
+        texts (list[str]): Texts to embed.
+        task_type (str, optional): ML.GENERATE_EMBEDDING task type.
+            Defaults to the model default.
+        batch_size (int, optional): Max texts per job.
+            Defaults to config.EMBEDDING_BATCH_SIZE.
+
+    Returns:
+        list[list[float]]: One JSON-serializable vector per input text, in input order.
+    """
+    batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+    _embedding_options(task_type)  # validate before touching the cache
+    cache = get_embedding_cache()
+
+    keys = [make_cache_key(EMBEDDING_MODEL_KEY, task_type, text) for text in texts]
+    vectors = {}
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key in vectors or key in pending:
+            continue
+        cached = cache.get(key)
+        if cached is not None:
+            vectors[key] = cached
+        else:
+            pending[key] = text
+
+    pending_items = list(pending.items())
+    for i in range(0, len(pending_items), batch_size):
+        batch = pending_items[i:i + batch_size]
+        print(f"▶️ Embedding {len(batch)} texts ({i + len(batch)}/{len(pending_items)})")
+        embeddings = _query_embeddings(bq_client, [text for _, text in batch], task_type)
+        for (key, _), embedding in zip(batch, embeddings):
+            vectors[key] = cache.put(key, embedding)
+
+    # Convert to plain Python lists for JSON serialization
+    return [[float(x) for x in vectors[key]] for key in keys]
+
+
 # -----------------------------
 # Generate Transcript Embeddings
 # -----------------------------
-def generate_transcript_embedding(bq_client, transcript_text):
+def generate_transcript_embedding(bq_client, transcript_text, task_type=None):
     """
     Generate a vector embedding for a transcript using a remote BigQuery ML model.
+    Embeddings are served from the shared embedding cache when the same
+    text was embedded before.
 
     Args:
         bq_client (bigquery.Client): Initialized BigQuery client.
         transcript_text (str): Transcript text to embed.
+        task_type (str, optional): ML.GENERATE_EMBEDDING task type.
+            Defaults to the model default.
 
     Returns:
         list[float]: JSON-serializable embedding vector.
     """
-    # Escape single quotes for SQL
-    safe_transcript = transcript_text.replace("'", "\\'")
-
-    query = f"""
-    SELECT ml_generate_embedding_result AS transcript_embedding
-    FROM ML.GENERATE_EMBEDDING(
-        MODEL `{config.PROJECT_ID}.{config.DATASET_ID}.{config.GENERATIVE_AI_EMBEDDING_MODEL_ID}`,
-        (SELECT '{safe_transcript}' AS content),
-        STRUCT(TRUE AS flatten_json_output)
-    )
-    """
-
-    # Execute query and fetch embedding
-    df = bq_client.query(query).to_dataframe()
-    embedding = df["transcript_embedding"].iloc[0]
+    return generate_text_embeddings(bq_client, [transcript_text], task_type)[0]
 
-    # Convert to plain Python list for JSON serialization
-    return [float(x) for x in embedding]
 
 # -----------------------------
 # Fetch Similar Past Cases
 # -----------------------------
 def fetch_similar_cases(bq_client: bigquery.Client, embedding: list, top_k: int = 3) -> pd.DataFrame:
     """
-    Perform a semantic search in BigQuery using VECTOR_SEARCH and retrieve
-    top_k similar cases based on transcript embeddings.
+    Retrieve the top_k past cases most similar to a transcript embedding.
+
+    With CASE_INDEX_ENABLED, the search runs against the local case index
+    (cosine distance), which syncs from the table on a background thread.
+    Until its first sync has stored any rows, when disabled, or if the
+    index fails, a VECTOR_SEARCH job is run.
 
     Args:
         bq_client (bigquery.Client): Initialized BigQuery client.
@@ -60,22 +165,41 @@ def fetch_similar_cases(bq_client: bigquery.Client, embedding: list, top_k: int
             - transcript
             - metrics
             - therapy_plan
+            - words_df (decoded word-level analysis DataFrame)
             - processed_at
             - distance
     """
+    if config.CASE_INDEX_ENABLED:
+        try:
+            index = get_case_index()
+            index.sync_in_background(bq_client)
+            if len(index):
+                similar_df = index.search(embedding, top_k)
+                similar_df["words_df"] = similar_df["words_df"].apply(decode_words_df)
+                return similar_df
+        except Exception as e:
+            print(f"❌ Case index unavailable, falling back to VECTOR_SEARCH: {e}")
+
+    return _vector_search_cases(bq_client, embedding, top_k)
+
+
+def _vector_search_cases(bq_client, embedding, top_k):
+    """VECTOR_SEARCH over the analysis results table (one BigQuery job)."""
     query = f"""
     SELECT 
         base.run_id,
         base.transcript,
         base.metrics,
         base.therapy_plan,
+        base.words_df,
         base.processed_at,
         distance
     FROM VECTOR_SEARCH(
         TABLE `{config.PROJECT_ID}.{config.DATASET_ID}.{config.ANALYSIS_RESULTS_EMBEDDINGS_TABLE_ID}`,
         'transcript_embedding',
         (SELECT @embedding AS transcript_embedding),
-        top_k => {top_k}
+        top_k => {top_k},
+        options => '{vector_search_options(bq_client, "cases")}'
     )
     ORDER BY distance ASC;
     """
@@ -92,4 +216,5 @@ def fetch_similar_cases(bq_client: bigquery.Client, embedding: list, top_k: int
 
     # Convert result to pandas DataFrame
     similar_df = job.to_dataframe()
+    similar_df["words_df"] = similar_df["words_df"].apply(decode_words_df)
     return similar_df
\ No newline at end of file
@@ -3,27 +3,177 @@
 # ==============================
 # Functions to generate text responses augmented by vector search
 # using BigQuery ML (Generative AI + embeddings).
+#
+# Chat answers run as separate steps (embed → retrieve → generate) so
+# each can be reused: question embeddings come from the embedding cache
+# and whole answers from the semantic answer cache.
 # ==============================
+from __future__ import annotations
+
+import threading
+import time
+
 import pandas as pd
-from google.cloud import bigquery
+from src.lazy_imports import lazy_import
 from src import config
+from src.answer_cache import get_answer_cache, make_context_key
+from src.bigquery_utils.embeddings import EMBEDDING_MODEL_KEY, generate_transcript_embedding
+from src.bigquery_utils.vector_indexes import vector_search_options
+from src.course_index import get_course_index
+
+bigquery = lazy_import("google.cloud.bigquery")
+
+
+# System prompt guiding AI behavior
+CHAT_SYSTEM_PROMPT = """
+    You are a knowledgeable and supportive speech therapy assistant.
+    Your role is to help people with stuttering and other speech disorders by:
+    and Understand the User Question and answer what they want.
+    Guidelines :
+    - Using information from the provided Document Content when available.
+    - If the context does not contain the answer, say so and give a helpful general suggestion.
+    - Explaining therapy techniques in simple and practical terms.
+    - Giving actionable advice that can be practiced at home.
+    - Providing encouragement and empathy in responses.
+    - Keeping answers concise, clear, and tailored to the user’s question.
 
-def escape_for_sql(value: str) -> str:
-        """Escape string for safe embedding into BigQuery SQL."""
-        return value.replace("'", "''").replace("\n", "\\n")
+    Answer in a professional, friendly, and supportive tone.
+"""
 
+NO_ANSWER = "No answer generated."
+ERROR_ANSWER = "An error occurred while generating the response."
+
+
+# -----------------------------
+# Document Corpus Version
+# -----------------------------
+_corpus_version = None
+_corpus_checked_at = float("-inf")
+_corpus_lock = threading.Lock()
+
+
+def document_corpus_version(bq_client) -> str | None:
+    """
+    Last-modified time of the document embeddings table, checked at most
+    every CHAT_CORPUS_VERSION_SECONDS. Cached answers are only reused
+    while it is unchanged.
+    """
+    global _corpus_version, _corpus_checked_at
+    with _corpus_lock:
+        now = time.monotonic()
+        if _corpus_version is None or now - _corpus_checked_at >= config.CHAT_CORPUS_VERSION_SECONDS:
+            modified = bq_client.get_table(
+                f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.SPEECH_DOCUMENT_EMBEDDINGS_TABLE_ID}"
+            ).modified
+            _corpus_version = modified.isoformat() if modified else None
+            _corpus_checked_at = now
+        return _corpus_version
+
+
+# -----------------------------
+# Retrieval
+# -----------------------------
+def retrieve_documents(
+    bq_client: bigquery.Client,
+    question_embedding: list,
+    top_k: int = 3,
+    fraction_lists_to_search: float = None
+) -> list[str]:
+    """
+    Retrieve the documents closest to a question embedding (VECTOR_SEARCH).
+
+    Args:
+        bq_client: Initialized BigQuery client.
+        question_embedding: Embedding of the user question.
+        top_k: Number of top similar documents to retrieve.
+        fraction_lists_to_search: Fraction of candidate lists to search (for speed).
+            Defaults to VECTOR_SEARCH_FRACTION_DOCUMENTS; ignored while the
+            table is searched by brute force.
+
+    Returns:
+        list[str]: Document contents, nearest first.
+    """
+    query = f"""
+    SELECT base.content
+    FROM VECTOR_SEARCH(
+        TABLE `{config.PROJECT_ID}.{config.DATASET_ID}.{config.SPEECH_DOCUMENT_EMBEDDINGS_TABLE_ID}`,
+        'text_embeddings',
+        (SELECT @question_embedding AS text_embeddings),
+        top_k => {top_k},
+        options => '{vector_search_options(bq_client, "documents", fraction_lists_to_search)}'
+    )
+    ORDER BY distance
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ArrayQueryParameter("question_embedding", "FLOAT64", list(map(float, question_embedding)))]
+    )
+    return [row.content for row in bq_client.query(query, job_config=job_config).result()]
+
+
+# -----------------------------
+# Generation
+# -----------------------------
+def build_chat_prompt(user_question: str, documents: list[str], system_prompt: str = CHAT_SYSTEM_PROMPT) -> str:
+    """Prompt for ML.GENERATE_TEXT: system prompt, question, then the retrieved documents."""
+    context = ",".join(f"Document Content: {doc}" for doc in documents)
+    return f"{system_prompt} and User Question: {user_question}{context}"
+
+
+def generate_answer(
+    bq_client: bigquery.Client,
+    prompt: str,
+    max_output_tokens: int = 2000,
+    temperature: float = 0.2,
+    top_p: float = 0.9
+) -> str | None:
+    """
+    Generate text for a prompt with ML.GENERATE_TEXT.
+
+    Returns:
+        str | None: Generated text, or None if the model returned nothing.
+    """
+    query = f"""
+    SELECT ml_generate_text_llm_result AS generated
+    FROM ML.GENERATE_TEXT(
+        MODEL `{config.PROJECT_ID}.{config.DATASET_ID}.{config.GENERATIVE_AI_MODEL}`,
+        (SELECT @prompt AS prompt),
+        STRUCT(
+            {int(max_output_tokens)} AS max_output_tokens,
+            {float(temperature)} AS temperature,
+            {float(top_p)} AS top_p,
+            TRUE AS flatten_json_output
+        )
+    )
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("prompt", "STRING", prompt)]
+    )
+    row = next(iter(bq_client.query(query, job_config=job_config).result()), None)
+    return row.generated if row and row.generated else None
+
+
+# -----------------------------
+# Retrieval-Augmented Answer
+# -----------------------------
 def generate_text_with_vector_search(
     bq_client: bigquery.Client,
     user_question: str,
     top_k: int = 3,
-    fraction_lists_to_search: float = 0.01,
+    fraction_lists_to_search: float = None,
     max_output_tokens: int = 2000,
     temperature: float = 0.2,
-    top_p: float = 0.9
+    top_p: float = 0.9,
+    system_prompt: str = CHAT_SYSTEM_PROMPT,
+    use_cache: bool = True
 ) -> str:
     """
     Generate AI text response augmented by vector search results.
 
+    The question embedding comes from the embedding cache. With
+    CHAT_ANSWER_CACHE_ENABLED, an answer to a semantically equivalent
+    question (same corpus version and settings) is returned without
+    retrieval or generation.
+
     Args:
         bq_client: Initialized BigQuery client.
         user_question: User’s question to the AI assistant.
@@ -32,103 +182,97 @@ def generate_text_with_vector_search(
         max_output_tokens: Max tokens for LLM generation.
         temperature: LLM temperature for randomness.
         top_p: LLM top-p probability for nucleus sampling.
+        system_prompt: Instructions placed before the question.
+        use_cache: Look up and store answers in the semantic answer cache.
 
     Returns:
         str: Generated response from AI assistant.
     """
-    
-    # System prompt guiding AI behavior
-    system_prompt = """
-        You are a knowledgeable and supportive speech therapy assistant.
-        Your role is to help people with stuttering and other speech disorders by:
-        and Understand the User Question and answer what they want.
-        Guidelines :
-        - Using information from the provided Document Content when available.
-        - If the context does not contain the answer, say so and give a helpful general suggestion.
-        - Explaining therapy techniques in simple and practical terms.
-        - Giving actionable advice that can be practiced at home.
-        - Providing encouragement and empathy in responses.
-        - Keeping answers concise, clear, and tailored to the user’s question.
-
-        Answer in a professional, friendly, and supportive tone.
-    """
-    
-    escaped_system_prompt = escape_for_sql(system_prompt)
-    escaped_user_question = escape_for_sql(user_question)
-
-    # Build the BigQuery ML.GENERATE_TEXT query with VECTOR_SEARCH
-    query = f"""
-    SELECT ml_generate_text_llm_result AS generated
-    FROM ML.GENERATE_TEXT(
-        MODEL `{config.PROJECT_ID}.{config.DATASET_ID}.{config.GENERATIVE_AI_MODEL}`,
-        (
-            SELECT CONCAT(
-                '{escaped_system_prompt} and User Question: {escaped_user_question}',
-                STRING_AGG(FORMAT('Document Content: %s', base.content))
-            ) AS prompt
-            FROM VECTOR_SEARCH(
-                TABLE `{config.PROJECT_ID}.{config.DATASET_ID}.{config.SPEECH_DOCUMENT_EMBEDDINGS_TABLE_ID}`,
-                'text_embeddings',
-                (
-                    SELECT ml_generate_embedding_result, '{escaped_user_question}' AS query_text
-                    FROM ML.GENERATE_EMBEDDING(
-                        MODEL `{config.PROJECT_ID}.{config.DATASET_ID}.{config.GENERATIVE_AI_EMBEDDING_MODEL_ID}`,
-                        (SELECT '{escaped_user_question}' AS content)
-                    )
-                ),
-                top_k => {top_k},
-                options => '{{"fraction_lists_to_search": {fraction_lists_to_search}}}'
-            )
-        ),
-        STRUCT({max_output_tokens} AS max_output_tokens, TRUE AS flatten_json_output)
-    )
-    """
-    
-    # Execute the query and return the generated response
     try:
-        results = bq_client.query(query).result()
-        row = next(results, None)
-        return row.generated if row else "No answer generated."
+        question_embedding = generate_transcript_embedding(bq_client, user_question)
+
+        cache = corpus_version = context_key = None
+        if use_cache and config.CHAT_ANSWER_CACHE_ENABLED:
+            try:
+                corpus_version = document_corpus_version(bq_client)
+            except Exception as e:
+                print(f"❌ Document corpus version unavailable, answer cache skipped: {e}")
+            if corpus_version:
+                cache = get_answer_cache()
+                context_key = make_context_key(
+                    config.GENERATIVE_AI_MODEL, EMBEDDING_MODEL_KEY, system_prompt,
+                    top_k, fraction_lists_to_search, max_output_tokens, temperature, top_p
+                )
+                hit = cache.lookup(question_embedding, corpus_version, context_key)
+                if hit:
+                    print(f"✅ Answer cache hit (distance {hit['distance']:.4f}): {hit['question']!r:.80}")
+                    return hit["answer"]
+
+        documents = retrieve_documents(bq_client, question_embedding, top_k, fraction_lists_to_search)
+        answer = generate_answer(
+            bq_client, build_chat_prompt(user_question, documents, system_prompt),
+            max_output_tokens, temperature, top_p
+        )
+        if answer is None:
+            return NO_ANSWER
+
+        if cache is not None:
+            cache.store(user_question, question_embedding, answer, corpus_version, context_key)
+        return answer
     except Exception as e:
         print(f"❌ An error occurred: {e}")
-        return "An error occurred while generating the response."
+        return ERROR_ANSWER
     
 
-def fetch_top_courses_vector_search(bq_client: bigquery.Client, user_query: str, top_k: int = 5, fraction_lists_to_search: float = 1.0) -> pd.DataFrame:
+def fetch_top_courses_vector_search(bq_client: bigquery.Client, user_query: str, top_k: int = 5, fraction_lists_to_search: float = None) -> pd.DataFrame:
     """
-    Fetch top-K courses based on vector similarity to user_query using Gemini embeddings and VECTOR_SEARCH.
-    Embeddings are generated directly in BigQuery.
+    Fetch top-K courses based on vector similarity to user_query using Gemini embeddings.
+    The query embedding is served from the embedding cache and, with
+    COURSE_INDEX_ENABLED, the search runs against the in-process course
+    index (cosine distance); otherwise, or if the index can't be loaded,
+    a VECTOR_SEARCH job is run.
 
     Args:
         bq_client (bigquery.Client): Initialized BigQuery client
         user_query (str): Text query for which similar courses are retrieved
         top_k (int, optional): Number of top courses to return. Defaults to 5.
-        fraction_lists_to_search (float, optional): Fraction of index lists to search. Defaults to 1.0.
+        fraction_lists_to_search (float, optional): Fraction of index lists to search
+            (VECTOR_SEARCH fallback only). Defaults to VECTOR_SEARCH_FRACTION_COURSES.
 
     Returns:
         pd.DataFrame: DataFrame with columns: course_id, title, description, category, url, distance
     """
     user_query_easy = 'powerful speeches with confidence'
+    query_embedding = generate_transcript_embedding(bq_client, user_query_easy)
+
+    if config.COURSE_INDEX_ENABLED:
+        try:
+            index = get_course_index()
+            index.refresh(bq_client)
+            return index.search(query_embedding, top_k)
+        except Exception as e:
+            print(f"❌ Course index unavailable, falling back to VECTOR_SEARCH: {e}")
+
+    return _vector_search_courses(bq_client, query_embedding, top_k, fraction_lists_to_search)
+
+
+def _vector_search_courses(bq_client, query_embedding, top_k, fraction_lists_to_search):
+    """VECTOR_SEARCH over the course table (one BigQuery job)."""
     query = f"""
     SELECT *
     FROM VECTOR_SEARCH(
         TABLE `{config.PROJECT_ID}.{config.DATASET_ID}.{config.COURSE_TABLE_ID}`,
         'course_embedding',
-        (SELECT ml_generate_embedding_result
-         FROM ML.GENERATE_EMBEDDING(
-             MODEL `{config.PROJECT_ID}.{config.DATASET_ID}.{config.GENERATIVE_AI_EMBEDDING_MODEL_ID}`,
-             (SELECT @query AS content)
-         )
-        ),
+        (SELECT @query_embedding AS course_embedding),
         top_k => {top_k},
-        options => '{{"fraction_lists_to_search": {fraction_lists_to_search}}}'
+        options => '{vector_search_options(bq_client, "courses", fraction_lists_to_search)}'
     )
     """
 
     job = bq_client.query(
         query,
         job_config=bigquery.QueryJobConfig(
-            query_parameters=[bigquery.ScalarQueryParameter("query", "STRING", user_query_easy)]
+            query_parameters=[bigquery.ArrayQueryParameter("query_embedding", "FLOAT64", query_embedding)]
         )
     )
 
@@ -144,4 +288,4 @@ def fetch_top_courses_vector_search(bq_client: bigquery.Client, user_query: str,
     # Keep only relevant columns
     df = df[['course_id', 'title', 'description', 'category', 'url', 'distance']]
 
-    return df
\ No newline at end of file
+    return df
@@ -5,34 +5,209 @@
 # and store results back in BigQuery.
 # ==============================================
 
+from __future__ import annotations
+
 import json,os
-from google.cloud import bigquery
+import pandas as pd
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, asdict
+from google.api_core.exceptions import NotFound
+from src.lazy_imports import lazy_import
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from src import config
-from google import genai
+from src.write_spool import get_write_spool, LOAD
+from src.clients import get_genai_client
 
-# Absolute path to credentials
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), f"../{config.SERVICE_ACCOUNT_KEY_FILE_PATH}")
-)
+bigquery = lazy_import("google.cloud.bigquery")
 
-def transcribe_audio(gcs_uri: str, bq_client: bigquery.Client):
+# -----------------------------
+# Shared Helpers
+# -----------------------------
+def _add_timestamps(transcripts):
+    """Add processed_at (UTC) and processed_at_ist columns in place."""
+    utc_now = datetime.now(ZoneInfo("UTC"))
+    ist_now = utc_now.astimezone(ZoneInfo("Asia/Kolkata"))
+    transcripts["processed_at"] = utc_now
+    transcripts["processed_at_ist"] = ist_now.replace(tzinfo=None)
+
+
+def _store_transcripts(transcripts, bq_client):
     """
-    Transcribe audio stored in GCS using BigQuery ML.TRANSCRIBE.
-    
+    Queue transcript rows for the transcripts table.
+    Rows go through the write-behind spool and are appended by load job.
+    """
+    table_id = f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.TRANSCRIBE_TABLE_ID}"
+    rows = json.loads(transcripts.to_json(orient="records", date_format="iso"))
+    row_ids = [f"{row['uri']}@{row['processed_at']}" for row in rows]
+    get_write_spool(bq_client).enqueue(table_id, rows, row_ids, mode=LOAD)
+    print(f"✅ Queued {len(rows)} transcripts for {table_id}")
+
+
+def _shift_payload(result_json, seconds):
+    """Add `seconds` to every word offset in one ml_transcribe_result payload."""
+    is_text = isinstance(result_json, str)
+    data = json.loads(result_json) if is_text else result_json
+    for top_result in data.get("results", {}).values():
+        transcript = top_result.get("inline_result", {}).get("transcript", {})
+        for result in transcript.get("results", []):
+            for alternative in result.get("alternatives", []):
+                for word in alternative.get("words", []):
+                    # Zero durations are omitted from the proto JSON
+                    for key in ("start_offset", "end_offset"):
+                        word[key] = f"{float(word.get(key, '0s').rstrip('s')) + seconds:.3f}s"
+    return json.dumps(data) if is_text else data
+
+
+def shift_word_offsets(transcripts, seconds):
+    """
+    Shift word timestamps by `seconds` in place, e.g. to map offsets in
+    silence-trimmed audio back onto the original recording.
+
+    Args:
+        transcripts (pd.DataFrame): ML.TRANSCRIBE rows with 'ml_transcribe_result'
+        seconds (float): Offset to add
+
+    Returns:
+        pd.DataFrame: `transcripts`
+    """
+    if seconds and "ml_transcribe_result" in transcripts.columns:
+        transcripts["ml_transcribe_result"] = [
+            _shift_payload(payload, seconds) if payload else payload
+            for payload in transcripts["ml_transcribe_result"]
+        ]
+    return transcripts
+
+
+def fetch_existing_transcript(gcs_uri: str, bq_client: bigquery.Client):
+    """
+    Look up a stored transcript for an audio URI.
+
+    Audio blobs are content-addressed (see upload_to_gcs.audio_blob_name),
+    so a hit means this exact recording was already transcribed. Rows still
+    waiting in the write spool are checked first.
+
     Args:
         gcs_uri (str): Full GCS path to the audio file.
         bq_client (bigquery.Client): Initialized BigQuery client.
 
     Returns:
-        tuple:
-            (True, transcripts: pd.DataFrame) on success
-            (False, message: str) on failure
+        pd.DataFrame | None: One transcripts-table row, or None on a miss.
+    """
+    table_id = f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.TRANSCRIBE_TABLE_ID}"
+
+    spooled = [row for row in get_write_spool().pending_rows(table_id) if row.get("uri") == gcs_uri]
+    if spooled:
+        return pd.DataFrame(spooled[-1:])
+
+    query = f"""
+        SELECT *
+        FROM `{table_id}`
+        WHERE uri = @uri AND transcripts IS NOT NULL AND transcripts != ''
+        ORDER BY processed_at DESC
+        LIMIT 1
     """
+    try:
+        df = bq_client.query(
+            query,
+            job_config=bigquery.QueryJobConfig(
+                query_parameters=[bigquery.ScalarQueryParameter("uri", "STRING", gcs_uri)]
+            )
+        ).to_dataframe()
+    except NotFound:
+        return None
+
+    return df if not df.empty else None
+
+
+# -----------------------------
+# Transcription Job Handles
+# -----------------------------
+# Serializes the "already stored?" check and the store in poll_transcription
+_store_lock = threading.Lock()
+
+@dataclass
+class TranscriptionJob:
+    """
+    Persisted handle for an ML.TRANSCRIBE query job.
+
+    Attributes:
+        job_id (str): BigQuery job ID
+        uri (str): GCS URI being transcribed
+        submitted_at (str): ISO-8601 UTC submit time
+        location (str | None): BigQuery job location
+        stored (bool): Whether the result was queued for the transcripts table
+        audio_offset (float): Seconds trimmed from the start of the original
+            recording; word timestamps are shifted back by this much
+        segments (list[dict] | None): For a long recording transcribed in
+            pieces, {'uri', 'offset', 'duration'} per segment; `uri` is
+            then the key the merged transcript is stored under
+    """
+    job_id: str
+    uri: str
+    submitted_at: str
+    location: str = None
+    stored: bool = False
+    audio_offset: float = 0.0
+    segments: list = None
+
+    def to_dict(self):
+        return asdict(self)
 
-    print(f"▶️ Starting transcription for: {gcs_uri}")
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
 
+
+def _jobs_dir():
+    path = os.path.join(config.CACHE_DIR, "transcription_jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _job_path(uri):
+    return os.path.join(_jobs_dir(), hashlib.sha256(uri.encode("utf-8")).hexdigest() + ".json")
+
+
+def save_transcription_job(handle: TranscriptionJob):
+    """Persist a job handle (one file per URI, replaced atomically)."""
+    path = _job_path(handle.uri)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(handle.to_dict(), f)
+    os.replace(tmp_path, path)
+
+
+def load_transcription_job(uri=None, job_id=None):
+    """
+    Find a persisted job handle by GCS URI or by BigQuery job ID.
+
+    Returns:
+        TranscriptionJob | None
+    """
+    if uri is not None:
+        paths = [_job_path(uri)]
+    else:
+        paths = [os.path.join(_jobs_dir(), name) for name in os.listdir(_jobs_dir()) if name.endswith(".json")]
+
+    for path in paths:
+        try:
+            with open(path) as f:
+                handle = TranscriptionJob.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            continue
+        if job_id is None or handle.job_id == job_id:
+            return handle
+    return None
+
+
+def _transcribe_query(uri_filter):
+    """
+    Build the ML.TRANSCRIBE query over the audio objects matching `uri_filter`
+    (a SQL predicate on the object table's uri column).
+    """
     # Recognition config for ML.TRANSCRIBE
     recognition_config = {
         "model": config.SPEECH_MODEL_NAME,
@@ -45,54 +220,355 @@ def transcribe_audio(gcs_uri: str, bq_client: bigquery.Client):
     }
     config_str = json.dumps(recognition_config).replace("'", "\\'")
 
-    query = f"""
+    return f"""
         SELECT *
         FROM ML.TRANSCRIBE(
             MODEL `{config.PROJECT_ID}.{config.DATASET_ID}.{config.SPEECH_MODEL_ID}`,
             (
                 SELECT uri, content_type
                 FROM `{config.PROJECT_ID}.{config.DATASET_ID}.{config.AUDIO_OBJECT_TABLE_ID}`
-                WHERE uri = '{gcs_uri}'
+                WHERE {uri_filter}
             ),
             RECOGNITION_CONFIG => (JSON '{config_str}')
         )
     """
 
-    print("▶️ Running BigQuery ML.TRANSCRIBE…")
-    job = bq_client.query(query)
+
+def submit_transcription(gcs_uri: str, bq_client: bigquery.Client, reattach: bool = True,
+                         audio_offset: float = 0.0, segments: list = None) -> TranscriptionJob:
+    """
+    Start ML.TRANSCRIBE for an audio file without waiting for it.
+
+    If a job for the same URI was already submitted (from this or an
+    earlier session), its handle is returned instead of starting a new
+    transcription while that job is still running, or once it has
+    finished with a usable transcript. A finished job that failed, or
+    whose row carries an ml_transcribe_status error or no transcript, is
+    not reused.
+
+    Args:
+        gcs_uri (str): Full GCS path to the audio file.
+        bq_client (bigquery.Client): Initialized BigQuery client.
+        reattach (bool): Reuse an existing job for this URI when possible.
+        audio_offset (float): Seconds trimmed from the start of the original
+            audio before upload (see src.audio_preprocess).
+        segments (list[dict], optional): Uploaded pieces of a long recording,
+            {'uri', 'offset', 'duration'} each (offsets in the original
+            recording). They are transcribed in one query and merged into a
+            single transcript stored under `gcs_uri`.
+
+    Returns:
+        TranscriptionJob: Persisted job handle.
+    """
+    if reattach:
+        handle = load_transcription_job(uri=gcs_uri)
+        if handle is not None:
+            try:
+                job = bq_client.get_job(handle.job_id, location=handle.location)
+                usable = job.state != "DONE" or handle.stored or _job_result(handle, job)[0]
+                if job.error_result is None and usable:
+                    print(f"▶️ Reattached to transcription job {handle.job_id} for {gcs_uri}")
+                    return handle
+                print(f"▶️ Earlier transcription job {handle.job_id} for {gcs_uri} has no usable transcript; resubmitting")
+            except Exception as e:
+                print(f"❌ Could not reattach to job {handle.job_id}: {e}")
+
+    if segments:
+        # One query over all segments; ML.TRANSCRIBE processes the rows in parallel
+        print(f"▶️ Starting transcription for: {gcs_uri} ({len(segments)} segments)")
+        job = bq_client.query(
+            _transcribe_query("uri IN UNNEST(@uris)"),
+            job_config=bigquery.QueryJobConfig(
+                query_parameters=[bigquery.ArrayQueryParameter("uris", "STRING", [s["uri"] for s in segments])]
+            )
+        )
+    else:
+        print(f"▶️ Starting transcription for: {gcs_uri}")
+        job = bq_client.query(
+            _transcribe_query("uri = @uri"),
+            job_config=bigquery.QueryJobConfig(
+                query_parameters=[bigquery.ScalarQueryParameter("uri", "STRING", gcs_uri)]
+            )
+        )
     print(f"   Job ID: {job.job_id}")
 
+    handle = TranscriptionJob(
+        job_id=job.job_id,
+        uri=gcs_uri,
+        submitted_at=datetime.now(ZoneInfo("UTC")).isoformat(),
+        location=job.location,
+        audio_offset=audio_offset,
+        segments=segments
+    )
+    save_transcription_job(handle)
+    return handle
+
+
+def poll_transcription(handle: TranscriptionJob, bq_client: bigquery.Client):
+    """
+    Check a transcription job without blocking.
+
+    When the job has finished, its rows are written to the transcripts
+    table (once per job, even if several sessions poll the same handle).
+
+    Args:
+        handle (TranscriptionJob): Handle from submit_transcription.
+        bq_client (bigquery.Client): Initialized BigQuery client.
+
+    Returns:
+        tuple:
+            (None, state: str) while the job is still running
+            (True, transcripts: pd.DataFrame) on success
+            (False, message: str) on failure
+    """
+    job = bq_client.get_job(handle.job_id, location=handle.location)
+    if job.state != "DONE":
+        return None, job.state
+
+    ok, transcripts = _job_result(handle, job)
+    if not ok:
+        return False, transcripts
+
+    _add_timestamps(transcripts)
+    # Stored timestamps refer to the original (untrimmed) recording
+    shift_word_offsets(transcripts, handle.audio_offset)
+
+    # `handle` may be a stale copy (e.g. from Streamlit session state), so
+    # the persisted handle decides whether this job's rows were queued
+    with _store_lock:
+        persisted = load_transcription_job(uri=handle.uri)
+        if persisted is not None and persisted.job_id == handle.job_id and persisted.stored:
+            handle.stored = True
+        if not handle.stored:
+            _store_transcripts(transcripts, bq_client)
+            handle.stored = True
+            save_transcription_job(handle)
+            print("✅ Transcription complete and queued for BigQuery!")
+
+    return True, transcripts
+
+
+def _job_result(handle, job):
+    """
+    Transcript rows of a finished ML.TRANSCRIBE job.
+
+    Returns:
+        tuple: (True, transcripts: pd.DataFrame) or (False, message: str)
+            when the job failed or produced no transcript
+    """
+    if job.error_result:
+        msg = f"❌ No transcript generated for {handle.uri}. Because {job.error_result.get('message')}. Exiting pipeline."
+        return False, msg
+
     transcripts = job.to_dataframe()
     print(f"✅ Query finished. Rows returned: {len(transcripts)}")
-    
+
+    if handle.segments:
+        merged = merge_segment_transcripts(transcripts, handle.uri, handle.segments)
+        if isinstance(merged, str):
+            return False, f"❌ No transcript generated for {handle.uri}. Because {merged}. Exiting pipeline."
+        transcripts = merged
+
     # ⛔ Early exit if no transcripts
-    if transcripts.empty or "transcripts" not in transcripts.columns:
+    if transcripts.empty or "transcripts" not in transcripts.columns or not _has_transcript(transcripts):
         if "ml_transcribe_status" in transcripts.columns and not transcripts["ml_transcribe_status"].empty:
             error_detail = transcripts["ml_transcribe_status"].iloc[0]  # first value
         else:
             error_detail = "Unknown error"
 
-        msg = f"❌ No transcript generated for {gcs_uri}. Because {error_detail}. Exiting pipeline."
+        msg = f"❌ No transcript generated for {handle.uri}. Because {error_detail}. Exiting pipeline."
         return False, msg
 
-    # Add timestamps
-    utc_now = datetime.now(ZoneInfo("UTC"))
-    ist_now = utc_now.astimezone(ZoneInfo("Asia/Kolkata"))
-    transcripts["processed_at"] = utc_now
-    transcripts["processed_at_ist"] = ist_now.replace(tzinfo=None)
+    return True, transcripts
 
-    # Write results back to BigQuery
-    table_id = f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.TRANSCRIBE_TABLE_ID}"
-    print(f"▶️ Writing transcripts to {table_id} …")
-    load_job = bq_client.load_table_from_dataframe(
-        dataframe=transcripts,
-        destination=table_id,
-        job_config=bigquery.LoadJobConfig(write_disposition="WRITE_APPEND")
+
+def _has_transcript(transcripts):
+    """True when the first row has transcript text and no ml_transcribe_status error."""
+    text = transcripts["transcripts"].iloc[0]
+    status = transcripts["ml_transcribe_status"].iloc[0] if "ml_transcribe_status" in transcripts.columns else ""
+    return isinstance(text, str) and text.strip() != "" and not (isinstance(status, str) and status.strip())
+
+
+def wait_for_transcription(handle: TranscriptionJob, bq_client: bigquery.Client, poll_interval: float = None, timeout: float = None):
+    """
+    Block until a transcription job finishes (see poll_transcription).
+
+    Returns:
+        tuple: (True, transcripts) or (False, message)
+    """
+    poll_interval = poll_interval or config.TRANSCRIPTION_POLL_SECONDS
+    deadline = time.monotonic() + timeout if timeout else None
+
+    while True:
+        status, result = poll_transcription(handle, bq_client)
+        if status is not None:
+            return status, result
+        if deadline and time.monotonic() > deadline:
+            return False, f"❌ Transcription of {handle.uri} timed out (job {handle.job_id})."
+        time.sleep(poll_interval)
+
+
+def transcribe_audio(gcs_uri: str, bq_client: bigquery.Client):
+    """
+    Transcribe audio stored in GCS using BigQuery ML.TRANSCRIBE.
+    Blocking wrapper around submit_transcription + wait_for_transcription.
+    
+    Args:
+        gcs_uri (str): Full GCS path to the audio file.
+        bq_client (bigquery.Client): Initialized BigQuery client.
+
+    Returns:
+        tuple:
+            (True, transcripts: pd.DataFrame) on success
+            (False, message: str) on failure
+    """
+    handle = submit_transcription(gcs_uri, bq_client)
+    return wait_for_transcription(handle, bq_client)
+
+
+# -----------------------------
+# Segmented Transcription
+# -----------------------------
+def _segment_words(result_json):
+    """Word dicts of one ML.TRANSCRIBE payload (first alternative of each result)."""
+    data = json.loads(result_json) if isinstance(result_json, str) else result_json
+    words = []
+    for top_result in data.get("results", {}).values():
+        transcript = top_result.get("inline_result", {}).get("transcript", {})
+        for result in transcript.get("results", []):
+            alternatives = result.get("alternatives", [])
+            if alternatives:
+                words.extend(alternatives[0].get("words", []))
+    return words
+
+
+def _offset_seconds(word, key):
+    # Zero durations are omitted from the proto JSON
+    return float(word.get(key, "0s").rstrip("s"))
+
+
+def merge_segment_transcripts(transcripts, uri, segments):
+    """
+    Merge per-segment ML.TRANSCRIBE rows into one transcript row.
+
+    Word offsets are moved onto the original recording's timeline. Where
+    two segments overlap, the overlap is split at its midpoint: each word
+    is kept from the segment whose share contains the word's midpoint, so
+    words heard by both segments appear once.
+
+    Args:
+        transcripts (pd.DataFrame): ML.TRANSCRIBE rows, one per segment URI
+        uri (str): URI the merged row is stored under
+        segments (list[dict]): {'uri', 'offset', 'duration'} in time order
+
+    Returns:
+        pd.DataFrame | str: One row with the ML.TRANSCRIBE columns (the
+            payload keeps the shape extract_word_level reads), or an error
+            message when a segment is missing or failed.
+    """
+    rows = {row["uri"]: row for row in transcripts.to_dict(orient="records")}
+    for segment in segments:
+        row = rows.get(segment["uri"])
+        if row is None:
+            return f"segment {segment['uri']} was not transcribed"
+        if row.get("ml_transcribe_status"):
+            return f"segment {segment['uri']} failed: {row['ml_transcribe_status']}"
+
+    # Cut points: midpoints of the overlaps between neighbouring segments
+    cuts = [
+        (current["offset"] + current["duration"] + following["offset"]) / 2
+        for current, following in zip(segments[:-1], segments[1:])
+    ]
+    bounds = [float("-inf"), *cuts, float("inf")]
+
+    merged_words = []
+    for segment, lo, hi in zip(segments, bounds[:-1], bounds[1:]):
+        payload = rows[segment["uri"]].get("ml_transcribe_result")
+        for word in _segment_words(payload) if payload else []:
+            start = _offset_seconds(word, "start_offset") + segment["offset"]
+            end = _offset_seconds(word, "end_offset") + segment["offset"]
+            if lo <= (start + end) / 2 < hi:
+                merged_words.append({**word, "start_offset": f"{start:.3f}s", "end_offset": f"{end:.3f}s"})
+
+    text = " ".join(word["word"] for word in merged_words)
+    payload = {"results": {uri: {"inline_result": {"transcript": {
+        "results": [{"alternatives": [{"transcript": text, "words": merged_words}]}]
+    }}}}}
+
+    merged = dict(rows[segments[0]["uri"]])
+    merged.update({
+        "uri": uri,
+        "transcripts": text,
+        "ml_transcribe_result": json.dumps(payload),
+        "ml_transcribe_status": "",
+    })
+    return pd.DataFrame([merged], columns=transcripts.columns)
+
+
+# -----------------------------
+# Batch Transcription
+# -----------------------------
+def transcribe_audio_batch(gcs_uris: list, bq_client: bigquery.Client):
+    """
+    Transcribe many audio files with a single ML.TRANSCRIBE query.
+
+    URIs are passed as an array query parameter; all successful rows are
+    appended to the transcripts table with one load job.
+
+    Args:
+        gcs_uris (list[str]): GCS paths of audio files in the object table.
+        bq_client (bigquery.Client): Initialized BigQuery client.
+
+    Returns:
+        tuple:
+            transcripts (dict[str, pd.DataFrame]): One-row DataFrame per
+                successfully transcribed URI (same shape transcribe_audio returns).
+            failures (dict[str, str]): URI → ml_transcribe_status (or reason).
+    """
+    gcs_uris = list(dict.fromkeys(gcs_uris))
+    if not gcs_uris:
+        return {}, {}
+
+    print(f"▶️ Starting batch transcription for {len(gcs_uris)} files")
+    job = bq_client.query(
+        _transcribe_query("uri IN UNNEST(@uris)"),
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("uris", "STRING", gcs_uris)]
+        )
     )
-    load_job.result()
-    print("✅ Transcription complete and stored in BigQuery!")
+    print(f"   Job ID: {job.job_id}")
 
-    return True, transcripts
+    results = job.to_dataframe()
+    print(f"✅ Query finished. Rows returned: {len(results)}")
+
+    status = (
+        results["ml_transcribe_status"].fillna("").astype(str)
+        if "ml_transcribe_status" in results.columns else pd.Series("", index=results.index)
+    )
+    text = (
+        results["transcripts"].fillna("").astype(str)
+        if "transcripts" in results.columns else pd.Series("", index=results.index)
+    )
+    ok = (status == "") & (text != "")
+
+    failures = {
+        uri: detail or "Empty transcript"
+        for uri, detail in zip(results.loc[~ok, "uri"], status[~ok])
+    }
+    for uri in set(gcs_uris) - set(results["uri"] if "uri" in results.columns else []):
+        failures[uri] = "Not found in the audio object table"
+
+    succeeded = results[ok].reset_index(drop=True)
+    if not succeeded.empty:
+        _add_timestamps(succeeded)
+        _store_transcripts(succeeded, bq_client)
+        print(f"✅ Stored {len(succeeded)} transcripts ({len(failures)} failed)")
+
+    transcripts = {
+        uri: group.reset_index(drop=True)
+        for uri, group in succeeded.groupby("uri", sort=False)
+    }
+    return transcripts, failures
 
 
 def fetch_ai_sample_texts(category: str) -> list:
@@ -107,8 +583,8 @@ def fetch_ai_sample_texts(category: str) -> list:
         List[str]: List of generated sample texts
     """
 
-    # Initialize the client (make sure you have set GOOGLE_APPLICATION_CREDENTIALS)
-    client = genai.Client(vertexai=True,project=config.PROJECT_ID, location="global")
+    # Shared Gemini client (created once per process)
+    client = get_genai_client("global")
 
     max_tokens = config.category_max_tokens.get(category, 150)
 
@@ -0,0 +1,259 @@
+# ==============================
+# src/bigquery_utils/vector_indexes.py
+# ==============================
+# Lifecycle of the BigQuery vector indexes on every embedding column.
+#
+#   ensure_vector_indexes   create missing indexes, rebuild ones whose
+#                           list count no longer fits the table size
+#   wait_until_ready        poll INFORMATION_SCHEMA.VECTOR_INDEXES until an
+#                           index is ACTIVE with enough coverage
+#   vector_search_options   OPTIONS for a VECTOR_SEARCH call site: the
+#                           index with that site's fraction_lists_to_search
+#                           when it is usable, brute force otherwise
+#
+# BigQuery refuses indexes on tables below VECTOR_INDEX_MIN_ROWS rows,
+# and an exact scan is cheap there anyway, so small tables stay on brute
+# force. Index status is cached for VECTOR_INDEX_STATUS_SECONDS so call
+# sites don't pay an INFORMATION_SCHEMA query per search.
+
+from __future__ import annotations
+
+import json
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from src.lazy_imports import lazy_import
+from src import config
+
+bigquery = lazy_import("google.cloud.bigquery")
+
+
+@dataclass(frozen=True)
+class VectorIndexSpec:
+    """
+    One vector index on an embedding column.
+
+    Attributes:
+        name (str): Index name
+        table (str): Table id within the dataset
+        column (str): ARRAY<FLOAT64> embedding column
+        index_type (str): 'IVF' or 'TREE_AH'
+        fraction_lists_to_search (float): Default for this call site
+    """
+    name: str
+    table: str
+    column: str
+    index_type: str = "IVF"
+    fraction_lists_to_search: float = 0.05
+
+    @property
+    def table_id(self):
+        return f"{config.PROJECT_ID}.{config.DATASET_ID}.{self.table}"
+
+
+@dataclass
+class VectorIndexStatus:
+    """
+    Observed state of an index.
+
+    Attributes:
+        exists (bool): Index is defined on the table
+        status (str | None): INFORMATION_SCHEMA index_status ('ACTIVE', ...)
+        coverage (float): Percent of table rows indexed
+        num_lists (int | None): IVF lists (None for TREE_AH or unknown)
+        table_rows (int): Rows in the table
+    """
+    exists: bool = False
+    status: str = None
+    coverage: float = 0.0
+    num_lists: int = None
+    table_rows: int = 0
+
+    @property
+    def usable(self):
+        return (
+            self.exists and self.status == "ACTIVE"
+            and self.coverage >= config.VECTOR_INDEX_MIN_COVERAGE
+        )
+
+
+# Call site → index on the column it searches
+VECTOR_INDEXES = {
+    "documents": VectorIndexSpec(
+        "speech_documents_index", config.SPEECH_DOCUMENT_EMBEDDINGS_TABLE_ID, "text_embeddings",
+        index_type="TREE_AH", fraction_lists_to_search=config.VECTOR_SEARCH_FRACTION_DOCUMENTS
+    ),
+    "cases": VectorIndexSpec(
+        "analysis_results_index", config.ANALYSIS_RESULTS_EMBEDDINGS_TABLE_ID, "transcript_embedding",
+        fraction_lists_to_search=config.VECTOR_SEARCH_FRACTION_CASES
+    ),
+    "courses": VectorIndexSpec(
+        "courses_index", config.COURSE_TABLE_ID, "course_embedding",
+        fraction_lists_to_search=config.VECTOR_SEARCH_FRACTION_COURSES
+    ),
+}
+
+
+def ivf_num_lists(rows: int) -> int:
+    """IVF list count for a table size: ~sqrt(rows), within BigQuery's 1..5000."""
+    return max(1, min(5000, int(math.sqrt(max(rows, 1)))))
+
+
+# -----------------------------
+# Status
+# -----------------------------
+def get_index_status(bq_client, spec: VectorIndexSpec) -> VectorIndexStatus:
+    """
+    Read an index's status and coverage from INFORMATION_SCHEMA.VECTOR_INDEXES.
+    """
+    table_rows = bq_client.get_table(spec.table_id).num_rows or 0
+    query = f"""
+    SELECT index_status, coverage_percentage, ddl
+    FROM `{config.PROJECT_ID}.{config.DATASET_ID}.INFORMATION_SCHEMA.VECTOR_INDEXES`
+    WHERE table_name = @table_name AND index_name = @index_name
+    """
+    rows = list(bq_client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("table_name", "STRING", spec.table),
+            bigquery.ScalarQueryParameter("index_name", "STRING", spec.name),
+        ])
+    ).result())
+    if not rows:
+        return VectorIndexStatus(table_rows=table_rows)
+
+    row = rows[0]
+    match = re.search(r'num_lists\\?"?\s*:\s*(\d+)', row.ddl or "")
+    return VectorIndexStatus(
+        exists=True,
+        status=row.index_status,
+        coverage=float(row.coverage_percentage or 0),
+        num_lists=int(match.group(1)) if match else None,
+        table_rows=table_rows
+    )
+
+
+_status_cache = {}   # call site → (checked_at, VectorIndexStatus)
+_status_lock = threading.Lock()
+
+
+def cached_index_status(bq_client, site: str) -> VectorIndexStatus:
+    """get_index_status for a call site, re-read at most every VECTOR_INDEX_STATUS_SECONDS."""
+    with _status_lock:
+        cached = _status_cache.get(site)
+        if cached and time.monotonic() - cached[0] < config.VECTOR_INDEX_STATUS_SECONDS:
+            return cached[1]
+    status = get_index_status(bq_client, VECTOR_INDEXES[site])
+    with _status_lock:
+        _status_cache[site] = (time.monotonic(), status)
+    return status
+
+
+def vector_search_options(bq_client, site: str, fraction_lists_to_search: float = None) -> str:
+    """
+    OPTIONS JSON for a VECTOR_SEARCH call site.
+
+    Args:
+        bq_client (bigquery.Client): Initialized BigQuery client
+        site (str): Key of VECTOR_INDEXES ('documents', 'cases', 'courses')
+        fraction_lists_to_search (float, optional): Override the site default
+
+    Returns:
+        str: '{"fraction_lists_to_search": f}' when the index is usable,
+            '{"use_brute_force": true}' otherwise (small table, index
+            missing/building/low coverage, or status unavailable)
+    """
+    spec = VECTOR_INDEXES[site]
+    try:
+        status = cached_index_status(bq_client, site)
+    except Exception as e:
+        print(f"❌ Vector index status unavailable for {spec.name}, using brute force: {e}")
+        return json.dumps({"use_brute_force": True})
+
+    if status.table_rows < config.VECTOR_INDEX_MIN_ROWS or not status.usable:
+        return json.dumps({"use_brute_force": True})
+    fraction = fraction_lists_to_search if fraction_lists_to_search is not None else spec.fraction_lists_to_search
+    return json.dumps({"fraction_lists_to_search": fraction})
+
+
+# -----------------------------
+# Create / Rebuild
+# -----------------------------
+def _index_options(spec: VectorIndexSpec, rows: int) -> str:
+    options = [f"index_type = '{spec.index_type}'", "distance_type = 'COSINE'"]
+    if spec.index_type == "IVF":
+        options.append(f"ivf_options = '{json.dumps({'num_lists': ivf_num_lists(rows)})}'")
+    return ", ".join(options)
+
+
+def ensure_vector_index(bq_client, spec: VectorIndexSpec, rebuild: bool = False) -> str:
+    """
+    Create the index if missing, or rebuild it when forced or when its
+    IVF list count is off by 2x or more for the current table size.
+
+    Returns:
+        str: 'skipped' (table too small), 'exists', 'created' or 'rebuilt'
+    """
+    status = get_index_status(bq_client, spec)
+    if status.table_rows < config.VECTOR_INDEX_MIN_ROWS:
+        print(f"▶️ {spec.table} has {status.table_rows} rows (< {config.VECTOR_INDEX_MIN_ROWS}), "
+              f"no index needed; searches use brute force")
+        return "skipped"
+
+    if status.exists and not rebuild and spec.index_type == "IVF" and status.num_lists:
+        ratio = ivf_num_lists(status.table_rows) / status.num_lists
+        rebuild = ratio >= 2 or ratio <= 0.5
+    if status.exists and not rebuild:
+        return "exists"
+
+    create = "CREATE OR REPLACE VECTOR INDEX" if status.exists else "CREATE VECTOR INDEX IF NOT EXISTS"
+    bq_client.query(f"""
+    {create} {spec.name}
+    ON `{spec.table_id}`({spec.column})
+    OPTIONS({_index_options(spec, status.table_rows)})
+    """).result()
+
+    with _status_lock:
+        _status_cache.clear()
+    result = "rebuilt" if status.exists else "created"
+    print(f"✅ Vector index {spec.name} {result} on {spec.table}.{spec.column} ({status.table_rows} rows)")
+    return result
+
+
+def ensure_vector_indexes(bq_client, rebuild: bool = False) -> dict:
+    """ensure_vector_index for every embedding column; returns site → result."""
+    results = {}
+    for site, spec in VECTOR_INDEXES.items():
+        try:
+            results[site] = ensure_vector_index(bq_client, spec, rebuild=rebuild)
+        except Exception as e:
+            print(f"❌ Vector index {spec.name} failed: {e}")
+            results[site] = "failed"
+    return results
+
+
+def wait_until_ready(bq_client, spec: VectorIndexSpec, min_coverage: float = None,
+                     timeout: float = 1800, poll_interval: float = 30) -> bool:
+    """
+    Poll until the index is ACTIVE with at least `min_coverage` percent of
+    rows indexed (default VECTOR_INDEX_MIN_COVERAGE).
+
+    Returns:
+        bool: True when ready, False on timeout
+    """
+    min_coverage = config.VECTOR_INDEX_MIN_COVERAGE if min_coverage is None else min_coverage
+    deadline = time.monotonic() + timeout
+    while True:
+        status = get_index_status(bq_client, spec)
+        if status.exists and status.status == "ACTIVE" and status.coverage >= min_coverage:
+            print(f"✅ Vector index {spec.name} ready ({status.coverage:.0f}% coverage)")
+            return True
+        if time.monotonic() >= deadline:
+            print(f"❌ Vector index {spec.name} not ready after {timeout:.0f}s "
+                  f"(status {status.status}, {status.coverage:.0f}% coverage)")
+            return False
+        print(f"⏳ Vector index {spec.name}: {status.status or 'missing'}, {status.coverage:.0f}% coverage")
+        time.sleep(poll_interval)
@@ -0,0 +1,549 @@
+# ==============================
+# src/case_index.py
+# ==============================
+# Local, incrementally synced replica of the analysis-results embeddings
+# table for the "similar past cases" search.
+#
+# Layout under CACHE_DIR/case_index/:
+#   vectors.f32    row-normalized embeddings, memory-mapped and grown by
+#   vectors.f16    doubling (row i ↔ cases.row = i); float32, or float16
+#                  for EMBEDDING_STORAGE_PRECISION float16 / int8
+#   vectors.i8     int8 codes and per-row scales (int8 only)
+#   scales.f32
+#   cases.sqlite   per-row payload (run_id, transcript, metrics, ...) and
+#                  the sync state (row count, dimension, watermark, storage)
+#   ivf.npz        IVF lists over the rows (built past CASE_INDEX_IVF_MIN_ROWS)
+#
+# Sync: only rows with processed_at >= watermark - overlap are read, and
+# rows whose run_id is already stored are skipped. processed_at is when
+# the analysis ran, not when the row reached BigQuery, so a row held in
+# the write-behind spool (or flushed late by another instance) can land
+# further behind the watermark than the overlap. Every reconcile_interval
+# seconds the table's run_ids are compared with the local ones and any
+# missing rows are fetched by run_id. Vectors are written before the row
+# count is committed, so an interrupted sync never exposes half-written
+# rows. Syncs can run on a background thread (sync_in_background) while
+# searches continue against the rows already stored.
+#
+# Search: exact brute force over the memmap for small tables; above the
+# IVF threshold only the nprobe nearest lists are scored, and those
+# candidates are re-ranked exactly from the stored vectors. Bytes per
+# row on disk: float32 4 * dim, float16 2 * dim (searched directly), int8
+# 3 * dim + 4 (the scan reads the 1-byte codes and only a short list is
+# rescored from the float16 file). Changing the precision converts the
+# stored vectors in place on the next open.
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.lazy_imports import lazy_import
+from src.vector_index import (
+    IVFIndex, PRECISIONS, RESCORE_DTYPES, normalize_rows, quantize_rows, top_k_cosine, top_k_rescored
+)
+
+bigquery = lazy_import("google.cloud.bigquery")
+
+CASE_COLUMNS = ["run_id", "transcript", "metrics", "therapy_plan", "words_df", "processed_at"]
+
+# Rows appended per vector write / SQLite transaction while syncing
+SYNC_BATCH_ROWS = 2000
+
+VECTOR_FILES = {"float32": "vectors.f32", "float16": "vectors.f16"}
+CODES_FILE = "vectors.i8"
+SCALES_FILE = "scales.f32"
+
+
+class CaseIndex:
+    """
+    Similar-case search over a local replica of the embeddings table.
+
+    Args:
+        table_id (str): Fully qualified analysis-results embeddings table
+        directory (str): Folder for the memmap, metadata and IVF files
+        sync_interval (float): Min seconds between syncs
+        sync_overlap (float): Seconds re-read before the watermark
+        reconcile_interval (float): Min seconds between run_id reconciles
+        ivf_min_rows (int): Rows from which the IVF index is used
+        nprobe (int): IVF lists scored per query
+        precision (str): Storage precision: 'float32', 'float16' or 'int8'
+        rescore_factor (int): int8 candidates rescored per result
+    """
+
+    def __init__(self, table_id, directory, sync_interval=30.0, sync_overlap=900.0, reconcile_interval=3600.0,
+                 ivf_min_rows=20000, nprobe=8, precision="float32", rescore_factor=4):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported precision: {precision}")
+        self.table_id = table_id
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self.reconcile_interval = reconcile_interval
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self.precision = precision
+        self.rescore_factor = rescore_factor
+        self._storage = np.dtype(RESCORE_DTYPES[precision]).name
+
+        self._lock = threading.RLock()          # storage and SQLite access
+        self._sync_lock = threading.Lock()      # one sync at a time
+        self._synced_at = float("-inf")
+        self._reconciled_at = float("-inf")
+        self._sync_thread = None
+        self._vectors = None
+        self._codes = None
+        self._scales = None
+        self._ivf = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, VECTOR_FILES[self._storage])
+        self._codes_path = os.path.join(directory, CODES_FILE)
+        self._scales_path = os.path.join(directory, SCALES_FILE)
+        self._ivf_path = os.path.join(directory, "ivf.npz")
+        self._db = sqlite3.connect(os.path.join(directory, "cases.sqlite"), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS cases (
+                row INTEGER PRIMARY KEY,
+                run_id TEXT NOT NULL UNIQUE,
+                transcript TEXT,
+                metrics TEXT,
+                therapy_plan TEXT,
+                words_df TEXT,
+                processed_at TEXT
+            )
+        """)
+        self._db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+        self._open_vectors()
+        self._load_ivf()
+
+    # -----------------------------
+    # State
+    # -----------------------------
+    def _get_state(self, key, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_state(self, key, value):
+        # Callers hold self._lock (inside a transaction)
+        self._db.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def __len__(self):
+        return int(self._get_state("count", 0))
+
+    @property
+    def dim(self):
+        dim = self._get_state("dim")
+        return int(dim) if dim else None
+
+    @property
+    def watermark(self):
+        """Latest processed_at stored (datetime, UTC) or None."""
+        value = self._get_state("watermark")
+        return datetime.fromisoformat(value) if value else None
+
+    # -----------------------------
+    # Vector storage
+    # -----------------------------
+    def _open_vectors(self):
+        """Map the stored rows (capacity = file size / row size), converting them first if the precision changed."""
+        self._vectors = self._codes = self._scales = None
+        dim = self.dim
+        stored = self._get_state("storage", "float32")
+        if not dim or not os.path.exists(os.path.join(self.directory, VECTOR_FILES[stored])):
+            return
+        if stored != self._storage:
+            self._convert_vectors(stored, dim)
+        capacity = os.path.getsize(self._vectors_path) // (np.dtype(self._storage).itemsize * dim)
+        self._vectors = _memmap(self._vectors_path, self._storage, (capacity, dim))
+
+        if self.precision == "int8":
+            self._open_codes()
+        elif self._get_state("precision", self.precision) != self.precision:
+            with self._db:
+                self._set_state("precision", self.precision)
+            for path in (self._codes_path, self._scales_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _convert_vectors(self, stored, dim):
+        """Rewrite the vectors file in this index's storage dtype and drop the old one."""
+        old_path = os.path.join(self.directory, VECTOR_FILES[stored])
+        capacity = os.path.getsize(old_path) // (np.dtype(stored).itemsize * dim)
+        source = _memmap(old_path, stored, (capacity, dim))
+        target = _memmap(self._vectors_path, self._storage, (capacity, dim), grow=True)
+        n = len(self)
+        for i in range(0, n, SYNC_BATCH_ROWS):
+            end = min(n, i + SYNC_BATCH_ROWS)
+            target[i:end] = source[i:end]
+        target.flush()
+        del source, target
+        with self._db:
+            self._set_state("storage", self._storage)
+        os.remove(old_path)
+        print(f"✅ Case index vectors converted from {stored} to {self._storage} for {n} rows")
+
+    def _open_codes(self):
+        """Map the int8 codes, rebuilding them if missing or stale."""
+        capacity, dim = self._vectors.shape
+        if (
+            self._get_state("precision") != "int8"
+            or not os.path.exists(self._codes_path)
+            or os.path.getsize(self._codes_path) < capacity * dim
+        ):
+            self._rebuild_codes()
+            return
+        self._codes = _memmap(self._codes_path, np.int8, (capacity, dim))
+        self._scales = _memmap(self._scales_path, np.float32, (capacity,))
+
+    def _rebuild_codes(self):
+        capacity, dim = self._vectors.shape
+        self._codes = _memmap(self._codes_path, np.int8, (capacity, dim), grow=True)
+        self._scales = _memmap(self._scales_path, np.float32, (capacity,), grow=True)
+        n = len(self)
+        for i in range(0, n, SYNC_BATCH_ROWS):
+            self._write_codes(i, self._vectors[i:min(n, i + SYNC_BATCH_ROWS)])
+        with self._db:
+            self._set_state("precision", "int8")
+        print(f"✅ Case index int8 codes built for {n} rows")
+
+    def _write_codes(self, start, vectors):
+        codes, scales = quantize_rows(vectors, "int8")
+        self._codes[start:start + len(codes)] = codes
+        self._codes.flush()
+        self._scales[start:start + len(scales)] = scales
+        self._scales.flush()
+
+    def _ensure_capacity(self, rows, dim):
+        capacity = 0 if self._vectors is None else len(self._vectors)
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, 2 * capacity, 1024)
+        for attr in ("_vectors", "_codes", "_scales"):
+            if getattr(self, attr) is not None:
+                getattr(self, attr).flush()
+                setattr(self, attr, None)
+        self._vectors = _memmap(self._vectors_path, self._storage, (new_capacity, dim), grow=True)
+        if self.precision == "int8":
+            self._codes = _memmap(self._codes_path, np.int8, (new_capacity, dim), grow=True)
+            self._scales = _memmap(self._scales_path, np.float32, (new_capacity,), grow=True)
+        if (self._get_state("storage"), self._get_state("precision")) != (self._storage, self.precision):
+            with self._db:
+                self._set_state("storage", self._storage)
+                self._set_state("precision", self.precision)
+
+    def storage_bytes(self):
+        """Bytes on disk for the stored vectors (vectors, codes and scales files)."""
+        paths = (self._vectors_path, self._codes_path, self._scales_path)
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+    def matrix(self):
+        """View of the stored rows (row-normalized float32 or float16 memmap)."""
+        n = len(self)
+        if self._vectors is None or n == 0:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._vectors[:n]
+
+    # -----------------------------
+    # IVF
+    # -----------------------------
+    def _load_ivf(self):
+        self._ivf = None
+        if not os.path.exists(self._ivf_path):
+            return
+        try:
+            ivf = IVFIndex.load(self._ivf_path)
+        except Exception as e:
+            print(f"❌ Ignoring unreadable case IVF index: {e}")
+            return
+        n = len(self)
+        if len(ivf) > n or ivf.centroids.shape[1] != (self.dim or 0):
+            return  # stale (table reset); rebuilt on the next sync
+        if len(ivf) < n:
+            ivf.add(self.matrix()[len(ivf):])  # rows appended after the last save
+        self._ivf = ivf
+
+    def _update_ivf(self, new_rows):
+        n = len(self)
+        if n < self.ivf_min_rows:
+            return
+        if self._ivf is None or n >= 2 * self._ivf.trained_rows:
+            started = time.perf_counter()
+            self._ivf = IVFIndex.train(self.matrix())
+            print(f"✅ Case IVF index trained: {self._ivf.nlist} lists over {n} rows "
+                  f"in {time.perf_counter() - started:.1f}s")
+        else:
+            self._ivf.add(self.matrix()[n - new_rows:])
+        self._ivf.save(self._ivf_path)
+
+    # -----------------------------
+    # Sync
+    # -----------------------------
+    def _append(self, rows):
+        """
+        Store rows not seen before (by run_id).
+
+        Returns:
+            int: Rows added
+        """
+        with self._lock:
+            return self._append_locked(rows)
+
+    def _append_locked(self, rows):
+        known = set()
+        ids = [r["run_id"] for r in rows]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            known.update(r[0] for r in self._db.execute(
+                f"SELECT run_id FROM cases WHERE run_id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+
+        dim = self.dim
+        fresh = []
+        for r in rows:
+            embedding = r["transcript_embedding"]
+            if r["run_id"] in known or not embedding:
+                continue
+            if dim is None:
+                dim = len(embedding)
+            if len(embedding) != dim:
+                print(f"❌ Skipping case {r['run_id']}: embedding has {len(embedding)} dims, index has {dim}")
+                continue
+            known.add(r["run_id"])
+            fresh.append(r)
+        if not fresh:
+            return 0
+
+        start = len(self)
+        self._ensure_capacity(start + len(fresh), dim)
+        vectors = normalize_rows([r["transcript_embedding"] for r in fresh])
+        self._vectors[start:start + len(fresh)] = vectors
+        self._vectors.flush()
+        if self._codes is not None:
+            self._write_codes(start, vectors)
+
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO cases (row, run_id, transcript, metrics, therapy_plan, words_df, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(start + i, r["run_id"], r["transcript"], r["metrics"], r["therapy_plan"], r["words_df"],
+                  _isoformat(r["processed_at"])) for i, r in enumerate(fresh)]
+            )
+            watermark = max([_isoformat(r["processed_at"]) for r in fresh] + [self._get_state("watermark", "")])
+            self._set_state("watermark", watermark)
+            self._set_state("dim", dim)
+            self._set_state("count", start + len(fresh))
+        return len(fresh)
+
+    def _fetch(self, bq_client, where, parameter):
+        """Append the table rows matching `where` (streamed in SYNC_BATCH_ROWS pages)."""
+        job = bq_client.query(
+            f"""
+            SELECT
+                run_id,
+                transcript,
+                TO_JSON_STRING(metrics) AS metrics,
+                therapy_plan,
+                TO_JSON_STRING(words_df) AS words_df,
+                processed_at,
+                transcript_embedding
+            FROM `{self.table_id}`
+            WHERE {where} AND ARRAY_LENGTH(transcript_embedding) > 0
+            ORDER BY processed_at
+            """,
+            job_config=bigquery.QueryJobConfig(query_parameters=[parameter])
+        )
+
+        added, batch = 0, []
+        for row in job.result(page_size=SYNC_BATCH_ROWS):
+            batch.append(dict(row.items()))
+            if len(batch) >= SYNC_BATCH_ROWS:
+                added += self._append(batch)
+                batch = []
+        if batch:
+            added += self._append(batch)
+        return added
+
+    def _reconcile(self, bq_client):
+        """
+        Fetch rows the watermark sync missed, by comparing run_ids.
+
+        Returns:
+            int: Rows added
+        """
+        job = bq_client.query(f"""
+            SELECT DISTINCT run_id
+            FROM `{self.table_id}`
+            WHERE ARRAY_LENGTH(transcript_embedding) > 0
+        """)
+        remote = {row.run_id for row in job.result()}
+        with self._lock:
+            local = {r[0] for r in self._db.execute("SELECT run_id FROM cases")}
+        missing = sorted(remote - local)
+        if not missing:
+            return 0
+
+        print(f"▶️ Case index reconcile: {len(missing)} rows landed behind the sync watermark")
+        added = 0
+        for i in range(0, len(missing), SYNC_BATCH_ROWS):
+            added += self._fetch(bq_client, "run_id IN UNNEST(@run_ids)", bigquery.ArrayQueryParameter(
+                "run_ids", "STRING", missing[i:i + SYNC_BATCH_ROWS]
+            ))
+        return added
+
+    def sync(self, bq_client, force=False):
+        """
+        Pull rows added to the table since the last sync (at most every
+        `sync_interval` seconds unless `force`), then reconcile by run_id
+        if `reconcile_interval` has passed.
+
+        Searches are not blocked while the table is read; only the local
+        writes take the storage lock.
+
+        Returns:
+            int: Rows added
+        """
+        with self._sync_lock:
+            now = time.monotonic()
+            if not force and now - self._synced_at < self.sync_interval:
+                return 0
+            self._synced_at = now
+
+            watermark = self.watermark
+            if watermark is None:
+                self._reconciled_at = now  # a full read leaves nothing to reconcile
+            since = watermark - timedelta(seconds=self.sync_overlap) if watermark else datetime(1970, 1, 1, tzinfo=timezone.utc)
+            added = self._fetch(bq_client, "processed_at >= @since",
+                                bigquery.ScalarQueryParameter("since", "TIMESTAMP", since))
+
+            if now - self._reconciled_at >= self.reconcile_interval:
+                self._reconciled_at = now
+                added += self._reconcile(bq_client)
+
+            if added:
+                with self._lock:
+                    self._update_ivf(added)
+                print(f"✅ Case index synced: +{added} rows ({len(self)} total)")
+            return added
+
+    def sync_in_background(self, bq_client):
+        """
+        Start sync() on a daemon thread unless one is running or a sync
+        is not due yet, so callers on the request path never wait for it.
+
+        Returns:
+            threading.Thread | None: The started thread
+        """
+        with self._lock:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return None
+            if time.monotonic() - self._synced_at < self.sync_interval:
+                return None
+
+            def run():
+                try:
+                    self.sync(bq_client)
+                except Exception as e:
+                    print(f"❌ Case index sync failed: {e}")
+
+            self._sync_thread = threading.Thread(target=run, name="case-index-sync", daemon=True)
+            self._sync_thread.start()
+            return self._sync_thread
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+    def search(self, query_embedding, top_k=3):
+        """
+        Top-k past cases by cosine distance.
+
+        Returns:
+            pd.DataFrame: run_id, transcript, metrics (JSON string),
+                therapy_plan, words_df (JSON string), processed_at, distance
+        """
+        with self._lock:
+            matrix = self.matrix()
+            if len(matrix) == 0:
+                return pd.DataFrame(columns=CASE_COLUMNS + ["distance"])
+            rows = None
+            if self._ivf is not None and len(self._ivf) == len(matrix):
+                rows = self._ivf.candidates(query_embedding, self.nprobe)
+            if self._codes is not None:
+                n = len(matrix)
+                scales = self._scales[:n] if self._scales is not None else None
+                idx, distances = top_k_rescored(self._codes[:n], scales, matrix, query_embedding, top_k,
+                                                rows=rows, rescore_factor=self.rescore_factor)
+            else:
+                idx, distances = top_k_cosine(matrix, query_embedding, top_k, rows=rows)
+
+            rows = {
+                r[0]: r[1:] for r in self._db.execute(
+                    f"SELECT row, {', '.join(CASE_COLUMNS)} FROM cases WHERE row IN ({','.join('?' * len(idx))})",
+                    [int(i) for i in idx]
+                )
+            }
+
+        result = pd.DataFrame([rows[int(i)] for i in idx], columns=CASE_COLUMNS)
+        result["processed_at"] = pd.to_datetime(result["processed_at"], utc=True)
+        result["distance"] = distances.astype(float)
+        return result
+
+    def close(self):
+        with self._lock:
+            for attr in ("_vectors", "_codes", "_scales"):
+                if getattr(self, attr) is not None:
+                    getattr(self, attr).flush()
+                    setattr(self, attr, None)
+            self._db.close()
+
+
+def _memmap(path, dtype, shape, grow=False):
+    """Map `path` read-write as `shape`; with `grow`, extend the file to fit first."""
+    if grow:
+        with open(path, "ab") as f:
+            f.truncate(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+
+def _isoformat(value):
+    """processed_at as a sortable UTC ISO string."""
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.isoformat()
+
+
+# -----------------------------
+# Shared Instance
+# -----------------------------
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_case_index() -> CaseIndex:
+    """
+    Process-wide case index configured from src.config.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CaseIndex(
+                f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.ANALYSIS_RESULTS_EMBEDDINGS_TABLE_ID}",
+                directory=os.path.join(config.CACHE_DIR, "case_index"),
+                sync_interval=config.CASE_INDEX_SYNC_SECONDS,
+                sync_overlap=config.CASE_INDEX_SYNC_OVERLAP_SECONDS,
+                reconcile_interval=config.CASE_INDEX_RECONCILE_SECONDS,
+                ivf_min_rows=config.CASE_INDEX_IVF_MIN_ROWS,
+                nprobe=config.CASE_INDEX_NPROBE,
+                precision=config.EMBEDDING_STORAGE_PRECISION,
+                rescore_factor=config.EMBEDDING_RESCORE_FACTOR
+            )
+        return _index
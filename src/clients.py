@@ -2,59 +2,188 @@
 # src/client.py
 # ==============================
 # This file handles authentication and client creation for
-# Google Cloud BigQuery and Cloud Storage using a service account.
+# Google Cloud BigQuery, Cloud Storage, Gemini (google-genai) and
+# Document AI using a service account.
+#
+# Clients are created lazily on first use and shared process-wide, so
+# TLS and auth setup happen once instead of on every request. They are
+# used from Streamlit's per-session threads, with one caveat:
+#
+#   - genai and Document AI clients are documented as thread-safe.
+#   - BigQuery and Cloud Storage send requests through a shared
+#     requests-based AuthorizedSession. requests.Session does not promise
+#     thread safety. Concurrent calls only share its urllib3 connection
+#     pool, which is thread-safe, but two threads may refresh an expired
+#     token at the same time (harmless, one extra refresh). Configure the
+#     session in _authorized_session only; mutating it afterwards
+#     (mount, headers, cookies) from request threads is not safe.
 
-from google.cloud import bigquery, storage
-from google.oauth2 import service_account
 import os
-from src.config import SERVICE_ACCOUNT_KEY_FILE_PATH
+import threading
+
+from src import config
+from src.lazy_imports import lazy_import
+
+# Google SDKs load on first client creation, not at import
+bigquery = lazy_import("google.cloud.bigquery")
+storage = lazy_import("google.cloud.storage")
+service_account = lazy_import("google.oauth2.service_account")
+
+SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
 
 # -----------------------------
-# Service Account Key
+# Registry
 # -----------------------------
-# Construct full path to the service account key file
-SERVICE_ACCOUNT_FILE = os.path.join(
-    os.path.dirname(__file__),
-    SERVICE_ACCOUNT_KEY_FILE_PATH
-)
+_clients = {}
+_lock = threading.RLock()
+
+
+def _get_or_create(key, factory):
+    """Return the shared instance for `key`, creating it once under the lock."""
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+    return client
+
+
+def reset_clients():
+    """Drop all cached clients and credentials (e.g. after rotating keys)."""
+    with _lock:
+        _clients.clear()
+
 
 # -----------------------------
 # Create Credentials
 # -----------------------------
-# Initialize credentials using the service account JSON key
-credentials = service_account.Credentials.from_service_account_file(
-    SERVICE_ACCOUNT_FILE,
-    scopes=["https://www.googleapis.com/auth/cloud-platform"],
-)
+def get_credentials():
+    """
+    Service account credentials, loaded from the key file on first use.
+
+    Returns:
+        service_account.Credentials
+    """
+    def create():
+        # Construct full path to the service account key file
+        service_account_file = os.path.join(os.path.dirname(__file__), config.SERVICE_ACCOUNT_KEY_FILE_PATH)
+        return service_account.Credentials.from_service_account_file(service_account_file, scopes=SCOPES)
+    return _get_or_create("credentials", create)
+
+
+def _authorized_session():
+    """
+    Authorized HTTP session with a connection pool sized for concurrent
+    sessions (HTTP_POOL_CONNECTIONS hosts × HTTP_POOL_MAXSIZE connections).
+    Shared across threads, so it is only configured here.
+    """
+    from google.auth.transport.requests import AuthorizedSession
+    from requests.adapters import HTTPAdapter
+
+    session = AuthorizedSession(get_credentials())
+    adapter = HTTPAdapter(
+        pool_connections=config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=config.HTTP_POOL_MAXSIZE
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 # -----------------------------
 # BigQuery Client
 # -----------------------------
 def get_bq_client():
     """
-    Returns an authenticated BigQuery client using the service account credentials.
+    Returns the shared, authenticated BigQuery client.
 
     Returns:
         bigquery.Client: Authenticated BigQuery client
     """
-    bq_client = bigquery.Client(
-        credentials=credentials,
-        project=credentials.project_id
-    )
-    return bq_client
+    def create():
+        credentials = get_credentials()
+        return bigquery.Client(
+            credentials=credentials,
+            project=credentials.project_id,
+            _http=_authorized_session()
+        )
+    return _get_or_create("bigquery", create)
 
 # -----------------------------
 # Cloud Storage Client
 # -----------------------------
 def get_storage_client():
     """
-    Returns an authenticated Google Cloud Storage client using the service account credentials.
+    Returns the shared, authenticated Google Cloud Storage client.
 
     Returns:
         storage.Client: Authenticated Cloud Storage client
     """
-    storage_client = storage.Client(
-        credentials=credentials,
-        project=credentials.project_id
-    )
-    return storage_client
+    def create():
+        credentials = get_credentials()
+        return storage.Client(
+            credentials=credentials,
+            project=credentials.project_id,
+            _http=_authorized_session()
+        )
+    return _get_or_create("storage", create)
+
+# -----------------------------
+# Gemini (google-genai) Client
+# -----------------------------
+def get_genai_client(location="global"):
+    """
+    Returns the shared Vertex AI google-genai client for `location`.
+
+    Returns:
+        genai.Client: Gemini client
+    """
+    def create():
+        from google import genai
+        return genai.Client(
+            vertexai=True,
+            project=config.PROJECT_ID,
+            location=location,
+            credentials=get_credentials()
+        )
+    return _get_or_create(("genai", location), create)
+
+# -----------------------------
+# Document AI Client
+# -----------------------------
+def get_documentai_client(api_endpoint="us-documentai.googleapis.com"):
+    """
+    Returns the shared Document AI processor service client for `api_endpoint`.
+
+    Returns:
+        documentai.DocumentProcessorServiceClient
+    """
+    def create():
+        from google.api_core.client_options import ClientOptions
+        from google.cloud import documentai
+        return documentai.DocumentProcessorServiceClient(
+            credentials=get_credentials(),
+            client_options=ClientOptions(api_endpoint=api_endpoint)
+        )
+    return _get_or_create(("documentai", api_endpoint), create)
+
+
+# -----------------------------
+# Lazy Module-level Handles
+# -----------------------------
+class LazyClient:
+    """
+    Stand-in for a module-level client: resolves the shared client on
+    first attribute access, so importing a module does no auth work.
+
+    Args:
+        getter (callable): Registry accessor, e.g. get_bq_client
+    """
+
+    def __init__(self, getter):
+        self._getter = getter
+
+    def __getattr__(self, name):
+        return getattr(self._getter(), name)
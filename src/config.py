@@ -6,6 +6,7 @@
 # centralized access to project, dataset, and model settings.
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # -----------------------------
@@ -43,6 +44,25 @@ ANALYSIS_RESULTS_EMBEDDINGS_TABLE_ID = os.getenv("ANALYSIS_RESULTS_EMBEDDINGS_TA
 PDF_DATA_OBJECT_TABLE_ID = os.getenv("PDF_DATA_OBJECT_TABLE_ID")
 SPEECH_DOCUMENT_EMBEDDINGS_TABLE_ID = os.getenv("SPEECH_DOCUMENT_EMBEDDINGS_TABLE_ID")
 COURSE_TABLE_ID = os.getenv("COURSE_TABLE_ID")
+
+# -----------------------------
+# Vector Search
+# -----------------------------
+# BigQuery vector indexes: tables below MIN_ROWS (BigQuery's minimum) and
+# indexes below MIN_COVERAGE percent are searched by brute force; index
+# status is re-read at most every STATUS_SECONDS
+VECTOR_INDEX_MIN_ROWS = int(os.getenv("VECTOR_INDEX_MIN_ROWS", "5000"))
+VECTOR_INDEX_MIN_COVERAGE = float(os.getenv("VECTOR_INDEX_MIN_COVERAGE", "90"))
+VECTOR_INDEX_STATUS_SECONDS = float(os.getenv("VECTOR_INDEX_STATUS_SECONDS", "600"))
+
+# fraction_lists_to_search per VECTOR_SEARCH call site. Re-measure with
+# `python -m benchmarks.vector_search_recall --backend bigquery --site <site>`
+# once a table is indexed (below VECTOR_INDEX_MIN_ROWS all sites use brute
+# force, so these do not apply yet)
+VECTOR_SEARCH_FRACTION_DOCUMENTS = float(os.getenv("VECTOR_SEARCH_FRACTION_DOCUMENTS", "0.01"))
+VECTOR_SEARCH_FRACTION_CASES = float(os.getenv("VECTOR_SEARCH_FRACTION_CASES", "0.05"))
+VECTOR_SEARCH_FRACTION_COURSES = float(os.getenv("VECTOR_SEARCH_FRACTION_COURSES", "0.1"))
+
 # -----------------------------
 # Speech-to-Text Model
 # -----------------------------
@@ -61,11 +81,130 @@ GENERATIVE_AI_MODEL_ENDPOINT = os.getenv("GENERATIVE_AI_MODEL_ENDPOINT")
 GENERATIVE_AI_EMBEDDING_MODEL_ID = os.getenv("GENERATIVE_AI_EMBEDDING_MODEL_ID")
 GENERATIVE_AI_EMBEDDING_MODEL_ENDPOINT = os.getenv("GENERATIVE_AI_EMBEDDING_MODEL_ENDPOINT")
 
+# Max texts embedded per ML.GENERATE_EMBEDDING job
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "250"))
+
 # -----------------------------
 # Document AI Layout Parser
 # -----------------------------
 LAYOUT_PARSER_REMOTE_MODEL = os.getenv("LAYOUT_PARSER_REMOTE_MODEL")
 
+# -----------------------------
+# HTTP Connection Pools
+# -----------------------------
+# Shared BigQuery / Cloud Storage clients: pooled hosts and connections per host
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+
+# -----------------------------
+# Audio Uploads
+# -----------------------------
+# Above RESUMABLE_THRESHOLD uploads are resumable in CHUNK_SIZE pieces
+# (multiple of 256 KiB); local files above PARALLEL_THRESHOLD upload chunks in parallel
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_RESUMABLE_THRESHOLD = int(os.getenv("UPLOAD_RESUMABLE_THRESHOLD", str(8 * 1024 * 1024)))
+UPLOAD_PARALLEL_THRESHOLD = int(os.getenv("UPLOAD_PARALLEL_THRESHOLD", str(64 * 1024 * 1024)))
+
+# -----------------------------
+# Audio Preprocessing
+# -----------------------------
+# Optional stage: downmix, resample, trim silence and re-encode audio
+# before upload. Off by default (audio is uploaded as recorded); set
+# AUDIO_PREPROCESS_ENABLED=true in .env to turn it on
+AUDIO_PREPROCESS_ENABLED = os.getenv("AUDIO_PREPROCESS_ENABLED", "false").lower() == "true"
+AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))
+# flac | opus (need ffmpeg, else WAV is written) | wav
+AUDIO_PREPROCESS_CODEC = os.getenv("AUDIO_PREPROCESS_CODEC", "flac")
+
+# Energy VAD: frames quieter than THRESHOLD_DB below the loudest frame (or
+# below FLOOR_DB dBFS) are silence; PADDING_MS is kept around the speech
+AUDIO_VAD_FRAME_MS = int(os.getenv("AUDIO_VAD_FRAME_MS", "30"))
+AUDIO_SILENCE_THRESHOLD_DB = float(os.getenv("AUDIO_SILENCE_THRESHOLD_DB", "40"))
+AUDIO_SILENCE_FLOOR_DB = float(os.getenv("AUDIO_SILENCE_FLOOR_DB", "-60"))
+AUDIO_TRIM_PADDING_MS = int(os.getenv("AUDIO_TRIM_PADDING_MS", "250"))
+
+# Long recordings (over MIN_SECONDS of speech) are split at the quietest
+# point near every SECONDS into segments overlapping by OVERLAP_SECONDS,
+# uploaded and transcribed in parallel, then merged
+AUDIO_SEGMENT_ENABLED = os.getenv("AUDIO_SEGMENT_ENABLED", "true").lower() == "true"
+AUDIO_SEGMENT_MIN_SECONDS = float(os.getenv("AUDIO_SEGMENT_MIN_SECONDS", "120"))
+AUDIO_SEGMENT_SECONDS = float(os.getenv("AUDIO_SEGMENT_SECONDS", "60"))
+AUDIO_SEGMENT_OVERLAP_SECONDS = float(os.getenv("AUDIO_SEGMENT_OVERLAP_SECONDS", "2"))
+AUDIO_SEGMENT_SEARCH_SECONDS = float(os.getenv("AUDIO_SEGMENT_SEARCH_SECONDS", "10"))
+AUDIO_SEGMENT_UPLOAD_WORKERS = int(os.getenv("AUDIO_SEGMENT_UPLOAD_WORKERS", "8"))
+
+# -----------------------------
+# Analysis Pipeline
+# -----------------------------
+# Seconds between ML.TRANSCRIBE job status checks
+TRANSCRIPTION_POLL_SECONDS = float(os.getenv("TRANSCRIPTION_POLL_SECONDS", "3"))
+
+# Worker threads for the concurrent post-transcription stages
+ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "3"))
+
+# Pipeline stage policy: per-attempt timeout for remote stages, retries
+# after a failure, and the base of the exponential retry delay
+PIPELINE_STAGE_TIMEOUT_SECONDS = float(os.getenv("PIPELINE_STAGE_TIMEOUT_SECONDS", "120"))
+PIPELINE_UPLOAD_TIMEOUT_SECONDS = float(os.getenv("PIPELINE_UPLOAD_TIMEOUT_SECONDS", "600"))
+PIPELINE_STAGE_RETRIES = int(os.getenv("PIPELINE_STAGE_RETRIES", "2"))
+PIPELINE_RETRY_BACKOFF_SECONDS = float(os.getenv("PIPELINE_RETRY_BACKOFF_SECONDS", "1"))
+
+# -----------------------------
+# Local Caches
+# -----------------------------
+# Directory for on-disk caches and local state
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "speak_aura_cache"))
+
+# Write-behind spool for BigQuery writes: flush when this many rows are
+# pending or the oldest pending row is this many seconds old. The spool
+# is only durable if SPOOL_DIR is persistent: the default (under the temp
+# directory) is lost when an ephemeral host such as Cloud Run replaces
+# the instance, so mount a volume and set SPOOL_DIR there
+SPOOL_DIR = os.getenv("SPOOL_DIR", CACHE_DIR)
+SPOOL_FLUSH_ROWS = int(os.getenv("SPOOL_FLUSH_ROWS", "500"))
+SPOOL_FLUSH_SECONDS = float(os.getenv("SPOOL_FLUSH_SECONDS", "5"))
+
+# Course recommendations: in-memory course index, table version checked
+# at most every REFRESH_SECONDS (VECTOR_SEARCH is used when disabled)
+COURSE_INDEX_ENABLED = os.getenv("COURSE_INDEX_ENABLED", "true").lower() == "true"
+COURSE_INDEX_REFRESH_SECONDS = float(os.getenv("COURSE_INDEX_REFRESH_SECONDS", "300"))
+
+# Similar past cases: local replica of the embeddings table, synced in the
+# background by processed_at watermark at most every SYNC_SECONDS
+# (re-reading OVERLAP seconds for late rows). Rows that land later than
+# that (e.g. spooled through an outage) are picked up by a run_id
+# reconcile every RECONCILE_SECONDS. IVF search with NPROBE lists from
+# IVF_MIN_ROWS rows, exact search below. VECTOR_SEARCH is used when
+# disabled and until the first sync has populated the index
+CASE_INDEX_ENABLED = os.getenv("CASE_INDEX_ENABLED", "true").lower() == "true"
+CASE_INDEX_SYNC_SECONDS = float(os.getenv("CASE_INDEX_SYNC_SECONDS", "30"))
+CASE_INDEX_SYNC_OVERLAP_SECONDS = float(os.getenv("CASE_INDEX_SYNC_OVERLAP_SECONDS", "900"))
+CASE_INDEX_RECONCILE_SECONDS = float(os.getenv("CASE_INDEX_RECONCILE_SECONDS", "3600"))
+CASE_INDEX_IVF_MIN_ROWS = int(os.getenv("CASE_INDEX_IVF_MIN_ROWS", "20000"))
+# nprobe 8: recall@3 1.00 at ~2 ms vs ~29 ms exact on 100k x 768
+# (python -m benchmarks.vector_search_recall, nprobe 4 was 0.997)
+CASE_INDEX_NPROBE = int(os.getenv("CASE_INDEX_NPROBE", "8"))
+
+# Precision the local case index stores embeddings in. Bytes per row:
+# 'float32' 4 * dim; 'float16' 2 * dim (searched directly); 'int8'
+# 3 * dim + 4, where the scan reads per-row scaled int8 codes and the
+# best top_k * RESCORE_FACTOR candidates are rescored from a float16 copy
+EMBEDDING_STORAGE_PRECISION = os.getenv("EMBEDDING_STORAGE_PRECISION", "int8")
+EMBEDDING_RESCORE_FACTOR = int(os.getenv("EMBEDDING_RESCORE_FACTOR", "4"))
+
+# Chat answers: reused when a question is within MAX_DISTANCE (cosine) of
+# an answered one and the document corpus (table last-modified time,
+# checked at most every CORPUS_VERSION_SECONDS) is unchanged
+CHAT_ANSWER_CACHE_ENABLED = os.getenv("CHAT_ANSWER_CACHE_ENABLED", "true").lower() == "true"
+CHAT_ANSWER_CACHE_MAX_DISTANCE = float(os.getenv("CHAT_ANSWER_CACHE_MAX_DISTANCE", "0.05"))
+CHAT_ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_ANSWER_CACHE_MAX_ENTRIES", "5000"))
+CHAT_CORPUS_VERSION_SECONDS = float(os.getenv("CHAT_CORPUS_VERSION_SECONDS", "300"))
+
+# Embedding cache: in-process LRU + on-disk SQLite store
+EMBEDDING_CACHE_DISK_ENABLED = os.getenv("EMBEDDING_CACHE_DISK_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "1024"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
 # Define max_tokens per category
 
 category_max_tokens = {
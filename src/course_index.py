@@ -0,0 +1,163 @@
+# ==============================
+# src/course_index.py
+# ==============================
+# In-process index over the course catalog embeddings.
+#
+# The course table is small (a few rows from data/courses/courses.json),
+# so its embeddings are loaded once into a row-normalized float32 matrix
+# and searched with one matrix-vector product instead of a VECTOR_SEARCH
+# job per analysis.
+#
+# Freshness: the table's last-modified time is its version. It is checked
+# (a metadata call, not a query) at most every COURSE_INDEX_REFRESH_SECONDS
+# and the matrix is reloaded only when it changed. A snapshot in CACHE_DIR
+# lets a new process skip the load query while the version is unchanged.
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.vector_index import normalize_rows, top_k_cosine
+
+COURSE_COLUMNS = ["course_id", "title", "description", "category", "url"]
+
+
+# -----------------------------
+# Course Index
+# -----------------------------
+class CourseIndex:
+    """
+    Course embeddings held in memory, refreshed when the table changes.
+
+    Args:
+        table_id (str): Fully qualified course table
+        refresh_interval (float): Min seconds between version checks
+        snapshot_path (str | None): .npz snapshot file (None disables it)
+    """
+
+    def __init__(self, table_id, refresh_interval=300.0, snapshot_path=None):
+        self.table_id = table_id
+        self.refresh_interval = refresh_interval
+        self.snapshot_path = snapshot_path
+
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = float("-inf")
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._courses = pd.DataFrame(columns=COURSE_COLUMNS)
+
+    @property
+    def version(self):
+        return self._version
+
+    def __len__(self):
+        return len(self._courses)
+
+    # -----------------------------
+    # Loading
+    # -----------------------------
+    def _table_version(self, bq_client):
+        modified = bq_client.get_table(self.table_id).modified
+        return modified.isoformat() if modified else None
+
+    def _load_from_table(self, bq_client):
+        df = bq_client.query(
+            f"SELECT {', '.join(COURSE_COLUMNS)}, course_embedding FROM `{self.table_id}` ORDER BY course_id"
+        ).to_dataframe()
+        df = df[df["course_embedding"].map(lambda v: v is not None and len(v) > 0)]
+        matrix = normalize_rows(np.stack(df["course_embedding"].to_numpy())) if len(df) else np.empty((0, 0), np.float32)
+        return matrix, df[COURSE_COLUMNS].reset_index(drop=True)
+
+    def _read_snapshot(self, version):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with np.load(self.snapshot_path, allow_pickle=False) as snap:
+                if str(snap["version"]) != version or str(snap["table_id"]) != self.table_id:
+                    return None
+                courses = pd.DataFrame({col: snap[col].astype(object) for col in COURSE_COLUMNS})
+                return snap["matrix"], courses
+        except Exception as e:
+            print(f"❌ Ignoring unreadable course index snapshot: {e}")
+            return None
+
+    def _write_snapshot(self, version, matrix, courses):
+        if not self.snapshot_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp.npz"
+        np.savez(
+            tmp_path, version=version, table_id=self.table_id, matrix=matrix,
+            **{col: courses[col].fillna("").astype(str).to_numpy(dtype=str) for col in COURSE_COLUMNS}
+        )
+        os.replace(tmp_path, self.snapshot_path)
+
+    def refresh(self, bq_client, force=False):
+        """
+        Reload the matrix if the table version changed (checked at most
+        every `refresh_interval` seconds unless `force`).
+
+        Returns:
+            bool: True when new data was loaded
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._version is not None and now - self._checked_at < self.refresh_interval:
+                return False
+            self._checked_at = now
+
+            version = self._table_version(bq_client)
+            if version == self._version and not force:
+                return False
+
+            loaded = None if force else self._read_snapshot(version)
+            if loaded is None:
+                loaded = self._load_from_table(bq_client)
+                self._write_snapshot(version, *loaded)
+            self._matrix, self._courses = loaded
+            self._version = version
+            print(f"✅ Course index loaded: {len(self._courses)} courses (version {version})")
+            return True
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+    def search(self, query_embedding, top_k=5):
+        """
+        Top-k courses by cosine distance.
+
+        Returns:
+            pd.DataFrame: course_id, title, description, category, url, distance
+        """
+        with self._lock:
+            matrix, courses = self._matrix, self._courses
+        idx, distances = top_k_cosine(matrix, query_embedding, top_k)
+        result = courses.iloc[idx].reset_index(drop=True)
+        result["distance"] = distances.astype(float)
+        return result
+
+
+# -----------------------------
+# Shared Instance
+# -----------------------------
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_course_index() -> CourseIndex:
+    """
+    Process-wide course index configured from src.config.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CourseIndex(
+                f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.COURSE_TABLE_ID}",
+                refresh_interval=config.COURSE_INDEX_REFRESH_SECONDS,
+                snapshot_path=os.path.join(config.CACHE_DIR, "course_index.npz")
+            )
+        return _index
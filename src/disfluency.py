@@ -0,0 +1,332 @@
+# ==============================
+# src/disfluency.py
+# ==============================
+# Pluggable disfluency detectors for word-level transcripts.
+#
+# Word data is converted once into shared NumPy arrays (WordArrays):
+# normalized words, the previous word and the pause after each word,
+# already masked at recording boundaries. Most detectors are cheap
+# vectorized masks over those arrays. Pattern-based detectors register
+# their regex in WORD_PATTERNS instead: all patterns are combined into
+# one regex, compiled once and matched in a single pass over the distinct
+# words, however many patterns there are.
+#
+# Adding a detector:
+#
+#     @register_detector("stutter_block", column="is_stutter_block",
+#                        summary_key="stutter_blocks", weight=2.5)
+#     def detect_stutter_block(arrays):
+#         return arrays.pause > 3.0
+#
+# A pattern detector adds WORD_PATTERNS["name"] = r"..." and returns
+# arrays.pattern_matches["name"].
+#
+# Detectors see one word of context on each side (prev_* and pause).
+
+import re
+import time
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Disfluency Rules
+# -----------------------------
+FILLER_WORDS = ["uh", "um", "ah", "er", "hmm"]
+
+# Prolongations: repeated letters (>2)
+PROLONGATION_PATTERN = r"(?P<letter>[a-z])(?P=letter){2,}"
+
+# Part-word repetitions: "b-b-but", "I-I", "st-st-stop"
+PART_WORD_REPETITION_PATTERN = r"(?P<stem>\w+)(?:-(?P=stem))*-(?P=stem)\w*$"
+
+# Case-insensitive patterns matched at the start of each normalized word
+# (see WordArrays.pattern_matches). The patterns are combined into one
+# regex, so backreferences must use named groups, unique across patterns.
+WORD_PATTERNS = {
+    "prolongation": PROLONGATION_PATTERN,
+    "part_word_repetition": PART_WORD_REPETITION_PATTERN,
+}
+
+
+# -----------------------------
+# Shared Word Arrays
+# -----------------------------
+@dataclass(frozen=True)
+class WordArrays:
+    """
+    Column arrays shared by all detectors.
+
+    Attributes:
+        word (np.ndarray): Raw words (object)
+        normalized (np.ndarray): Lower-cased words stripped of ',.' (object)
+        prev_word (np.ndarray): Previous raw word in the same recording, None if none
+        prev_normalized (np.ndarray): Normalized previous word, None if none
+        start_time (np.ndarray): Word start offsets in seconds
+        end_time (np.ndarray): Word end offsets in seconds
+        pause (np.ndarray): Gap to the next word in the same recording, NaN if none
+        long_pause_thresh (float): Threshold for long pauses in seconds
+    """
+    word: np.ndarray
+    normalized: np.ndarray
+    prev_word: np.ndarray
+    prev_normalized: np.ndarray
+    start_time: np.ndarray
+    end_time: np.ndarray
+    pause: np.ndarray
+    long_pause_thresh: float = 1.5
+
+    def __len__(self):
+        return len(self.word)
+
+    @cached_property
+    def pattern_matches(self):
+        """
+        WORD_PATTERNS name -> boolean match mask, from one pass over the
+        distinct words.
+
+        Each pattern sits in its own empty-alternative lookahead, so every
+        pattern is tested on every word and none of them consumes input.
+        """
+        rx = _combined_pattern(tuple(WORD_PATTERNS.items()))
+        codes, uniques = pd.factorize(self.normalized)
+        hits = {name: np.zeros(len(uniques), dtype=bool) for name in WORD_PATTERNS}
+        for i, w in enumerate(uniques):
+            m = rx.match(w)
+            for name, mask in hits.items():
+                mask[i] = m.group(name) is not None
+        return {name: mask[codes] for name, mask in hits.items()}
+
+
+def build_word_arrays(words_df, long_pause_thresh=1.5, group_col=None, prev_word=None):
+    """
+    Derive the shared detector arrays from a word-level DataFrame.
+
+    Args:
+        words_df (pd.DataFrame): Words with columns ['word', 'start_time', 'end_time']
+        long_pause_thresh (float): Threshold for long pauses in seconds
+        group_col (str, optional): Column identifying the recording (e.g. 'uri').
+            Previous-word and pause context never crosses a change in this column.
+        prev_word (str, optional): Word preceding the first row (streaming use).
+
+    Returns:
+        WordArrays: Shared arrays for run_detectors.
+    """
+    n = len(words_df)
+    words = words_df["word"].to_numpy(dtype=object)
+    starts = words_df["start_time"].to_numpy()
+    ends = words_df["end_time"].to_numpy()
+
+    normalized = np.array([w.lower().strip(",.") for w in words], dtype=object)
+
+    prev_words = np.empty(n, dtype=object)
+    prev_normalized = np.empty(n, dtype=object)
+    if n:
+        prev_words[0] = prev_word
+        prev_words[1:] = words[:-1]
+        prev_normalized[0] = prev_word.lower().strip(",.") if prev_word is not None else None
+        prev_normalized[1:] = normalized[:-1]
+
+    pause = np.full(n, np.nan, dtype=np.result_type(starts.dtype, ends.dtype, np.float32))
+    if n > 1:
+        pause[:-1] = starts[1:] - ends[:-1]
+
+    if group_col is not None and n:
+        groups = words_df[group_col].to_numpy(dtype=object)
+        new_group = np.empty(n, dtype=bool)
+        new_group[0] = False
+        new_group[1:] = groups[1:] != groups[:-1]
+        prev_words[new_group] = None
+        prev_normalized[new_group] = None
+        # The last word of a recording has no following pause
+        pause[np.flatnonzero(new_group) - 1] = np.nan
+
+    return WordArrays(
+        word=words,
+        normalized=normalized,
+        prev_word=prev_words,
+        prev_normalized=prev_normalized,
+        start_time=starts,
+        end_time=ends,
+        pause=pause,
+        long_pause_thresh=long_pause_thresh
+    )
+
+
+def _isin(values, candidates):
+    """Hash-based membership test for object arrays."""
+    return pd.Series(values, dtype=object).isin(candidates).to_numpy()
+
+
+_combined_cache = {}
+
+
+def _combined_pattern(patterns):
+    """One compiled regex testing every (name, pattern) pair; cached per pattern set."""
+    rx = _combined_cache.get(patterns)
+    if rx is None:
+        rx = re.compile("".join(f"(?=(?P<{name}>{pattern})|)" for name, pattern in patterns), re.IGNORECASE)
+        _combined_cache[patterns] = rx
+    return rx
+
+
+# -----------------------------
+# Detector Registry
+# -----------------------------
+@dataclass(frozen=True)
+class Detector:
+    """
+    A registered disfluency detector.
+
+    Attributes:
+        name (str): Registry key
+        column (str): Boolean annotation column in the word-level analysis
+        summary_key (str): Count key in the summary metrics dict
+        weight (float): Contribution of one occurrence to the severity score
+        func (callable): WordArrays -> boolean np.ndarray
+    """
+    name: str
+    column: str
+    summary_key: str
+    weight: float
+    func: object
+
+
+DETECTORS = {}
+
+# Detectors used when callers do not pick their own
+DEFAULT_DETECTORS = ("filler", "repetition", "prolongation", "block")
+
+
+def register_detector(name, column, summary_key, weight):
+    """
+    Decorator registering a detector function under `name`.
+
+    Registering an existing name replaces it.
+    """
+    def decorator(func):
+        DETECTORS[name] = Detector(name, column, summary_key, weight, func)
+        return func
+    return decorator
+
+
+def get_detectors(names=None):
+    """
+    Resolve detector names to Detector objects.
+
+    Args:
+        names (list[str], optional): Detector names. Defaults to DEFAULT_DETECTORS.
+
+    Returns:
+        list[Detector]
+    """
+    names = DEFAULT_DETECTORS if names is None else names
+    unknown = [n for n in names if n not in DETECTORS]
+    if unknown:
+        raise ValueError(f"Unknown disfluency detector(s): {unknown}. Registered: {list(DETECTORS)}")
+    return [DETECTORS[n] for n in names]
+
+
+@dataclass
+class DetectionResult:
+    """
+    Output of run_detectors.
+
+    Attributes:
+        detectors (list[Detector]): Detectors that ran, in order
+        masks (dict): Annotation column -> boolean np.ndarray
+        timings (dict): Detector name -> seconds spent ('word_arrays' is
+            the shared preparation when run through detect_disfluencies)
+    """
+    detectors: list
+    masks: dict
+    timings: dict
+
+    def counts(self, stop=None):
+        """Summary key -> occurrences, optionally over rows[:stop] only."""
+        return {d.summary_key: int(self.masks[d.column][:stop].sum()) for d in self.detectors}
+
+    def weighted_total(self, counts=None):
+        """Sum of weight * count over all detectors (severity numerator)."""
+        counts = self.counts() if counts is None else counts
+        return sum(d.weight * counts[d.summary_key] for d in self.detectors)
+
+
+def run_detectors(arrays, detectors=None):
+    """
+    Run the selected detectors over shared word arrays.
+
+    Args:
+        arrays (WordArrays): Output of build_word_arrays
+        detectors (list[str], optional): Detector names. Defaults to DEFAULT_DETECTORS.
+
+    Returns:
+        DetectionResult: Masks per annotation column plus per-detector timings.
+    """
+    selected = get_detectors(detectors)
+    masks, timings = {}, {}
+    for detector in selected:
+        start = time.perf_counter()
+        masks[detector.column] = np.asarray(detector.func(arrays), dtype=bool)
+        timings[detector.name] = time.perf_counter() - start
+    return DetectionResult(selected, masks, timings)
+
+
+def detect_disfluencies(words_df, long_pause_thresh=1.5, detectors=None, group_col=None, prev_word=None):
+    """
+    Build shared arrays and run detectors in one call.
+
+    Returns:
+        WordArrays, DetectionResult
+    """
+    start = time.perf_counter()
+    arrays = build_word_arrays(words_df, long_pause_thresh, group_col=group_col, prev_word=prev_word)
+    prepare_time = time.perf_counter() - start
+
+    result = run_detectors(arrays, detectors)
+    result.timings = {"word_arrays": prepare_time, **result.timings}
+    return arrays, result
+
+
+# -----------------------------
+# Built-in Detectors
+# -----------------------------
+@register_detector("filler", column="is_filler", summary_key="filler_count", weight=1)
+def detect_filler(arrays):
+    """Filler words (uh, um, ...)."""
+    return _isin(arrays.normalized, FILLER_WORDS)
+
+
+@register_detector("repetition", column="is_repetition", summary_key="repetitions", weight=1.5)
+def detect_repetition(arrays):
+    """Immediate whole-word repetitions ("I I")."""
+    return arrays.word == arrays.prev_word
+
+
+@register_detector("prolongation", column="is_prolongation", summary_key="prolongations", weight=2)
+def detect_prolongation(arrays):
+    """Prolonged sounds ("sssso")."""
+    return arrays.pattern_matches["prolongation"]
+
+
+@register_detector("block", column="is_block", summary_key="blocks", weight=3)
+def detect_block(arrays):
+    """Long silent pauses after a word."""
+    with np.errstate(invalid="ignore"):
+        return arrays.pause > arrays.long_pause_thresh
+
+
+@register_detector("part_word_repetition", column="is_part_word_repetition",
+                   summary_key="part_word_repetitions", weight=1.5)
+def detect_part_word_repetition(arrays):
+    """Part-word repetitions inside one token ("b-b-but")."""
+    return arrays.pattern_matches["part_word_repetition"]
+
+
+@register_detector("interjection_cluster", column="is_interjection_cluster",
+                   summary_key="interjection_clusters", weight=1)
+def detect_interjection_cluster(arrays):
+    """A filler directly following another filler ("um uh")."""
+    return _isin(arrays.normalized, FILLER_WORDS) & _isin(arrays.prev_normalized, FILLER_WORDS)
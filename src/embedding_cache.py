@@ -0,0 +1,238 @@
+# ==============================
+# src/embedding_cache.py
+# ==============================
+# Two-tier, content-addressed cache for text embeddings.
+#
+#   Tier 1: in-process LRU (OrderedDict) of float32 vectors
+#   Tier 2: on-disk SQLite store of float32 blobs, evicted by total size
+#           (least recently used first)
+#
+# Keys are a SHA-256 of (model id, task type, normalized text), so the
+# same practice sentence is only ever embedded once per model/task.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from src import config
+
+
+# -----------------------------
+# Keys
+# -----------------------------
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace (case is preserved)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_cache_key(model_id: str, task_type, text: str) -> str:
+    """
+    Content address for an embedding.
+
+    Args:
+        model_id (str): Embedding model identifier
+        task_type (str | None): Embedding task type (e.g. 'RETRIEVAL_QUERY')
+        text (str): Text being embedded
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = "\x00".join([model_id, task_type or "", normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# Cache
+# -----------------------------
+class EmbeddingCache:
+    """
+    Thread-safe two-tier embedding cache.
+
+    Args:
+        path (str | None): SQLite file for the disk tier (None disables it)
+        max_memory_items (int): Capacity of the in-process LRU
+        max_disk_bytes (int): Size budget of the disk tier
+    """
+
+    def __init__(self, path=None, max_memory_items=1024, max_disk_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        self._disk_bytes = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+            self._db.commit()
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    # -----------------------------
+    # Memory tier
+    # -----------------------------
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    # -----------------------------
+    # Disk tier
+    # -----------------------------
+    def _disk_get(self, key):
+        row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE embeddings SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def _disk_put(self, key, vector):
+        blob = vector.tobytes()
+        old = self._db.execute("SELECT size FROM embeddings WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, blob, len(blob), time.time())
+        )
+        self._db.commit()
+        self._disk_bytes += len(blob) - (old[0] if old else 0)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the store is at 90% of its budget."""
+        target = int(self.max_disk_bytes * 0.9)
+        rows = self._db.execute("SELECT key, size FROM embeddings ORDER BY last_access ASC")
+        victims = []
+        for key, size in rows:
+            if self._disk_bytes <= target:
+                break
+            victims.append((key,))
+            self._disk_bytes -= size
+        self._db.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self._db.commit()
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def get(self, key):
+        """
+        Look up a cached embedding.
+
+        Returns:
+            np.ndarray | None: float32 vector, or None on a miss.
+        """
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            if self._db is not None:
+                vector = self._disk_get(key)
+                if vector is not None:
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, key, vector):
+        """Store an embedding in both tiers (as float32)."""
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._disk_put(key, vector)
+        return vector
+
+    def get_or_compute(self, model_id, task_type, text, compute):
+        """
+        Return the cached embedding for `text`, computing and storing it on a miss.
+
+        Args:
+            model_id (str): Embedding model identifier
+            task_type (str | None): Embedding task type
+            text (str): Text to embed
+            compute (callable): text -> list[float], called only on a miss
+
+        Returns:
+            np.ndarray: float32 embedding
+        """
+        key = make_cache_key(model_id, task_type, text)
+        vector = self.get(key)
+        if vector is None:
+            vector = self.put(key, compute(text))
+        return vector
+
+    def stats(self):
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def clear(self):
+        """Empty both tiers (counters are kept)."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+                self._disk_bytes = 0
+
+
+# -----------------------------
+# Shared Instance
+# -----------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Process-wide embedding cache configured from src.config.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = (
+                os.path.join(config.CACHE_DIR, "embeddings.sqlite")
+                if config.EMBEDDING_CACHE_DISK_ENABLED else None
+            )
+            _cache = EmbeddingCache(
+                path=path,
+                max_memory_items=config.EMBEDDING_CACHE_MEMORY_ITEMS,
+                max_disk_bytes=config.EMBEDDING_CACHE_MAX_BYTES
+            )
+        return _cache
@@ -0,0 +1,42 @@
+# ==============================
+# src/lazy_imports.py
+# ==============================
+# Deferred imports for heavy dependencies (Google Cloud SDKs, plotly).
+#
+# lazy_import("google.cloud.bigquery") returns a module object at once;
+# the real import runs on first attribute access. This keeps the
+# Streamlit cold start (import of streamlit_app) fast: SDKs load when the
+# first query / chart needs them, not before the first paint.
+
+import importlib.util
+import sys
+import threading
+
+_lock = threading.Lock()
+
+
+def lazy_import(name):
+    """
+    Import `name` lazily.
+
+    Args:
+        name (str): Absolute module name, e.g. 'google.cloud.bigquery'
+
+    Returns:
+        module: The module (loaded on first attribute access). If the
+            module was already imported, it is returned as is.
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ImportError(f"No module named '{name}'")
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
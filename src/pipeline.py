@@ -2,16 +2,25 @@
 # src/pipeline.py
 # ==============================
 # End-to-end pipeline for SpeakAura AI:
+#   0. Preprocess audio locally (optional: downmix, resample, trim silence)
 #   1. Upload audio to GCS
 #   2. Transcribe audio via BigQuery AI
 #   3. Analyze stammer patterns and generate embeddings
-# Uses Streamlit for progress updates.
+# Steps are StageDAG stages; progress goes to a ProgressCallback
+# (see streamlit_helpers.StreamlitProgress for the UI adapter).
 
+import io
 import os
-from src.upload_to_gcs import upload_audio
-from src.bigquery_utils.transcription import transcribe_audio
-from src.analyze_stammer import analyze_stammer
-from src.clients import get_bq_client
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src import config
+from src.upload_to_gcs import upload_audio, audio_blob_name
+from src.audio_preprocess import preprocess_audio
+from src.bigquery_utils.transcription import (
+    submit_transcription, poll_transcription, wait_for_transcription, fetch_existing_transcript
+)
+from src.analyze_stammer import analyze_stammer, ANALYSIS_STAGES
+from src.stage_dag import Stage, StageDAG, StageError, ProgressCallback, REPORT
+from src.clients import get_bq_client, LazyClient
 
 # -----------------------------
 # Suppress gRPC verbosity in logs
@@ -20,80 +29,263 @@ os.environ["GRPC_VERBOSITY"] = "NONE"
 os.environ["GRPC_LOG_SEVERITY_LEVEL"] = "ERROR"
 
 # -----------------------------
-# Initialize BigQuery client
+# BigQuery client (shared, created on first use)
 # -----------------------------
-bq_client = get_bq_client()
+bq_client = LazyClient(get_bq_client)
+
+# Steps for progress display
+PIPELINE_STEPS = [
+    "Uploading audio to cloud storage",
+    "Transcribing audio using ML.TRANSCRIBE()",
+    "Analyzing stammer patterns",
+    "Generating Therapy Plans",
+    "Choosing AI-Recommended Courses Based on Your Speech Analysis",
+    "Creating Gamified Exercises Just for You"
+]
+
+# -----------------------------
+# Intake Stages (before transcription)
+# -----------------------------
+def _prepare_stage(audio, filename):
+    """
+    Preprocess (when enabled) and name the audio.
+
+    Returns:
+        dict: audio, filename, blob_name, gcs_path, content_type,
+            audio_offset and segments (long recordings only)
+    """
+    prepared = {"audio": audio, "filename": filename, "content_type": None, "audio_offset": 0.0, "segments": []}
+    if config.AUDIO_PREPROCESS_ENABLED:
+        processed = preprocess_audio(audio, filename)
+        if processed is not None:
+            prepared.update(
+                audio=processed.buffer(), filename=processed.filename, content_type=processed.content_type,
+                audio_offset=processed.offset_seconds, segments=processed.segments
+            )
+
+    prepared["blob_name"] = audio_blob_name(prepared["audio"], prepared["filename"])
+    prepared["gcs_path"] = f"gs://{config.BUCKET_NAME}/{prepared['blob_name']}"
+    return prepared
+
+
+def _lookup_stage(prepared, bq_client):
+    """Stored transcript of identical audio, if any (blobs are content-addressed)."""
+    existing = fetch_existing_transcript(prepared["gcs_path"], bq_client)
+    if existing is not None:
+        print(f"✅ Reusing stored transcript for {prepared['gcs_path']}")
+    return existing
+
+
+def _upload_segments(segments, report):
+    """
+    Upload the segments of a long recording in parallel.
+
+    Returns:
+        list[dict]: {'uri', 'offset', 'duration'} per segment, in order
+    """
+    uploaded = [None] * len(segments)
+    with ThreadPoolExecutor(max_workers=config.AUDIO_SEGMENT_UPLOAD_WORKERS) as executor:
+        futures = {
+            executor.submit(
+                upload_audio, segment.buffer(), audio_blob_name(segment.buffer(), segment.filename),
+                skip_existing=True, content_type=segment.content_type
+            ): i
+            for i, segment in enumerate(segments)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            uploaded[i] = {
+                "uri": future.result(),
+                "offset": segments[i].offset_seconds,
+                "duration": segments[i].duration_seconds,
+            }
+            report(done / len(segments))
+    return uploaded
+
+
+def _upload_stage(prepared, existing, report):
+    """
+    Upload the audio (or its segments). Skipped when a transcript exists;
+    safe to retry because blob names are content-addressed.
+
+    Returns:
+        dict | None: {'gcs_path', 'segments'}
+    """
+    if existing is not None:
+        return None
+
+    if prepared["segments"]:
+        # Only the segments are uploaded; the merged transcript is stored
+        # under the full recording's content-addressed URI
+        return {"gcs_path": prepared["gcs_path"], "segments": _upload_segments(prepared["segments"], report)}
+
+    audio = prepared["audio"]
+    if hasattr(audio, "getvalue"):
+        # Each attempt reads its own copy: an abandoned (timed-out) attempt
+        # may still be reading the caller's buffer
+        audio = io.BytesIO(audio.getvalue())
+    elif hasattr(audio, "seek"):
+        audio.seek(0)
+    gcs_path = upload_audio(
+        audio, prepared["blob_name"], skip_existing=True, content_type=prepared["content_type"],
+        progress_callback=lambda sent, total: report(min(sent / total, 1.0) if total else 1.0)
+    )
+    return {"gcs_path": gcs_path, "segments": None}
+
+
+def _submit_stage(prepared, uploaded, bq_client):
+    """Submit ML.TRANSCRIBE (reattaches to an earlier job for the same audio)."""
+    if uploaded is None:
+        return None
+    if uploaded["segments"]:
+        # Segment offsets already include the trimmed lead-in
+        return submit_transcription(uploaded["gcs_path"], bq_client, segments=uploaded["segments"])
+    return submit_transcription(uploaded["gcs_path"], bq_client, audio_offset=prepared["audio_offset"])
+
+
+class TranscriptionFailed(RuntimeError):
+    """ML.TRANSCRIBE finished without a usable transcript."""
+
+
+def _transcribe_stage(handle, existing, bq_client):
+    """Wait for the submitted job (or pass through a reused transcript)."""
+    if existing is not None:
+        return existing
+    ok, result = wait_for_transcription(handle, bq_client)
+    if not ok:
+        raise TranscriptionFailed(result)
+    return result
+
+
+INTAKE_STAGES = [
+    Stage("prepare", _prepare_stage, inputs=("audio", "filename"), outputs=("prepared",),
+          label="Preparing audio"),
+    Stage("lookup", _lookup_stage, inputs=("prepared", "bq_client"), outputs=("existing",),
+          label="Checking for an earlier transcript", timeout=config.PIPELINE_STAGE_TIMEOUT_SECONDS,
+          retries=config.PIPELINE_STAGE_RETRIES, backoff=config.PIPELINE_RETRY_BACKOFF_SECONDS),
+    Stage("upload", _upload_stage, inputs=("prepared", "existing", REPORT), outputs=("uploaded",),
+          label=PIPELINE_STEPS[0], timeout=config.PIPELINE_UPLOAD_TIMEOUT_SECONDS,
+          retries=config.PIPELINE_STAGE_RETRIES, backoff=config.PIPELINE_RETRY_BACKOFF_SECONDS),
+    # No timeout: an abandoned submit may still start its ML.TRANSCRIBE job,
+    # and a retry alongside it would start a second one
+    Stage("submit", _submit_stage, inputs=("prepared", "uploaded", "bq_client"), outputs=("handle",),
+          label=PIPELINE_STEPS[1], retries=config.PIPELINE_STAGE_RETRIES, backoff=config.PIPELINE_RETRY_BACKOFF_SECONDS),
+]
+
+# Blocking transcription (run_pipeline only); failures are not retried
+TRANSCRIBE_STAGE = Stage(
+    "transcribe", _transcribe_stage, inputs=("handle", "existing", "bq_client"), outputs=("transcripts_df",),
+    label=PIPELINE_STEPS[1], retry_on=()
+)
+
 
 # -----------------------------
-# Pipeline Function
+# Pipeline Entry Points
 # -----------------------------
-def run_pipeline(local_file, st):
+def start_pipeline(audio, progress=None, filename=None):
     """
-    End-to-end pipeline for processing a single audio file.
-    Performs upload, transcription, and stammer analysis while updating
-    progress in the Streamlit UI.
+    Upload an audio file and submit its transcription without waiting.
+
+    With AUDIO_PREPROCESS_ENABLED the audio is first downmixed, resampled
+    and silence-trimmed; the trimmed offset travels with the job so word
+    timestamps refer to the original recording. Long recordings are split
+    into overlapping segments that are uploaded and transcribed in
+    parallel, then merged into one transcript.
+
+    Audio is stored under a content hash, so a recording that was already
+    transcribed skips both the upload and ML.TRANSCRIBE.
 
     Args:
-        local_file (str): Local path to audio file (.wav or .mp3)
-        st (module): Streamlit module for UI updates
-        bq_client (bigquery.Client): BigQuery client
+        audio (str | file-like): Local path or in-memory audio buffer (.wav or .mp3)
+        progress (ProgressCallback, optional): Receives stage events
+        filename (str, optional): Original filename when `audio` is a buffer
 
     Returns:
-        tuple: (analysis dict | None, transcript embedding | None)
+        tuple:
+            (TranscriptionJob, None) when a transcription job was submitted
+            (None, (True, transcripts)) when a stored transcript was reused
+
+    Raises:
+        StageError: Upload or submission failed after retries
     """
-    # Define steps for progress display
-    steps = [
-        "Uploading audio to cloud storage",
-        "Transcribing audio using ML.TRANSCRIBE()",
-        "Analyzing stammer patterns",
-        "Generating Therapy Plans",
-        "Choosing AI-Recommended Courses Based on Your Speech Analysis",
-        "Creating Gamified Exercises Just for You"
-    ]
-
-    # Initialize Streamlit progress bar and status text
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-
-    # -----------------------------
-    # Step 1: Upload audio to GCS
-    # -----------------------------
-    status_text.text(f"📤 {steps[0]}...")
-    gcs_path = upload_audio(local_file, f"audio/{os.path.basename(local_file)}")
-    progress_bar.progress(25)
-
-    # -----------------------------
-    # Step 2: Transcribe audio
-    # -----------------------------
-    status_text.text(f"📝 {steps[1]}...")
-    result = transcribe_audio(gcs_path, bq_client)
-
-    if not result[0]:
-        # Failure → gracefully handle
-        msg = result[1]
-        st.session_state["ml_transcribe_status"] = msg
-        status_text.text(msg)
-        st.error(msg)
-
-        # Clear progress bar
-        progress_bar.empty()
-
-        # Ask user to upload again
-        return None, None  # exit gracefully
-
-    transcripts = result[1]
-    progress_bar.progress(50)
-    st.session_state["ml_transcribe_status"] = "✅ Transcription complete and stored in BigQuery"
-
-    # -----------------------------
-    # Step 3: Analyze stammer patterns
-    # -----------------------------
-    status_text.text(f"🔬 {steps[2]}...")
-    analysis, transcript_embedding,top_courses = analyze_stammer(transcripts, bq_client,progress_bar,status_text,steps)
-    progress_bar.progress(100)
-
-    # -----------------------------
-    # Pipeline complete
-    # -----------------------------
-    status_text.text("✅ Pipeline complete!")
-    return analysis, transcript_embedding,top_courses
\ No newline at end of file
+    run = StageDAG(INTAKE_STAGES).run(
+        {"audio": audio, "filename": filename, "bq_client": bq_client}, progress
+    )
+    if run.values["existing"] is not None:
+        if progress:
+            progress.on_message("✅ This recording was already transcribed, reusing it...")
+        return None, (True, run.values["existing"])
+    return run.values["handle"], None
+
+
+def finish_pipeline(transcription, progress=None):
+    """
+    Handle a finished transcription and run the stammer analysis.
+
+    Args:
+        transcription (tuple): Result of poll_transcription / transcribe_audio
+        progress (ProgressCallback, optional): Receives stage events and errors
+
+    Returns:
+        tuple: (analysis dict | None, transcript embedding | None, top courses | None)
+    """
+    progress = progress or ProgressCallback()
+
+    if not transcription[0]:
+        # Failure → gracefully handle; the caller asks for a new upload
+        progress.on_error(transcription[1])
+        return None, None, None
+
+    try:
+        outcome = analyze_stammer(transcription[1], bq_client, progress)
+    except StageError as e:
+        progress.on_error(f"❌ Analysis failed at stage '{e.stage}': {e.cause}")
+        return None, None, None
+
+    progress.on_message("✅ Pipeline complete!")
+    return outcome
+
+
+def resume_pipeline(handle, progress=None):
+    """
+    Poll a submitted transcription once; analyze it if it has finished.
+
+    Args:
+        handle (TranscriptionJob): Handle returned by start_pipeline
+        progress (ProgressCallback, optional): Receives stage events and errors
+
+    Returns:
+        tuple | None: None while transcription is still running,
+            otherwise the finish_pipeline result.
+    """
+    transcription = poll_transcription(handle, bq_client)
+    if transcription[0] is None:
+        return None
+    return finish_pipeline(transcription, progress)
+
+
+def run_pipeline(audio, progress=None, filename=None):
+    """
+    End-to-end pipeline for processing a single audio file, as one DAG:
+    intake → transcription (blocking) → analysis stages. Works headless
+    (e.g. batch jobs); pass a TimingRecorder to collect per-stage latency.
+    Use start_pipeline / resume_pipeline to poll instead of blocking.
+
+    Args:
+        audio (str | file-like): Local path or in-memory audio buffer (.wav or .mp3)
+        progress (ProgressCallback, optional): Receives stage events and errors
+        filename (str, optional): Original filename when `audio` is a buffer
+
+    Returns:
+        tuple: (analysis dict | None, transcript embedding | None, top courses | None)
+    """
+    progress = progress or ProgressCallback()
+    dag = StageDAG(INTAKE_STAGES + [TRANSCRIBE_STAGE] + ANALYSIS_STAGES, max_workers=config.ANALYSIS_MAX_WORKERS)
+    try:
+        run = dag.run({"audio": audio, "filename": filename, "bq_client": bq_client}, progress)
+    except StageError as e:
+        progress.on_error(f"❌ Pipeline failed at stage '{e.stage}': {e.cause}")
+        return None, None, None
+
+    progress.on_message("✅ Pipeline complete!")
+    return run.values["result"], run.values["transcript_embedding"], run.values["top_courses"]
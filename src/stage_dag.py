@@ -0,0 +1,357 @@
+# ==============================
+# src/stage_dag.py
+# ==============================
+# Small DAG executor for pipeline stages.
+#
+# Each Stage declares the named values it reads (inputs) and produces
+# (outputs). A StageDAG runs every stage as soon as its inputs exist, so
+# independent stages overlap on a thread pool, and records a timing per
+# stage. Stages have their own timeout and retry policy.
+#
+# Progress is reported through a ProgressCallback (all calls are made
+# from the thread that called run(), never from worker threads), so the
+# same DAG can drive a Streamlit page or run headless in a batch job.
+
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field, asdict
+
+# Reserved input name: a stage listing it receives report(fraction, message=None)
+REPORT = "report"
+
+
+@dataclass
+class Stage:
+    """
+    One unit of work in a StageDAG.
+
+    Attributes:
+        name (str): Unique stage name
+        func (callable): Called with its inputs as keyword arguments
+        inputs (tuple[str]): Names of the values the stage reads
+        outputs (tuple[str]): Names for the returned value(s); with more
+            than one output, func returns a tuple in the same order
+        label (str, optional): Human-readable text for progress displays
+        timeout (float, optional): Seconds per attempt before it is abandoned,
+            counted from when a worker starts running it (not while queued).
+            An abandoned attempt keeps running in its thread, so only set
+            a timeout on stages whose retries cannot conflict with it
+        retries (int): Extra attempts after a failure or timeout
+        backoff (float): Delay before retry n is backoff * 2 ** (n - 1)
+        retry_on (tuple[type]): Exceptions that trigger a retry
+    """
+    name: str
+    func: callable
+    inputs: tuple = ()
+    outputs: tuple = ()
+    label: str = None
+    timeout: float = None
+    retries: int = 0
+    backoff: float = 1.0
+    retry_on: tuple = (Exception,)
+
+
+@dataclass
+class StageTiming:
+    """
+    Timing record for one stage of a run.
+
+    Attributes:
+        name (str): Stage name
+        status (str): 'ok', 'failed', 'timeout' or 'cancelled'
+        attempts (int): Attempts made
+        started_at (float): Offset of the first attempt from the run start (s)
+        seconds (float): Wall time from first attempt to completion (s)
+        error (str | None): Last error message
+    """
+    name: str
+    status: str = "pending"
+    attempts: int = 0
+    started_at: float = None
+    seconds: float = None
+    error: str = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class StageError(RuntimeError):
+    """A stage failed after its retries; `timings` covers the whole run."""
+
+    def __init__(self, stage, cause, timings):
+        super().__init__(f"Stage '{stage}' failed: {cause}")
+        self.stage = stage
+        self.cause = cause
+        self.timings = timings
+
+
+class ProgressCallback:
+    """
+    Receives progress from StageDAG.run and the pipeline. The default
+    implementation ignores everything (headless runs).
+    """
+
+    def on_stage_start(self, stage, label):
+        pass
+
+    def on_stage_progress(self, stage, fraction, message=None):
+        pass
+
+    def on_stage_end(self, stage, timing, done, total):
+        pass
+
+    def on_message(self, text):
+        pass
+
+    def on_error(self, text):
+        pass
+
+
+class TimingRecorder(ProgressCallback):
+    """
+    Headless callback that keeps every stage timing and message, e.g. for
+    batch jobs measuring per-stage latency across runs.
+    """
+
+    def __init__(self):
+        self.timings = []
+        self.messages = []
+        self.errors = []
+
+    def on_stage_end(self, stage, timing, done, total):
+        self.timings.append(timing)
+
+    def on_message(self, text):
+        self.messages.append(text)
+
+    def on_error(self, text):
+        self.errors.append(text)
+
+
+@dataclass
+class DAGRun:
+    """
+    Result of StageDAG.run.
+
+    Attributes:
+        values (dict): Initial inputs plus every stage output
+        timings (dict[str, StageTiming]): Per-stage timing, in completion order
+        seconds (float): Wall time of the whole run
+    """
+    values: dict
+    timings: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def timing_summary(self):
+        """One line per stage, e.g. 'therapy_plan ok 1.82s (1 attempt)'."""
+        return [
+            f"{t.name} {t.status} {t.seconds or 0:.2f}s ({t.attempts} attempt{'s' if t.attempts != 1 else ''})"
+            for t in self.timings.values()
+        ]
+
+
+class StageDAG:
+    """
+    Validated set of stages, runnable many times.
+
+    Args:
+        stages (list[Stage]): Stages in any order
+        max_workers (int): Stages that may run at the same time
+
+    Raises:
+        ValueError: Duplicate names or outputs, or a dependency cycle
+    """
+
+    def __init__(self, stages, max_workers=4):
+        self.stages = {}
+        self.max_workers = max_workers
+        self._producer = {}
+
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            self.stages[stage.name] = stage
+            for output in stage.outputs:
+                if output in self._producer or output == REPORT:
+                    raise ValueError(f"Output '{output}' of stage '{stage.name}' is already produced elsewhere")
+                self._producer[output] = stage.name
+
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        deps = {
+            name: {self._producer[i] for i in stage.inputs if i in self._producer}
+            for name, stage in self.stages.items()
+        }
+        order = []
+        while deps:
+            ready = [name for name, d in deps.items() if not d]
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages: {sorted(deps)}")
+            for name in ready:
+                order.append(name)
+                del deps[name]
+            for d in deps.values():
+                d.difference_update(ready)
+        return order
+
+    def required_inputs(self):
+        """Names the caller must pass to run()."""
+        return sorted({
+            i for stage in self.stages.values() for i in stage.inputs
+            if i not in self._producer and i != REPORT
+        })
+
+    # -----------------------------
+    # Execution
+    # -----------------------------
+    def run(self, inputs, progress=None, poll_interval=0.05):
+        """
+        Run every stage once its inputs are available.
+
+        Args:
+            inputs (dict): Initial values (see required_inputs)
+            progress (ProgressCallback, optional): Receives stage events on
+                the calling thread
+            poll_interval (float): Max seconds between checks for timeouts
+                and worker progress reports
+
+        Returns:
+            DAGRun: All values and per-stage timings
+
+        Raises:
+            ValueError: Missing initial inputs
+            StageError: A stage failed after its retries
+        """
+        missing = [name for name in self.required_inputs() if name not in inputs]
+        if missing:
+            raise ValueError(f"Missing DAG inputs: {missing}")
+
+        progress = progress or ProgressCallback()
+        values = dict(inputs)
+        timings = {}
+        reports = queue.Queue()
+        run_start = time.perf_counter()
+
+        pending = list(self.order)      # not started yet
+        retry_at = {}                   # stage → earliest time of its next attempt
+        running = {}                    # future → (stage name, [worker start time])
+        state = {name: StageTiming(name) for name in self.order}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+
+        def submit(name):
+            stage = self.stages[name]
+            timing = state[name]
+            now = time.perf_counter()
+            if timing.attempts == 0:
+                timing.started_at = now - run_start
+                progress.on_stage_start(name, stage.label or name)
+            timing.attempts += 1
+
+            kwargs = {i: values[i] for i in stage.inputs if i != REPORT}
+            if REPORT in stage.inputs:
+                kwargs[REPORT] = lambda fraction, message=None: reports.put((name, fraction, message))
+            began = []
+
+            def attempt():
+                began.append(time.perf_counter())  # the deadline starts here, not at submit
+                return stage.func(**kwargs)
+
+            running[executor.submit(attempt)] = (name, began)
+
+        def deadline(name, began):
+            timeout = self.stages[name].timeout
+            return began[0] + timeout if timeout and began else None
+
+        def finish(name, status, error=None):
+            timing = state[name]
+            timing.status, timing.error = status, error
+            timing.seconds = time.perf_counter() - run_start - timing.started_at
+            timings[name] = timing
+            progress.on_stage_end(name, timing, len(timings), len(self.order))
+
+        def fail_or_retry(name, error):
+            stage = self.stages[name]
+            timing = state[name]
+            retryable = isinstance(error, stage.retry_on) or isinstance(error, TimeoutError)
+            if retryable and timing.attempts <= stage.retries:
+                delay = stage.backoff * 2 ** (timing.attempts - 1)
+                print(f"▶️ Retrying stage {name} in {delay:.1f}s (attempt {timing.attempts + 1}): {error}")
+                retry_at[name] = time.perf_counter() + delay
+                return None
+            return error
+
+        try:
+            while pending or running or retry_at:
+                now = time.perf_counter()
+
+                # Start stages whose inputs exist and retries that are due
+                for name in [n for n, t in retry_at.items() if t <= now]:
+                    del retry_at[name]
+                    submit(name)
+                for name in list(pending):
+                    if all(i in values or i == REPORT for i in self.stages[name].inputs):
+                        pending.remove(name)
+                        submit(name)
+
+                if not running and not retry_at:
+                    break  # nothing can make progress (inputs never produced)
+
+                wake = [poll_interval]
+                wake += [t - now for t in retry_at.values()]
+                wake += [d - now for d in (deadline(*r) for r in running.values()) if d is not None]
+                done, _ = wait(list(running), timeout=max(0.0, min(wake)), return_when=FIRST_COMPLETED)
+
+                while not reports.empty():
+                    progress.on_stage_progress(*reports.get_nowait())
+
+                for future in done:
+                    name, _ = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        error = fail_or_retry(name, e)
+                        if error is not None:
+                            finish(name, "failed", str(error))
+                            raise StageError(name, error, timings) from error
+                        continue
+
+                    if len(stage.outputs) == 1:
+                        values[stage.outputs[0]] = result
+                    elif stage.outputs:
+                        if not isinstance(result, tuple) or len(result) != len(stage.outputs):
+                            error = ValueError(f"expected {len(stage.outputs)} outputs, got {result!r:.80}")
+                            finish(name, "failed", str(error))
+                            raise StageError(name, error, timings)
+                        values.update(zip(stage.outputs, result))
+                    finish(name, "ok")
+
+                # Abandon attempts past their deadline (the worker thread is left to finish)
+                now = time.perf_counter()
+                for future, (name, began) in list(running.items()):
+                    due = deadline(name, began)
+                    if due is not None and now >= due:
+                        del running[future]
+                        future.cancel()
+                        error = TimeoutError(f"timed out after {self.stages[name].timeout}s")
+                        if fail_or_retry(name, error) is not None:
+                            finish(name, "timeout", str(error))
+                            raise StageError(name, error, timings)
+
+            unfinished = [name for name in self.order if name not in timings]
+            if unfinished:
+                raise ValueError(f"Stages never became ready: {unfinished}")
+        except StageError:
+            for name in self.order:
+                if name not in timings:
+                    state[name].status = "cancelled"
+                    timings[name] = state[name]
+            raise
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        run = DAGRun(values=values, timings=timings, seconds=time.perf_counter() - run_start)
+        print(f"⏱️ DAG finished in {run.seconds:.2f}s: " + "; ".join(run.timing_summary()))
+        return run
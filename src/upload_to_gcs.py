@@ -5,41 +5,159 @@
 # using the configured bucket from the project settings.
 
 import os
+import io
+import hashlib
+import mimetypes
 from src import config
 from src.clients import get_storage_client
 
+# -----------------------------
+# Content Addressing
+# -----------------------------
+def hash_audio(source, chunk_size=1024 * 1024):
+    """
+    SHA-256 of audio bytes, read in chunks.
+
+    Args:
+        source (str | file-like): Local path, or a seekable binary buffer
+            (e.g. a Streamlit UploadedFile / BytesIO). Buffers are rewound
+            to where they started.
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    else:
+        start = source.tell()
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+        source.seek(start)
+    return digest.hexdigest()
+
+
+def audio_blob_name(source, filename=None):
+    """
+    Content-addressed blob name: 'audio/<sha256><ext>'.
+    Identical recordings map to the same blob (and transcript).
+
+    Args:
+        source (str | file-like): Local path or binary buffer
+        filename (str, optional): Original filename (for the extension)
+            when `source` is a buffer
+    """
+    name = filename or (source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", ""))
+    ext = os.path.splitext(str(name))[1].lower()
+    return f"audio/{hash_audio(source)}{ext}"
+
+
+# -----------------------------
+# Streaming Upload Helpers
+# -----------------------------
+class _ProgressReader:
+    """
+    File wrapper that reports bytes handed to the uploader.
+    seek/tell pass through, so resumable retries rewind correctly.
+    """
+
+    def __init__(self, fileobj, total, callback):
+        self._fileobj = fileobj
+        self._total = total
+        self._callback = callback
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        if self._callback:
+            self._callback(self._fileobj.tell(), self._total)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._fileobj, name)
+
+
+def _buffer_size(fileobj):
+    """Bytes remaining in a seekable buffer."""
+    start = fileobj.tell()
+    fileobj.seek(0, io.SEEK_END)
+    size = fileobj.tell() - start
+    fileobj.seek(start)
+    return size
+
+
 # -----------------------------
 # Upload Audio Files
 # -----------------------------
-def upload_audio(local_file, dest_blob_name=None):
+def upload_audio(source, dest_blob_name=None, skip_existing=False, content_type=None, progress_callback=None):
     """
-    Uploads a local audio file to GCS.
+    Stream an audio file or in-memory buffer to GCS.
+
+    Small files go up in a single request; files above
+    UPLOAD_RESUMABLE_THRESHOLD use a resumable upload in UPLOAD_CHUNK_SIZE
+    chunks, and local files above UPLOAD_PARALLEL_THRESHOLD are uploaded as
+    parallel chunks. Nothing is copied to a temporary file.
 
     Args:
-        local_file (str): Path to local audio file (.wav, .mp3)
+        source (str | file-like): Local path, or binary buffer (e.g. a
+            Streamlit UploadedFile / BytesIO) read from its current position
         dest_blob_name (str, optional): Destination blob path in GCS.
             Defaults to 'audio/<filename>' if not provided.
+        skip_existing (bool): Don't re-upload when the blob already exists
+            (safe for content-addressed names).
+        content_type (str, optional): MIME type; guessed from the name if omitted.
+        progress_callback (callable, optional): Called as (bytes_sent, total_bytes).
 
     Returns:
         str: GCS URI of uploaded audio file
     """
     client = get_storage_client()
     bucket = client.bucket(config.BUCKET_NAME)
+    is_path = isinstance(source, (str, os.PathLike))
 
     # Determine destination blob name
     if not dest_blob_name:
-        dest_blob_name = os.path.basename(local_file)
+        dest_blob_name = os.path.basename(source if is_path else getattr(source, "name", "audio"))
     else:
         # Ensure path is sanitized and prefixed with "audio/"
         filename = os.path.basename(dest_blob_name)
         dest_blob_name = f"audio/{filename}" if not dest_blob_name.startswith("audio/") else dest_blob_name
 
-    # Upload file to GCS
+    gcs_uri = f"gs://{config.BUCKET_NAME}/{dest_blob_name}"
     blob = bucket.blob(dest_blob_name)
-    blob.upload_from_filename(local_file)
 
-    gcs_uri = f"gs://{config.BUCKET_NAME}/{dest_blob_name}"
-    print(f"✅ Uploaded to {gcs_uri}")
+    if skip_existing and blob.exists():
+        print(f"✅ Already in storage, skipping upload: {gcs_uri}")
+        return gcs_uri
+
+    content_type = content_type or mimetypes.guess_type(dest_blob_name)[0] or "application/octet-stream"
+
+    if is_path and os.path.getsize(source) > config.UPLOAD_PARALLEL_THRESHOLD:
+        # Large local file → parallel chunk upload (XML multipart API)
+        from google.cloud.storage import transfer_manager
+        total = os.path.getsize(source)
+        transfer_manager.upload_chunks_concurrently(
+            source, blob, content_type=content_type,
+            chunk_size=config.UPLOAD_CHUNK_SIZE, worker_type=transfer_manager.THREAD
+        )
+        if progress_callback:
+            progress_callback(total, total)
+    else:
+        fileobj = open(source, "rb") if is_path else source
+        try:
+            total = _buffer_size(fileobj)
+            if total > config.UPLOAD_RESUMABLE_THRESHOLD:
+                blob.chunk_size = config.UPLOAD_CHUNK_SIZE  # resumable, chunked
+            blob.upload_from_file(
+                _ProgressReader(fileobj, total, progress_callback),
+                size=total, content_type=content_type
+            )
+        finally:
+            if is_path:
+                fileobj.close()
+
+    print(f"✅ Uploaded to {gcs_uri} ({total:,} bytes)")
     return gcs_uri
 
 # -----------------------------
@@ -0,0 +1,275 @@
+# ==============================
+# src/vector_index.py
+# ==============================
+# In-memory vector search helpers shared by the local indexes:
+#
+#   normalize_rows / top_k_cosine   exact cosine search over a matrix
+#   IVFIndex                        inverted-file index (spherical k-means
+#                                   lists); candidates from the nprobe
+#                                   nearest lists are re-ranked exactly
+#   quantize_rows / top_k_rescored  float16 or per-row scaled int8 codes
+#                                   for the candidate scan; a short list
+#                                   is rescored from a float16/float32 copy
+#
+# All vectors are row-normalized (float32, or float16 when stored at
+# reduced precision), so cosine similarity is a dot product and cosine
+# distance is 1 - dot. Scores are always computed in float32.
+
+import os
+
+import numpy as np
+
+# Rows scored per matrix product when assigning / brute-forcing large matrices
+CHUNK_ROWS = 65536
+
+
+# -----------------------------
+# Exact Search
+# -----------------------------
+def normalize_rows(matrix):
+    """L2-normalize rows as float32 (zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def top_k_cosine(matrix, query, k, rows=None):
+    """
+    Exact top-k by cosine similarity against a row-normalized matrix.
+
+    Args:
+        matrix (np.ndarray): Row-normalized vectors (may be a memmap)
+        query (array-like): Query vector (normalized here)
+        k (int): Results to return
+        rows (np.ndarray, optional): Restrict the search to these row ids
+
+    Returns:
+        tuple: (row indices, cosine distances 1 - cos), nearest first
+    """
+    n = len(matrix) if rows is None else len(rows)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    q = normalize_rows(query)[0]
+    if rows is None:
+        scores = np.concatenate([matrix[i:i + CHUNK_ROWS] @ q for i in range(0, n, CHUNK_ROWS)])
+    else:
+        rows = np.sort(rows)  # sequential reads from a memmap
+        scores = np.concatenate([matrix[rows[i:i + CHUNK_ROWS]] @ q for i in range(0, n, CHUNK_ROWS)])
+
+    k = min(k, n)
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best], kind="stable")]
+    ids = best if rows is None else rows[best]
+    return ids.astype(np.int64), 1.0 - scores[best]
+
+
+# -----------------------------
+# Reduced Precision
+# -----------------------------
+# Bytes per dimension: float32 4, float16 2, int8 1 (+ one float32 scale per row)
+PRECISIONS = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Rows kept for ranking at each storage precision. float32 and float16 are
+# scanned and ranked directly; int8 codes are only the scan copy, so the
+# candidates they select are rescored from a float16 copy
+RESCORE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.float16}
+
+
+def storage_bytes_per_row(precision, dim):
+    """Bytes stored per vector at `precision` (ranking copy + int8 codes and scale)."""
+    size = np.dtype(RESCORE_DTYPES[precision]).itemsize * dim
+    return size + dim + 4 if precision == "int8" else size
+
+
+def quantize_rows(matrix, precision):
+    """
+    Reduced-precision copy of a matrix.
+
+    int8 uses one scale per row (max |x| / 127), so each row keeps its
+    magnitude (norm) and only the per-dimension resolution is reduced.
+
+    Args:
+        matrix (np.ndarray): float vectors, one per row
+        precision (str): 'float32', 'float16' or 'int8'
+
+    Returns:
+        tuple: (codes, scales) where scales is a float32 array for int8
+            and None otherwise
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unsupported precision: {precision}")
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if precision != "int8":
+        return matrix.astype(PRECISIONS[precision]), None
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def dequantize_rows(codes, scales=None):
+    """float32 approximation of quantize_rows output."""
+    matrix = np.asarray(codes, dtype=np.float32)
+    return matrix * scales[:, None] if scales is not None else matrix
+
+
+def top_k_rescored(codes, scales, matrix, query, k, rows=None, rescore_factor=4):
+    """
+    Top-k by cosine: score every row (or `rows`) on the quantized codes,
+    then rescore the best k * rescore_factor from `matrix`.
+
+    Args:
+        codes (np.ndarray): Quantized rows (see quantize_rows)
+        scales (np.ndarray | None): int8 row scales
+        matrix (np.ndarray): Row-normalized float16/float32 vectors used for
+            rescoring (may be a memmap)
+        query (array-like): Query vector
+        k (int): Results to return
+        rows (np.ndarray, optional): Restrict the search to these row ids
+        rescore_factor (int): Candidates kept per result for rescoring
+
+    Returns:
+        tuple: (row indices, cosine distances 1 - cos), nearest first
+    """
+    n = len(codes) if rows is None else len(rows)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    q = normalize_rows(query)[0]
+    ids = np.arange(len(codes)) if rows is None else np.sort(rows)
+    scores = np.empty(n, dtype=np.float32)
+    for i in range(0, n, CHUNK_ROWS):
+        chunk = ids[i:i + CHUNK_ROWS]
+        part = codes[chunk[0]:chunk[-1] + 1] if rows is None else codes[chunk]
+        scores[i:i + len(chunk)] = np.asarray(part, dtype=np.float32) @ q
+    if scales is not None:
+        scores *= scales[ids]
+
+    shortlist = min(n, k * rescore_factor)
+    candidates = ids[np.argpartition(-scores, shortlist - 1)[:shortlist]]
+    return top_k_cosine(matrix, q, k, rows=candidates)
+
+
+# -----------------------------
+# IVF Index
+# -----------------------------
+def _nearest_centroid(vectors, centroids):
+    return np.concatenate([
+        np.argmax(vectors[i:i + CHUNK_ROWS] @ centroids.T, axis=1)
+        for i in range(0, len(vectors), CHUNK_ROWS)
+    ]).astype(np.int32) if len(vectors) else np.empty(0, dtype=np.int32)
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=8, seed=0):
+    """
+    k-means on the unit sphere (centroids re-normalized every step).
+    Empty clusters are re-seeded from random vectors.
+
+    Returns:
+        np.ndarray: (n_clusters, dim) normalized centroids
+    """
+    rng = np.random.default_rng(seed)
+    vectors = normalize_rows(vectors)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _nearest_centroid(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over the rows of an external matrix.
+
+    Args:
+        centroids (np.ndarray): (nlist, dim) normalized list centroids
+        assignments (np.ndarray, optional): List id of each indexed row
+        trained_rows (int): Rows the centroids were trained on (used to
+            decide when to retrain)
+    """
+
+    def __init__(self, centroids, assignments=None, trained_rows=0):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assignments = np.asarray(assignments if assignments is not None else [], dtype=np.int32)
+        self.trained_rows = trained_rows
+        self._order = None
+        self._offsets = None
+
+    def __len__(self):
+        return len(self.assignments)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @staticmethod
+    def default_nlist(n_rows):
+        """About sqrt(n) lists, at least 1."""
+        return max(1, int(np.sqrt(n_rows)))
+
+    @classmethod
+    def train(cls, matrix, nlist=None, sample_size=None, iterations=8, seed=0):
+        """
+        Train centroids on a sample of `matrix` and index all of its rows.
+
+        Args:
+            matrix (np.ndarray): Row-normalized vectors (may be a memmap)
+            nlist (int, optional): Number of lists (default ~sqrt(rows))
+            sample_size (int, optional): Training rows (default 40 per list)
+        """
+        n = len(matrix)
+        nlist = nlist or cls.default_nlist(n)
+        sample_size = min(n, sample_size or 40 * nlist)
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(matrix[np.sort(rng.choice(n, sample_size, replace=False))])
+
+        index = cls(spherical_kmeans(sample, nlist, iterations=iterations, seed=seed), trained_rows=n)
+        index.add(matrix)
+        return index
+
+    def add(self, vectors):
+        """Assign new rows (appended after the ones already indexed)."""
+        self.assignments = np.concatenate([self.assignments, _nearest_centroid(vectors, self.centroids)])
+        self._order = None
+
+    def _lists(self):
+        if self._order is None:
+            self._order = np.argsort(self.assignments, kind="stable")
+            self._offsets = np.searchsorted(self.assignments[self._order], np.arange(self.nlist + 1))
+        return self._order, self._offsets
+
+    def candidates(self, query, nprobe):
+        """Row ids in the `nprobe` lists nearest to `query`."""
+        order, offsets = self._lists()
+        q = normalize_rows(query)[0]
+        nprobe = min(nprobe, self.nlist)
+        probe = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+        return np.concatenate([order[offsets[p]:offsets[p + 1]] for p in probe])
+
+    def search(self, matrix, query, k, nprobe):
+        """Approximate top-k: exact cosine re-rank of the probed lists' rows."""
+        return top_k_cosine(matrix, query, k, rows=self.candidates(query, nprobe))
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, assignments=self.assignments, trained_rows=self.trained_rows)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["centroids"], data["assignments"], int(data["trained_rows"]))
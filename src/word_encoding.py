@@ -0,0 +1,151 @@
+# ==============================
+# src/word_encoding.py
+# ==============================
+# Compact storage format for word-level analysis (words_df).
+#
+# Instead of one JSON record per word (repeating every key and writing
+# full-precision floats), a words_df is stored as a small JSON object:
+#
+#   {
+#     "format": "speakaura.words.v1",
+#     "n": <word count>,
+#     "flags": ["is_filler", "is_repetition", ...],
+#     "words": base64(zlib(words joined by \x1f)),
+#     "timings": base64(zlib(int32 [start deltas..., durations...] in ms)),
+#     "flag_bits": base64(zlib(packbits of the flag columns, one row per word))
+#   }
+#
+# The pause column is not stored; it is recomputed from the timings.
+# Legacy rows written with to_json(orient="records") still decode.
+
+import base64
+import json
+import zlib
+
+import numpy as np
+import pandas as pd
+
+WORDS_FORMAT = "speakaura.words.v1"
+
+# Unit separator: never appears inside a recognized word
+_WORD_SEPARATOR = "\x1f"
+
+
+def _pack(raw: bytes) -> str:
+    return base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+
+
+def _unpack(text: str) -> bytes:
+    return zlib.decompress(base64.b64decode(text))
+
+
+# -----------------------------
+# Encode
+# -----------------------------
+def encode_words_df(words_df: pd.DataFrame) -> dict:
+    """
+    Encode a word-level analysis DataFrame into the compact format.
+
+    Timings are quantized to milliseconds (the resolution Speech-to-Text
+    reports) and delta-encoded, so decoding reproduces the float32 offsets
+    exactly.
+
+    Args:
+        words_df (pd.DataFrame): Word-level analysis with columns
+            ['word', 'start_time', 'end_time', ...] plus boolean 'is_*' flags.
+
+    Returns:
+        dict: JSON-serializable compact representation.
+    """
+    flag_columns = [c for c in words_df.columns if c.startswith("is_")]
+    n = len(words_df)
+
+    words = _WORD_SEPARATOR.join(words_df["word"].astype(str)).encode("utf-8")
+
+    start_ms = np.rint(words_df["start_time"].to_numpy(dtype=np.float64) * 1000).astype(np.int64)
+    end_ms = np.rint(words_df["end_time"].to_numpy(dtype=np.float64) * 1000).astype(np.int64)
+    start_deltas = np.diff(start_ms, prepend=0)
+    timings = np.concatenate([start_deltas, end_ms - start_ms]).astype("<i4")
+
+    if flag_columns:
+        flags = words_df[flag_columns].to_numpy(dtype=bool)
+        flag_bits = np.packbits(flags, axis=1, bitorder="little").tobytes()
+    else:
+        flag_bits = b""
+
+    return {
+        "format": WORDS_FORMAT,
+        "n": n,
+        "flags": flag_columns,
+        "words": _pack(words),
+        "timings": _pack(timings.tobytes()),
+        "flag_bits": _pack(flag_bits),
+    }
+
+
+def encode_words_df_json(words_df: pd.DataFrame) -> str:
+    """Compact encoding serialized as a JSON string (for the words_df JSON column)."""
+    return json.dumps(encode_words_df(words_df), separators=(",", ":"))
+
+
+# -----------------------------
+# Decode
+# -----------------------------
+def _decode_compact(data: dict) -> pd.DataFrame:
+    n = data["n"]
+    flag_columns = data["flags"]
+
+    words = _unpack(data["words"]).decode("utf-8").split(_WORD_SEPARATOR) if n else []
+
+    timings = np.frombuffer(_unpack(data["timings"]), dtype="<i4").astype(np.int64)
+    start_ms = np.cumsum(timings[:n])
+    end_ms = start_ms + timings[n:]
+    start_time = (start_ms / 1000).astype(np.float32)
+    end_time = (end_ms / 1000).astype(np.float32)
+
+    pause = np.full(n, np.nan, dtype=np.float32)
+    if n > 1:
+        pause[:-1] = start_time[1:] - end_time[:-1]
+
+    df = pd.DataFrame({
+        "word": np.array(words, dtype=object),
+        "start_time": start_time,
+        "end_time": end_time,
+        "pause": pause,
+    })
+
+    if flag_columns:
+        row_bytes = (len(flag_columns) + 7) // 8
+        packed = np.frombuffer(_unpack(data["flag_bits"]), dtype=np.uint8).reshape(n, row_bytes)
+        flags = np.unpackbits(packed, axis=1, count=len(flag_columns), bitorder="little").astype(bool)
+        for i, column in enumerate(flag_columns):
+            df[column] = flags[:, i]
+
+    return df
+
+
+def decode_words_df(value) -> pd.DataFrame:
+    """
+    Load a stored words_df back into a DataFrame.
+
+    Accepts the compact format (dict or JSON string), legacy
+    to_json(orient="records") values (list or JSON string), an existing
+    DataFrame, or None.
+
+    Returns:
+        pd.DataFrame: Word-level analysis.
+    """
+    if isinstance(value, pd.DataFrame):
+        return value
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return pd.DataFrame()
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        value = json.loads(value) if value.strip() else []
+
+    if isinstance(value, dict) and value.get("format") == WORDS_FORMAT:
+        return _decode_compact(value)
+
+    # Legacy: one JSON record per word
+    return pd.DataFrame(value)
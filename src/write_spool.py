@@ -0,0 +1,352 @@
+# ==============================
+# src/write_spool.py
+# ==============================
+# Durable write-behind spool for BigQuery writes.
+#
+# Rows are first appended to a local SQLite spool (so the request path
+# returns immediately and nothing is lost during a BigQuery outage), then
+# a background flusher writes them in batches:
+#
+#   mode "stream": insert_rows_json with row_ids (e.g. run_id) as
+#                  insertId dedupe keys
+#   mode "load":   one load job per batch; the job id is derived from the
+#                  spooled row ids, so a batch replayed after a crash is
+#                  rejected as a duplicate instead of appended twice. A
+#                  conflicting id only counts as loaded if that job
+#                  succeeded; after a failed job the batch is retried
+#                  under the next id (spool_<digest>_1, _2, ...)
+#
+# Durability: the spool file lives in SPOOL_DIR. The default (CACHE_DIR,
+# under the temp directory) does not survive an instance replacement on
+# ephemeral hosts such as Cloud Run, and the exit flush does not run on
+# SIGTERM; point SPOOL_DIR at a persistent volume there.
+#
+# Failed batches are retried with exponential backoff. Rows BigQuery
+# rejects as invalid are kept in the spool (status 'dead') for inspection.
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from google.api_core.exceptions import Conflict, NotFound
+
+from src import config
+from src.lazy_imports import lazy_import
+
+bigquery = lazy_import("google.cloud.bigquery")
+
+STREAM = "stream"
+LOAD = "load"
+
+# Load job ids tried per batch before giving up until the next flush
+MAX_LOAD_JOB_IDS = 20
+
+
+def _coerce_to_schema(rows, schema):
+    """Serialize nested values destined for STRING columns (e.g. JSON payloads stored as text)."""
+    string_fields = [f.name for f in schema if f.field_type == "STRING"]
+    for row in rows:
+        for name in string_fields:
+            if isinstance(row.get(name), (dict, list)):
+                row[name] = json.dumps(row[name])
+    return rows
+
+
+class WriteSpool:
+    """
+    SQLite-backed write-behind queue with a background flusher.
+
+    Args:
+        path (str): SQLite spool file
+        batch_rows (int): Flush as soon as this many rows are pending
+        max_age (float): Flush rows older than this many seconds
+        max_backoff (float): Upper bound of the retry delay in seconds
+    """
+
+    def __init__(self, path, batch_rows=500, max_age=5.0, max_backoff=300.0):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.max_age = max_age
+        self.max_backoff = max_backoff
+
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._bq_client = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_id TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                row_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                last_error TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_spool_pending ON spool(status, table_id, next_attempt)")
+        self._db.commit()
+
+    # -----------------------------
+    # Enqueue
+    # -----------------------------
+    def enqueue(self, table_id, rows, row_ids, mode=STREAM):
+        """
+        Durably append rows for `table_id`.
+
+        Args:
+            table_id (str): Fully qualified destination table
+            rows (list[dict]): JSON-serializable rows
+            row_ids (list[str]): Dedupe key per row
+            mode (str): 'stream' (insert_rows_json) or 'load' (load job)
+
+        Returns:
+            int: Number of rows spooled
+        """
+        if len(rows) != len(row_ids):
+            raise ValueError("rows and row_ids must have the same length")
+        if mode not in (STREAM, LOAD):
+            raise ValueError(f"Unknown spool mode: {mode}")
+
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO spool (table_id, mode, row_id, payload, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                [(table_id, mode, str(rid), json.dumps(row), now) for row, rid in zip(rows, row_ids)]
+            )
+            self._db.commit()
+
+        if self.pending_count() >= self.batch_rows:
+            self._wake.set()
+        return len(rows)
+
+    # -----------------------------
+    # Inspection
+    # -----------------------------
+    def pending_count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM spool WHERE status = 'pending'").fetchone()[0]
+
+    def pending_rows(self, table_id):
+        """Spooled rows for `table_id` not yet written (for read-your-writes lookups)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT payload FROM spool WHERE status = 'pending' AND table_id = ? ORDER BY id",
+                (table_id,)
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM spool GROUP BY status").fetchall())
+            oldest = self._db.execute("SELECT MIN(enqueued_at) FROM spool WHERE status = 'pending'").fetchone()[0]
+        return {
+            "pending": counts.get("pending", 0),
+            "dead": counts.get("dead", 0),
+            "oldest_pending_age": time.time() - oldest if oldest else 0.0,
+        }
+
+    def _due(self, now):
+        """True when a batch is full or the oldest pending row is old enough."""
+        with self._lock:
+            count, oldest = self._db.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM spool WHERE status = 'pending' AND next_attempt <= ?",
+                (now,)
+            ).fetchone()
+        return count >= self.batch_rows or (count > 0 and now - oldest >= self.max_age)
+
+    # -----------------------------
+    # Flush
+    # -----------------------------
+    def flush(self, bq_client, now=None):
+        """
+        Write every due batch once.
+
+        Returns:
+            int: Rows written successfully
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            groups = self._db.execute(
+                "SELECT DISTINCT table_id, mode FROM spool WHERE status = 'pending' AND next_attempt <= ?",
+                (now,)
+            ).fetchall()
+
+        written = 0
+        for table_id, mode in groups:
+            while True:
+                with self._lock:
+                    batch = self._db.execute(
+                        """
+                        SELECT id, row_id, payload, attempts FROM spool
+                        WHERE status = 'pending' AND table_id = ? AND mode = ? AND next_attempt <= ?
+                        ORDER BY id LIMIT ?
+                        """,
+                        (table_id, mode, now, self.batch_rows)
+                    ).fetchall()
+                if not batch:
+                    break
+
+                ok = self._write_batch(bq_client, table_id, mode, batch, now)
+                written += ok
+                if ok < len(batch):
+                    break  # backing off; leave the rest of this table for the next round
+        return written
+
+    def _write_batch(self, bq_client, table_id, mode, batch, now):
+        ids = [b[0] for b in batch]
+        row_ids = [b[1] for b in batch]
+        rows = [json.loads(b[2]) for b in batch]
+
+        try:
+            if mode == STREAM:
+                errors = bq_client.insert_rows_json(table_id, rows, row_ids=row_ids)
+            else:
+                errors = self._load(bq_client, table_id, rows, row_ids)
+        except Exception as e:
+            print(f"❌ Spool flush to {table_id} failed ({len(batch)} rows): {e}")
+            self._retry(batch, str(e), now)
+            return 0
+
+        # insert_rows_json reports per-row errors: rows rejected as invalid
+        # are parked, the rest of the failed rows (stopped) are retried.
+        failed = {err["index"]: err["errors"] for err in errors or []}
+        if failed:
+            invalid = {i for i, errs in failed.items() if any(e.get("reason") == "invalid" for e in errs)}
+            self._park([(batch[i], failed[i]) for i in invalid])
+            self._retry([batch[i] for i in failed if i not in invalid], "stopped", now)
+            print(f"❌ Spool flush to {table_id}: {len(invalid)} invalid, {len(failed) - len(invalid)} retried")
+
+        done = [(ids[i],) for i in range(len(batch)) if i not in failed]
+        with self._lock:
+            self._db.executemany("DELETE FROM spool WHERE id = ?", done)
+            self._db.commit()
+        if done:
+            print(f"✅ Flushed {len(done)} spooled rows to {table_id}")
+        return len(done)
+
+    def _load(self, bq_client, table_id, rows, row_ids):
+        """
+        One load job per batch with a deterministic job id.
+
+        A Conflict means an earlier flush already created that job: the
+        batch counts as loaded only if the job finished without error
+        (a running job is waited for); a failed job moves on to the next id.
+        """
+        digest = hashlib.sha256("\x00".join([table_id, *row_ids]).encode("utf-8")).hexdigest()
+        job_config = bigquery.LoadJobConfig(
+            write_disposition="WRITE_APPEND",
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+        )
+        try:
+            job_config.schema = bq_client.get_table(table_id).schema
+            rows = _coerce_to_schema(rows, job_config.schema)
+        except NotFound:
+            job_config.autodetect = True
+
+        for attempt in range(MAX_LOAD_JOB_IDS):
+            job_id = f"spool_{digest}" if attempt == 0 else f"spool_{digest}_{attempt}"
+            try:
+                bq_client.load_table_from_json(rows, table_id, job_config=job_config, job_id=job_id).result()
+                return []
+            except Conflict:
+                job = bq_client.get_job(job_id)
+                if job.state != "DONE":
+                    job.result()  # raises if it fails; the batch is then retried
+                    return []
+                if job.error_result is None:
+                    print(f"▶️ Batch already loaded into {table_id} (job {job_id}); skipping")
+                    return []
+                print(f"▶️ Earlier load job {job_id} failed ({job.error_result.get('message')}); trying a new job id")
+        raise RuntimeError(f"{MAX_LOAD_JOB_IDS} load jobs failed for this batch")
+
+    def _retry(self, batch, error, now):
+        """Schedule rows for another attempt with exponential backoff."""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE spool SET attempts = attempts + 1, next_attempt = ?, last_error = ? WHERE id = ?",
+                [(now + min(2 ** (attempts + 1), self.max_backoff), error, row_pk) for row_pk, _, _, attempts in batch]
+            )
+            self._db.commit()
+
+    def _park(self, failed_rows):
+        """Keep rows BigQuery rejected as invalid out of the retry loop."""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE spool SET status = 'dead', last_error = ? WHERE id = ?",
+                [(json.dumps(errors), row[0]) for row, errors in failed_rows]
+            )
+            self._db.commit()
+
+    # -----------------------------
+    # Background Flusher
+    # -----------------------------
+    def start(self, bq_client, interval=1.0):
+        """Start the background flusher (idempotent)."""
+        with self._lock:
+            self._bq_client = bq_client
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="bq-write-spool", daemon=True)
+            self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            try:
+                if self._due(time.time()):
+                    self.flush(self._bq_client)
+            except Exception as e:
+                print(f"❌ Spool flusher error: {e}")
+
+    def stop(self, flush=True):
+        """Stop the flusher, optionally writing whatever is due first."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        if flush and self._bq_client is not None:
+            try:
+                self.flush(self._bq_client)
+            except Exception as e:
+                print(f"❌ Final spool flush failed: {e}")
+
+
+# -----------------------------
+# Shared Instance
+# -----------------------------
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_write_spool(bq_client=None) -> WriteSpool:
+    """
+    Process-wide write spool configured from src.config.
+    Passing a client starts the background flusher on first use.
+    """
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = WriteSpool(
+                os.path.join(config.SPOOL_DIR, "write_spool.sqlite"),
+                batch_rows=config.SPOOL_FLUSH_ROWS,
+                max_age=config.SPOOL_FLUSH_SECONDS
+            )
+            atexit.register(_spool.stop)
+    if bq_client is not None:
+        _spool.start(bq_client)
+    return _spool
@@ -6,13 +6,10 @@ from dotenv import load_dotenv
 
 
 # Custom modules
-from src.clients import get_bq_client
+# (tab modules are imported in main(), after the page shell is drawn)
+from src.clients import get_bq_client, LazyClient
+from src.write_spool import get_write_spool
 from streamlit_utils.load_side_bar import load_side_bar
-from streamlit_utils import (
-    tab_courses, tab_upload, tab_analysis, tab_semantic, 
-    tab_progress, tab_about, tab_ingest_document,
-    tab_chat
-)
 
 # ==============================
 # LOAD ENVIRONMENT VARIABLES
@@ -20,11 +17,6 @@ from streamlit_utils import (
 # Load .env file to access environment variables like API keys, DB credentials, etc.
 load_dotenv()
 
-# ==============================
-# INITIALIZE CLIENTS
-# ==============================
-# Create a BigQuery client to interact with GCP
-bq_client = get_bq_client()
 
 # ==============================
 # SESSION STATE INITIALIZATION
@@ -60,6 +52,12 @@ def main():
 
     # Initialize session state
     init_session_state()
+
+    # Shared BigQuery client (created on first query, reused by every session)
+    bq_client = LazyClient(get_bq_client)
+
+    # Start the write-behind flusher (also drains rows spooled by earlier runs)
+    get_write_spool(bq_client)
     
     
     # ==============================
@@ -89,6 +87,13 @@ def main():
     # ==============================
     # RENDER TABS
     # ==============================
+    # Imported here so the page shell paints before pandas / Google SDKs load
+    from streamlit_utils import (
+        tab_courses, tab_upload, tab_analysis, tab_semantic,
+        tab_progress, tab_about, tab_ingest_document,
+        tab_chat
+    )
+
     tab_upload.render(tab1, st, bq_client)
     tab_analysis.render(tab2, st)
     tab_courses.render(tab3)   # <-- NEW
@@ -7,11 +7,17 @@ tracking progress, and creating interactive charts.
 # ==============================
 # IMPORTS
 # ==============================
+from __future__ import annotations
+
 import pandas as pd
 import json
 from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
+from src.lazy_imports import lazy_import
+from src.stage_dag import ProgressCallback
+
+# plotly loads when the first chart is drawn
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
 
 # ==============================
 # TRANSCRIPT UTILITIES
@@ -71,6 +77,51 @@ def save_session_results(transcript: str, analysis: dict) -> dict:
     }
 
 
+# ==============================
+# PIPELINE PROGRESS
+# ==============================
+class StreamlitProgress(ProgressCallback):
+    """
+    Shows pipeline stage events as a status line and a progress bar.
+    Widgets are created on the first event, so a poll that finds the
+    transcription still running draws nothing.
+    """
+
+    def __init__(self, st):
+        self.st = st
+        self._status = None
+        self._bar = None
+        self._label = ""
+
+    def _widgets(self):
+        if self._status is None:
+            self._status = self.st.empty()
+            self._bar = self.st.progress(0)
+        return self._status, self._bar
+
+    def on_stage_start(self, stage, label):
+        self._label = label
+        self._widgets()[0].text(f"⏳ {label}...")
+
+    def on_stage_progress(self, stage, fraction, message=None):
+        self._widgets()[0].text(f"⏳ {message or self._label}... {fraction:.0%}")
+
+    def on_stage_end(self, stage, timing, done, total):
+        self._widgets()[1].progress(done / total)
+
+    def on_message(self, text):
+        status, bar = self._widgets()
+        status.text(text)
+        bar.empty()
+
+    def on_error(self, text):
+        self.st.session_state["ml_transcribe_status"] = text
+        status, bar = self._widgets()
+        status.text(text)
+        bar.empty()
+        self.st.error(text)
+
+
 # ==============================
 # FORECAST & PROGRESS CHARTS
 # ==============================
@@ -7,6 +7,7 @@
 
 import streamlit as st
 import pandas as pd
+from src.word_encoding import decode_words_df
 
 # ==============================
 # RENDER FUNCTION
@@ -79,7 +80,8 @@ def render(tab, st):
             🟦 Blue → Prolongations (stretched sounds)  
             """)
 
-            df = analysis["words_df"].copy()
+            # words_df may be a DataFrame or a stored (compact or legacy) encoding
+            df = decode_words_df(analysis["words_df"]).copy()
 
             # Highlight function for styling only certain columns
             def highlight_words(row):
@@ -4,8 +4,6 @@
 
 import streamlit as st
 import random
-import tempfile
-from streamlit_mic_recorder import mic_recorder
 # ==============================
 # Course Recommendation
 # ==============================
@@ -99,6 +97,8 @@ def render(tab):
         if current_index not in st.session_state.completed_exercises:
             st.markdown(f"**Exercise {current_index + 1}/{len(exercises)}:** {ex['task']}")
 
+            # Imported on first use (heavy component module)
+            from streamlit_mic_recorder import mic_recorder
             audio_data = mic_recorder(
                 start_prompt="🎤 Start Recording",
                 stop_prompt="⏹ Stop Recording",
@@ -107,12 +107,8 @@ def render(tab):
             )
 
             if audio_data:
-                # Save audio
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-                    tmp.write(audio_data["bytes"])
-                    st.session_state.local_path = tmp.name
-
-                st.audio(st.session_state.local_path, format="audio/wav")
+                # Play back from memory (no temp file)
+                st.audio(audio_data["bytes"], format="audio/wav")
 
                 earned_points = random.randint(ex['points'] - 5, ex['points'])
                 st.session_state.exercise_points += earned_points
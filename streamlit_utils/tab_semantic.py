@@ -7,6 +7,7 @@
 
 import streamlit as st
 import json
+import pandas as pd
 from src.bigquery_utils.embeddings import fetch_similar_cases
 
 # ==============================
@@ -53,7 +54,7 @@ def render(tab, st, bq_client):
             # Find similar cases button
             # -----------------------------
             if st.button("🔍 Find Similar Cases"):
-                with st.spinner("Running VECTOR_SEARCH() in BigQuery..."):
+                with st.spinner("Searching similar past cases..."):
                     try:
                         # Fetch top-k similar cases using user input
                         similar_df = fetch_similar_cases(
@@ -104,6 +105,11 @@ def render(tab, st, bq_client):
                                 st.markdown("**📋 Therapy Plan**")
                                 st.write(row['therapy_plan'])
 
+                                words_df = row.get('words_df')
+                                if isinstance(words_df, pd.DataFrame) and not words_df.empty:
+                                    with st.expander("🔤 Word-Level Breakdown"):
+                                        st.dataframe(words_df, hide_index=True)
+
                             with col2:
                                 st.markdown("**📊 Metrics**")
                                 try:
@@ -7,11 +7,15 @@
 
 import streamlit as st
 import os
-import tempfile
+import io
 from datetime import datetime
-from src.pipeline import run_pipeline
+from src import config
+from src.pipeline import start_pipeline, resume_pipeline, finish_pipeline
+from src.bigquery_utils.transcription import TranscriptionJob, load_transcription_job
 from data.transcripts.sample_texts import sample_texts
 from src.bigquery_utils.transcription import fetch_ai_sample_texts
+from src.stage_dag import StageError
+from streamlit_utils.streamlit_helpers import StreamlitProgress
 
 # ==============================
 # MAIN RENDER FUNCTION
@@ -31,10 +35,12 @@ def render(tab, st,bq_client):
         st.header("Provide Your Voice Input")
 
         # -----------------------------
-        # Initialize session state for local audio path
+        # Initialize session state for the in-memory audio input
         # -----------------------------
-        if "local_path" not in st.session_state:
-            st.session_state.local_path = None
+        if "audio_input" not in st.session_state:
+            st.session_state.audio_input = None
+
+        pending_job = get_pending_job(st)
 
         # -----------------------------
         # Case 1: Analysis already completed
@@ -44,47 +50,63 @@ def render(tab, st,bq_client):
             if st.button("🔄 Record / Upload New Audio"):
                 # Reset session state to allow new recording/upload
                 st.session_state.current_analysis = None
-                st.session_state.local_path = None
+                st.session_state.audio_input = None
+                clear_pending_job(st)
                 st.rerun()
 
         # -----------------------------
-        # Case 2: Audio already uploaded/recorded
+        # Case 2: Transcription running (or reattached from ?job=<id>)
+        # -----------------------------
+        elif pending_job is not None:
+            render_transcription_progress(st, pending_job)
+
+        # -----------------------------
+        # Case 3: Audio already uploaded/recorded
         # -----------------------------
-        elif st.session_state.local_path:
+        elif st.session_state.audio_input:
+            audio_input = st.session_state.audio_input
+
             # Play the audio
-            st.audio(st.session_state.local_path, format="audio/wav")
+            st.audio(audio_input["data"], format=audio_input["format"])
 
             # Buttons for re-recording or confirming current recording
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🔄 Re-Record / Cancel"):
-                    st.session_state.local_path = None
+                    st.session_state.audio_input = None
                     st.rerun()
             with col2:
                 if st.button("✅ Use This Recording"):
                     st.success("Recording locked in. Ready for transcription.")
 
+            if st.session_state.pop("pipeline_failed", False):
+                # ❌ Failure: show retry prompt
+                st.warning("⚠️ Analysis could not be completed. Please upload a new audio file and try again.")
+
             # Analyze button
             if st.button("Analyze Audio"):
-                with st.spinner("Running full pipeline..."):
-                    analysis, transcript_embedding,top_courses = run_pipeline(
-                        st.session_state.local_path, st
-                    )
-
-                if analysis is not None:
-                    # ✅ Success: save results
-                    st.session_state.current_analysis = analysis
-                    st.session_state.current_transcript_embedding = transcript_embedding
-                    st.session_state.current_top_courses = top_courses
-                    st.rerun()
+                with st.spinner("Uploading and submitting transcription..."):
+                    try:
+                        # Streamed straight from memory to GCS (no temp file)
+                        handle, transcription = start_pipeline(
+                            io.BytesIO(audio_input["data"]), StreamlitProgress(st), filename=audio_input["name"]
+                        )
+                    except StageError as e:
+                        st.error(f"❌ Could not start the analysis ({e.stage}): {e.cause}")
+                        st.stop()
+
+                if transcription is not None:
+                    # Same recording was transcribed before → analyze right away
+                    with st.spinner("Running analysis..."):
+                        store_pipeline_outcome(st, finish_pipeline(transcription, StreamlitProgress(st)))
                 else:
-                    # ❌ Failure: show retry prompt
-                    st.warning("⚠️ Analysis could not be completed. Please upload a new audio file and try again.")
-                    st.session_state.current_analysis = None
-                    st.session_state.current_transcript_embedding = None
+                    # Remember the job so a rerun or reconnect can reattach to it
+                    st.session_state.transcription_job = handle.to_dict()
+                    st.query_params["job"] = handle.job_id
+                st.rerun()
 
         # -----------------------------
-        # Case 3: No audio yet → choose input method
+        # Case 4: No audio yet → choose input method
         # -----------------------------
         else:
             input_method = st.radio("Choose input method:", ["📂 Upload File","🎤 Record Audio"])
@@ -93,6 +115,75 @@ def render(tab, st,bq_client):
             elif input_method == "📂 Upload File":
                 render_upload_file(st)
 
+# ==============================
+# TRANSCRIPTION JOB HELPERS
+# ==============================
+def get_pending_job(st):
+    """
+    Transcription job this session is waiting on, if any.
+
+    Falls back to the `job` query parameter so a reloaded or reconnected
+    browser session reattaches to the job it started.
+
+    Returns:
+        TranscriptionJob | None
+    """
+    if st.session_state.get("transcription_job"):
+        return TranscriptionJob.from_dict(st.session_state.transcription_job)
+
+    job_id = st.query_params.get("job")
+    if job_id:
+        handle = load_transcription_job(job_id=job_id)
+        if handle is not None:
+            st.session_state.transcription_job = handle.to_dict()
+            return handle
+        del st.query_params["job"]
+    return None
+
+
+def clear_pending_job(st):
+    st.session_state.transcription_job = None
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+
+@st.fragment(run_every=config.TRANSCRIPTION_POLL_SECONDS)
+def render_transcription_progress(st, handle):
+    """
+    Poll the transcription job without blocking the rest of the app.
+    Re-runs every TRANSCRIPTION_POLL_SECONDS; once the job is done the
+    analysis runs and the whole app reruns to show the results.
+    """
+    st.info(
+        f"⏳ Transcribing `{os.path.basename(handle.uri)}` "
+        f"(job `{handle.job_id}`, submitted {handle.submitted_at[:19].replace('T', ' ')} UTC)..."
+    )
+    if st.button("✖️ Stop Waiting"):
+        clear_pending_job(st)
+        st.rerun()
+
+    outcome = resume_pipeline(handle, StreamlitProgress(st))
+    if outcome is None:
+        return  # still running → poll again on the next fragment run
+
+    clear_pending_job(st)
+    store_pipeline_outcome(st, outcome)
+    st.rerun()
+
+
+def store_pipeline_outcome(st, outcome):
+    """Save a finished pipeline's results (or failure flag) in session state."""
+    analysis, transcript_embedding, top_courses = outcome
+    if analysis is not None:
+        # ✅ Success: save results
+        st.session_state.current_analysis = analysis
+        st.session_state.current_transcript_embedding = transcript_embedding
+        st.session_state.current_top_courses = top_courses
+    else:
+        st.session_state.current_analysis = None
+        st.session_state.current_transcript_embedding = None
+        st.session_state.pipeline_failed = True
+
 # ==============================
 # RECORD AUDIO HELPER
 # ==============================
@@ -172,10 +263,12 @@ def render_record_audio(st):
             just_once=True
         )
         if audio_data:
-            # Save audio to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-                tmp.write(audio_data["bytes"])
-                st.session_state.local_path = tmp.name
+            # Keep the recording in memory
+            st.session_state.audio_input = {
+                "name": f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav",
+                "data": audio_data["bytes"],
+                "format": "audio/wav"
+            }
             st.rerun()
     except ImportError:
         st.warning("`streamlit-mic-recorder` not installed. Run: `pip install streamlit-mic-recorder`")
@@ -209,17 +302,11 @@ def render_upload_file(st):
     # -----------------------------
     audio_file = st.file_uploader("Upload a voice recording (.mp3)", type=["mp3"])
     if audio_file:
-        # Generate unique timestamped filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        ext = os.path.splitext(audio_file.name)[1]
-        filename = f"audio_{timestamp}{ext}"
-        local_path = os.path.join("/tmp", filename)
-
-        # Save uploaded file to local path
-        with open(local_path, "wb") as f:
-            f.write(audio_file.read())
-
-        # Update session state
-        st.session_state.local_path = local_path
-        st.success(f"✅ File uploaded as `{filename}`")
+        # Keep the upload in memory (no copy to /tmp)
+        st.session_state.audio_input = {
+            "name": audio_file.name,
+            "data": audio_file.getvalue(),
+            "format": audio_file.type or "audio/mpeg"
+        }
+        st.success(f"✅ File uploaded: `{audio_file.name}`")
         st.rerun()
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+Unit tests for word-level extraction and speech metrics.
+"""
+
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.analyze_stammer import (
+    extract_word_level, compute_speech_metrics, compute_speech_metrics_batch,
+    SpeechMetricsAccumulator, analyze_stammer
+)
+from src.stage_dag import TimingRecorder
+
+
+def make_payload(uri, words):
+    """Build an ml_transcribe_result JSON string for (word, start, end) tuples."""
+    return json.dumps({
+        "results": {
+            uri: {
+                "inline_result": {
+                    "transcript": {
+                        "results": [{
+                            "alternatives": [{
+                                "words": [
+                                    {"word": w, "start_offset": f"{s}s", "end_offset": f"{e}s"}
+                                    for w, s, e in words
+                                ]
+                            }]
+                        }]
+                    }
+                }
+            }
+        }
+    })
+
+
+class TestExtractWordLevel(unittest.TestCase):
+    def test_columns_and_dtypes(self):
+        uri = "gs://bucket/audio/a.mp3"
+        df = pd.DataFrame({
+            "uri": [uri],
+            "ml_transcribe_result": [make_payload(uri, [("hello", 0.5, 0.9), ("world", 1, 1.25)])],
+        })
+
+        words = extract_word_level(df)
+
+        self.assertEqual(list(words.columns), ["uri", "word", "start_time", "end_time"])
+        self.assertEqual(words["start_time"].dtype, np.float32)
+        self.assertEqual(words["end_time"].dtype, np.float32)
+        self.assertEqual(words["uri"].tolist(), [uri, uri])
+        self.assertEqual(words["word"].tolist(), ["hello", "world"])
+        np.testing.assert_allclose(words["start_time"], [0.5, 1.0])
+        np.testing.assert_allclose(words["end_time"], [0.9, 1.25])
+
+    def test_multiple_rows_and_bad_payloads(self):
+        missing_word = json.loads(make_payload("gs://b/5", [("x", 0, 0.1), ("y", 0.2, 0.3)]))
+        words_list = missing_word["results"]["gs://b/5"]["inline_result"]["transcript"]["results"][0]["alternatives"][0]["words"]
+        del words_list[1]["word"]
+        bad_offset = make_payload("gs://b/6", [("z", 0, 0.1)]).replace('"0.1s"', '"later"')
+        df = pd.DataFrame({
+            "uri": ["gs://b/1", "gs://b/2", "gs://b/3", "gs://b/5", "gs://b/6", "gs://b/4"],
+            "ml_transcribe_result": [
+                make_payload("gs://b/1", [("a", 0, 0.1)]),
+                None,
+                "{not json",
+                json.dumps(missing_word),
+                bad_offset,
+                make_payload("gs://b/4", [("b", 0.2, 0.3), ("c", 0.4, 0.5)]),
+            ],
+        })
+
+        words = extract_word_level(df)
+
+        self.assertEqual(words["uri"].tolist(), ["gs://b/1", "gs://b/4", "gs://b/4"])
+        self.assertEqual(words["word"].tolist(), ["a", "b", "c"])
+        self.assertEqual(words["end_time"].dtype, np.float32)
+        self.assertEqual(len(words["start_time"]), 3)
+
+    def test_missing_zero_offset(self):
+        payload = json.loads(make_payload("gs://b/1", [("hi", 0, 0.4)]))
+        words_list = payload["results"]["gs://b/1"]["inline_result"]["transcript"]["results"][0]["alternatives"][0]["words"]
+        del words_list[0]["start_offset"]
+        df = pd.DataFrame({"uri": ["gs://b/1"], "ml_transcribe_result": [json.dumps(payload)]})
+
+        words = extract_word_level(df)
+
+        self.assertEqual(words["start_time"].tolist(), [0.0])
+
+    def test_empty(self):
+        df = pd.DataFrame({"uri": [], "ml_transcribe_result": []})
+        words = extract_word_level(df)
+        self.assertTrue(words.empty)
+        self.assertEqual(list(words.columns), ["uri", "word", "start_time", "end_time"])
+
+
+class TestComputeSpeechMetrics(unittest.TestCase):
+    def test_summary_is_json_serializable(self):
+        uri = "gs://b/1"
+        df = pd.DataFrame({
+            "uri": [uri],
+            "ml_transcribe_result": [make_payload(uri, [
+                ("um", 0, 0.3), ("I", 0.4, 0.5), ("I", 0.6, 0.7), ("ssso", 2.5, 3.0),
+            ])],
+        })
+
+        summary, analysis = compute_speech_metrics(extract_word_level(df))
+
+        json.dumps(summary)
+        self.assertEqual(summary["filler_count"], 1)
+        self.assertEqual(summary["repetitions"], 1)
+        self.assertEqual(summary["prolongations"], 1)
+        self.assertEqual(summary["blocks"], 1)
+        self.assertEqual(len(analysis), 4)
+
+
+def make_words_df(n, seed=0):
+    """Random word-level frame with fillers, repeats, prolongations and long pauses."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array(["I", "I", "um", "Uh,", "go", "ssso", "home", "the", "the"], dtype=object)
+    gaps = np.where(rng.random(n) < 0.1, rng.uniform(1.4, 3.0, n), rng.uniform(0.0, 0.3, n))
+    durations = rng.uniform(0.1, 0.5, n)
+    starts = np.cumsum(gaps + np.concatenate(([0.0], durations[:-1])))
+    return pd.DataFrame({
+        "word": rng.choice(vocab, n),
+        "start_time": starts.astype(np.float32),
+        "end_time": (starts + durations).astype(np.float32),
+    })
+
+
+class TestSpeechMetricsAccumulator(unittest.TestCase):
+    def test_matches_batch_for_any_chunking(self):
+        words = make_words_df(500)
+        expected, _ = compute_speech_metrics(words)
+
+        for chunk_size in (1, 2, 7, 64, 500):
+            acc = SpeechMetricsAccumulator()
+            for i in range(0, len(words), chunk_size):
+                acc.update(words.iloc[i:i + chunk_size])
+            self.assertEqual(acc.summary(), expected, f"chunk_size={chunk_size}")
+
+    def test_repetition_and_pause_across_boundary(self):
+        acc = SpeechMetricsAccumulator(long_pause_thresh=1.0)
+        acc.update([{"word": "go", "start_time": 0.0, "end_time": 0.5}])
+        acc.update([{"word": "go", "start_time": 2.0, "end_time": 2.5}])
+
+        summary = acc.summary()
+        self.assertEqual(summary["repetitions"], 1)
+        self.assertEqual(summary["blocks"], 1)
+
+    def test_empty(self):
+        acc = SpeechMetricsAccumulator()
+        acc.update(pd.DataFrame(columns=["word", "start_time", "end_time"]))
+        self.assertEqual(acc.summary(), {})
+
+
+class TestComputeSpeechMetricsBatch(unittest.TestCase):
+    def test_matches_single_file_path(self):
+        parts = []
+        for i, n in enumerate([40, 1, 120]):
+            part = make_words_df(n, seed=i)
+            part.insert(0, "uri", f"gs://b/{i}")
+            parts.append(part)
+        words = pd.concat(parts, ignore_index=True)
+
+        metrics, analysis = compute_speech_metrics_batch(words)
+
+        self.assertEqual(list(metrics.index), ["gs://b/0", "gs://b/1", "gs://b/2"])
+        per_uri = metrics.to_dict(orient="index")
+        for part in parts:
+            uri = part["uri"].iloc[0]
+            expected, expected_words = compute_speech_metrics(part.drop(columns="uri"))
+            self.assertEqual(per_uri[uri], expected)
+            got_words = analysis[analysis["uri"] == uri].drop(columns="uri").reset_index(drop=True)
+            pd.testing.assert_frame_equal(got_words, expected_words.reset_index(drop=True))
+
+    def test_context_does_not_cross_recordings(self):
+        words = pd.DataFrame({
+            "uri": ["gs://b/a", "gs://b/b"],
+            "word": ["go", "go"],
+            "start_time": np.array([0.0, 10.0], dtype=np.float32),
+            "end_time": np.array([0.5, 10.5], dtype=np.float32),
+        })
+
+        metrics, analysis = compute_speech_metrics_batch(words)
+
+        self.assertEqual(metrics["repetitions"].sum(), 0)
+        self.assertEqual(metrics["blocks"].sum(), 0)
+        self.assertTrue(analysis["pause"].isna().all())
+
+
+class TestAnalyzeStammer(unittest.TestCase):
+    def test_remote_stages_run_concurrently(self):
+        main_thread = threading.current_thread()
+        callback_threads = set()
+
+        class Progress(TimingRecorder):
+            def on_stage_start(self, stage, label):
+                callback_threads.add(threading.current_thread())
+
+            def on_stage_end(self, stage, timing, done, total):
+                callback_threads.add(threading.current_thread())
+                super().on_stage_end(stage, timing, done, total)
+
+        def slow(value):
+            def stage(*args, **kwargs):
+                time.sleep(0.2)
+                return value
+            return stage
+
+        transcripts = pd.DataFrame({
+            "uri": ["gs://b/a.wav"],
+            "transcripts": ["hello hello world"],
+            "ml_transcribe_result": [make_payload("gs://b/a.wav", [("hello", 0, 0.4), ("hello", 0.5, 0.9), ("world", 1.0, 1.3)])],
+        })
+        progress = Progress()
+
+        with mock.patch("src.analyze_stammer.generate_therapy_plan", slow("plan")), \
+             mock.patch("src.analyze_stammer.fetch_top_courses_vector_search", slow("courses")), \
+             mock.patch("src.analyze_stammer.generate_transcript_embedding", slow([0.1, 0.2])), \
+             mock.patch("src.analyze_stammer.insert_analysis_result_with_embedding",
+                        side_effect=lambda client, result, embedding: embedding) as insert:
+            start = time.perf_counter()
+            result, embedding, courses = analyze_stammer(transcripts, mock.Mock(), progress)
+            elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(result["therapy_plan"], "plan")
+        self.assertEqual(courses, "courses")
+        self.assertEqual(embedding, [0.1, 0.2])
+        self.assertEqual(insert.call_args.args[2], [0.1, 0.2])
+        self.assertEqual(callback_threads, {main_thread})
+        self.assertEqual(
+            sorted(t.name for t in progress.timings),
+            ["metrics", "store", "therapy_plan", "top_courses", "transcript_embedding"]
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Unit tests for the semantic answer cache and the chat answer path.
+"""
+
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+import numpy as np
+
+from src import config
+from src.answer_cache import SemanticAnswerCache
+from src.bigquery_utils import retrieval_qa
+from src.bigquery_utils.retrieval_qa import generate_text_with_vector_search
+
+QUESTION_EMBEDDINGS = {
+    "How do I slow my speech?": [1.0, 0.0, 0.0],
+    "how do i slow my speech": [0.999, 0.01, 0.0],
+    "What is a block?": [0.0, 1.0, 0.0],
+}
+
+
+class FakeChatClient:
+    """VECTOR_SEARCH returns two documents; ML.GENERATE_TEXT echoes a counter."""
+
+    def __init__(self):
+        self.modified = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.searches = 0
+        self.generations = []
+
+    def get_table(self, table_id):
+        return mock.Mock(modified=self.modified, num_rows=10)
+
+    def query(self, query, job_config=None):
+        if "INFORMATION_SCHEMA" in query:
+            rows = []
+        elif "ML.GENERATE_TEXT" in query:
+            self.generations.append(job_config.query_parameters[0].value)
+            rows = [mock.Mock(generated=f"answer {len(self.generations)}")]
+        else:
+            self.searches += 1
+            rows = [mock.Mock(content="Breathe first."), mock.Mock(content="Use easy onsets.")]
+        return mock.Mock(result=mock.Mock(return_value=iter(rows)))
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = SemanticAnswerCache(max_distance=0.05)
+
+    def test_hit_within_distance(self):
+        self.cache.store("q", [1.0, 0.0], "a", "v1", "ctx")
+
+        hit = self.cache.lookup([0.99, 0.05], "v1", "ctx")
+
+        self.assertEqual(hit["answer"], "a")
+        self.assertLess(hit["distance"], 0.05)
+
+    def test_miss_when_far_or_other_scope(self):
+        self.cache.store("q", [1.0, 0.0], "a", "v1", "ctx")
+
+        self.assertIsNone(self.cache.lookup([0.0, 1.0], "v1", "ctx"))
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], "v2", "ctx"))
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], "v1", "other"))
+        self.assertEqual(self.cache.stats()["misses"], 3)
+
+    def test_new_corpus_version_drops_old_entries(self):
+        self.cache.store("q", [1.0, 0.0], "a", "v1", "ctx")
+        self.cache.store("q", [1.0, 0.0], "b", "v2", "ctx")
+
+        self.assertEqual(self.cache.stats()["entries"], 1)
+        self.assertEqual(self.cache.lookup([1.0, 0.0], "v2", "ctx")["answer"], "b")
+
+    def test_oldest_entries_evicted(self):
+        cache = SemanticAnswerCache(max_entries=2)
+        for i in range(3):
+            cache.store(f"q{i}", [1.0, float(i)], f"a{i}", "v1", "ctx")
+
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertIsNone(cache.lookup([1.0, 0.0], "v1", "ctx"))
+
+
+class TestGenerateTextWithVectorSearch(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeChatClient()
+        self.cache = SemanticAnswerCache()
+        patches = [
+            mock.patch.object(config, "CHAT_ANSWER_CACHE_ENABLED", True),
+            mock.patch.object(retrieval_qa, "get_answer_cache", return_value=self.cache),
+            mock.patch.object(retrieval_qa, "generate_transcript_embedding",
+                              side_effect=lambda client, text: np.array(QUESTION_EMBEDDINGS[text])),
+            mock.patch.object(retrieval_qa, "_corpus_version", None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_retrieves_then_generates(self):
+        answer = generate_text_with_vector_search(self.client, "What is a block?", system_prompt="Be brief.")
+
+        self.assertEqual(answer, "answer 1")
+        self.assertEqual(self.client.searches, 1)
+        prompt = self.client.generations[0]
+        self.assertTrue(prompt.startswith("Be brief. and User Question: What is a block?"))
+        self.assertIn("Document Content: Breathe first.,Document Content: Use easy onsets.", prompt)
+
+    def test_similar_question_served_from_cache(self):
+        first = generate_text_with_vector_search(self.client, "How do I slow my speech?")
+        second = generate_text_with_vector_search(self.client, "how do i slow my speech")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.client.generations), 1)
+        self.assertEqual(self.client.searches, 1)
+
+    def test_corpus_change_invalidates_answers(self):
+        generate_text_with_vector_search(self.client, "How do I slow my speech?")
+        self.client.modified = datetime(2025, 2, 1, tzinfo=timezone.utc)
+        retrieval_qa._corpus_version = None  # force a version check
+
+        generate_text_with_vector_search(self.client, "How do I slow my speech?")
+
+        self.assertEqual(len(self.client.generations), 2)
+
+    def test_cache_bypassed_when_disabled(self):
+        generate_text_with_vector_search(self.client, "What is a block?", use_cache=False)
+        generate_text_with_vector_search(self.client, "What is a block?", use_cache=False)
+
+        self.assertEqual(len(self.client.generations), 2)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Unit tests for local audio preprocessing (downmix, resample, silence trim).
+"""
+
+import io
+import unittest
+import wave
+from unittest import mock
+
+import numpy as np
+
+from src import audio_preprocess
+from src.audio_preprocess import find_speech_bounds, preprocess_audio, resample, split_at_silence
+
+
+def make_wav(samples, rate, channels=1):
+    """16-bit PCM WAV bytes from float samples of shape (frames, channels)."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.asarray(samples) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+def silence_tone_silence(rate, lead=1.0, tone=1.0, tail=1.5):
+    t = np.arange(int(tone * rate)) / rate
+    return np.concatenate([
+        np.zeros(int(lead * rate)), 0.5 * np.sin(2 * np.pi * 440 * t), np.zeros(int(tail * rate))
+    ]).astype(np.float32)
+
+
+class TestSignalProcessing(unittest.TestCase):
+    def test_resample_keeps_duration_and_tone(self):
+        rate = 48000
+        t = np.arange(rate) / rate
+        out = resample(np.sin(2 * np.pi * 440 * t), rate, 16000)
+
+        self.assertEqual(len(out), 16000)
+        peak_hz = np.argmax(np.abs(np.fft.rfft(out))) * 16000 / len(out)
+        self.assertAlmostEqual(peak_hz, 440, delta=2)
+
+    def test_resample_filters_above_new_nyquist(self):
+        rate = 48000
+        t = np.arange(rate) / rate
+        out = resample(np.sin(2 * np.pi * 12000 * t), rate, 16000)
+        self.assertLess(np.abs(out[1000:-1000]).max(), 0.05)
+
+    def test_speech_bounds_with_padding(self):
+        samples = silence_tone_silence(16000)
+        start, end = find_speech_bounds(samples, 16000, frame_ms=10, padding_ms=100)
+
+        self.assertAlmostEqual(start / 16000, 0.9, delta=0.02)
+        self.assertAlmostEqual(end / 16000, 2.1, delta=0.02)
+
+    def test_all_silence_is_kept(self):
+        self.assertEqual(find_speech_bounds(np.zeros(16000), 16000), (0, 16000))
+
+    def test_split_cuts_in_silence_with_overlap(self):
+        rate = 1000
+        samples = np.full(35 * rate, 0.5, dtype=np.float32)
+        samples[11 * rate:12 * rate] = 0  # pause near the first 10 s boundary
+        samples[23 * rate:23 * rate + 200] = 0
+
+        bounds = split_at_silence(samples, rate, segment_seconds=10, overlap_seconds=1, search_seconds=3, frame_ms=100)
+
+        self.assertEqual(bounds[0][0], 0)
+        self.assertEqual(bounds[-1][1], len(samples))
+        cuts = [(end + next_start) / 2 / rate for (_, end), (next_start, _) in zip(bounds[:-1], bounds[1:])]
+        self.assertTrue(11 <= cuts[0] <= 12)
+        self.assertTrue(23 <= cuts[1] <= 23.2)
+        for (_, end), (next_start, _) in zip(bounds[:-1], bounds[1:]):
+            self.assertEqual(end - next_start, rate)
+
+    def test_short_audio_is_one_segment(self):
+        self.assertEqual(split_at_silence(np.ones(5000), 1000, segment_seconds=10), [(0, 5000)])
+
+
+class TestPreprocessAudio(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(audio_preprocess, "_ffmpeg", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stereo_wav_is_downmixed_resampled_and_trimmed(self):
+        mono = silence_tone_silence(44100)
+        buffer = io.BytesIO(make_wav(np.stack([mono, mono], axis=1), 44100, channels=2))
+
+        result = preprocess_audio(buffer, "take 1.wav", sample_rate=16000, codec="flac")
+
+        self.assertEqual(buffer.tell(), 0)
+        self.assertEqual((result.filename, result.content_type), ("take 1.wav", "audio/wav"))
+        self.assertAlmostEqual(result.offset_seconds, 1.0 - 0.25, delta=0.05)
+        self.assertAlmostEqual(result.original_duration_seconds, 3.5, delta=0.01)
+        self.assertLess(len(result.data), len(buffer.getvalue()) / 4)
+        with wave.open(result.buffer(), "rb") as wav:
+            self.assertEqual((wav.getnchannels(), wav.getframerate(), wav.getsampwidth()), (1, 16000, 2))
+            self.assertAlmostEqual(wav.getnframes() / 16000, result.duration_seconds, places=3)
+
+    def test_long_recording_is_segmented_on_the_original_timeline(self):
+        rate = 8000
+        speech = np.concatenate([0.3 * np.ones(rate * 4), np.zeros(rate // 2), 0.3 * np.ones(rate * 4)])
+        samples = np.concatenate([np.zeros(rate), speech, np.zeros(rate)]).astype(np.float32)
+
+        with mock.patch.multiple(audio_preprocess.config, AUDIO_SEGMENT_MIN_SECONDS=5, AUDIO_SEGMENT_SECONDS=4,
+                                 AUDIO_SEGMENT_OVERLAP_SECONDS=0.5, AUDIO_SEGMENT_SEARCH_SECONDS=1):
+            result = preprocess_audio(io.BytesIO(make_wav(samples[:, None], rate)), "long.wav",
+                                      sample_rate=rate, segment=True)
+
+        self.assertEqual([seg.filename for seg in result.segments], ["long.part000.wav", "long.part001.wav"])
+        first, second = result.segments
+        self.assertAlmostEqual(first.offset_seconds, result.offset_seconds)
+        # Cut lands in the pause (5.0-5.5 s in the original), segments overlap by 0.5 s
+        self.assertAlmostEqual(first.offset_seconds + first.duration_seconds - second.offset_seconds, 0.5, delta=0.01)
+        self.assertTrue(5.0 <= second.offset_seconds + 0.25 <= 5.5)
+
+    def test_undecodable_audio_is_left_alone(self):
+        self.assertIsNone(preprocess_audio(io.BytesIO(b"ID3\x03fake mp3"), "a.mp3"))
+
+    def test_rejects_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            preprocess_audio(io.BytesIO(b""), codec="aac")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,299 @@
+"""
+Unit tests for the local similar-case index and the IVF index.
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import numpy as np
+
+from src import config
+from src.bigquery_utils.embeddings import fetch_similar_cases
+from src.case_index import CaseIndex
+from src.vector_index import (
+    IVFIndex, dequantize_rows, normalize_rows, quantize_rows, top_k_cosine, top_k_rescored
+)
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeCaseClient:
+    """
+    query() serves the sync (processed_at >= @since), reconcile (DISTINCT
+    run_id) and by-run_id (UNNEST(@run_ids)) queries over the stored rows.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.since = []
+        self.fetched_ids = []
+
+    def add(self, embeddings, start=0, minutes=0):
+        for i, embedding in enumerate(embeddings):
+            self.rows.append({
+                "run_id": f"run-{start + i}",
+                "transcript": f"transcript {start + i}",
+                "metrics": '{"stutter_rate": 0.1}',
+                "therapy_plan": "plan",
+                "words_df": '[{"word": "hello"}]',
+                "processed_at": T0 + timedelta(minutes=minutes, seconds=i),
+                "transcript_embedding": list(map(float, embedding)),
+            })
+
+    def query(self, query, job_config=None):
+        rows = sorted(self.rows, key=lambda r: r["processed_at"])
+        if "DISTINCT run_id" in query:
+            rows = [mock.Mock(run_id=r["run_id"]) for r in rows]
+            return mock.Mock(result=mock.Mock(return_value=rows))
+        parameter = job_config.query_parameters[0]
+        if parameter.name == "run_ids":
+            self.fetched_ids.append(list(parameter.values))
+            rows = [r for r in rows if r["run_id"] in parameter.values]
+        else:
+            self.since.append(parameter.value)
+            rows = [r for r in rows if r["processed_at"] >= parameter.value]
+        rows = [mock.Mock(items=mock.Mock(return_value=list(r.items()))) for r in rows]
+        return mock.Mock(result=mock.Mock(return_value=rows))
+
+
+class TestIVFIndex(unittest.TestCase):
+    def test_recall_against_exact_search(self):
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(40, 16))
+        matrix = normalize_rows(centers[rng.integers(0, 40, 4000)] + 0.3 * rng.normal(size=(4000, 16)))
+        ivf = IVFIndex.train(matrix)
+
+        hits = 0
+        for _ in range(20):
+            query = rng.normal(size=16)
+            exact, _ = top_k_cosine(matrix, query, 10)
+            approx, distances = ivf.search(matrix, query, 10, nprobe=8)
+            hits += len(set(exact) & set(approx))
+            self.assertTrue(np.all(np.diff(distances) >= 0))
+        self.assertGreaterEqual(hits / 200, 0.9)
+
+    def test_probing_every_list_is_exact(self):
+        rng = np.random.default_rng(1)
+        matrix = normalize_rows(rng.normal(size=(500, 8)))
+        ivf = IVFIndex.train(matrix, nlist=10)
+        query = rng.normal(size=8)
+
+        np.testing.assert_array_equal(ivf.search(matrix, query, 5, nprobe=10)[0], top_k_cosine(matrix, query, 5)[0])
+
+
+class TestQuantization(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.matrix = normalize_rows(rng.normal(size=(2000, 32)))
+        self.queries = rng.normal(size=(20, 32))
+
+    def test_int8_keeps_row_norms(self):
+        codes, scales = quantize_rows(3 * self.matrix, "int8")
+
+        self.assertEqual(codes.dtype, np.int8)
+        np.testing.assert_allclose(np.linalg.norm(dequantize_rows(codes, scales), axis=1), 3.0, rtol=0.01)
+
+    def test_float16_halves_storage(self):
+        codes, scales = quantize_rows(self.matrix, "float16")
+
+        self.assertIsNone(scales)
+        self.assertEqual(codes.nbytes, self.matrix.nbytes // 2)
+
+    def test_rescored_results_match_exact(self):
+        for precision in ("float16", "int8"):
+            codes, scales = quantize_rows(self.matrix, precision)
+            for q in self.queries:
+                idx, distances = top_k_rescored(codes, scales, self.matrix, q, 5)
+                exact_idx, exact_distances = top_k_cosine(self.matrix, q, 5)
+                np.testing.assert_array_equal(idx, exact_idx)
+                np.testing.assert_allclose(distances, exact_distances, rtol=1e-6)
+
+    def test_unknown_precision_rejected(self):
+        with self.assertRaises(ValueError):
+            quantize_rows(self.matrix, "int4")
+
+
+class TestCaseIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.rng = np.random.default_rng(0)
+        self.client = FakeCaseClient()
+
+    def make_index(self, **kwargs):
+        index = CaseIndex("p.d.cases", self.directory, sync_interval=0, sync_overlap=60, **kwargs)
+        self.addCleanup(index.close)
+        return index
+
+    def test_sync_is_incremental_and_deduplicates_overlap(self):
+        index = self.make_index()
+        self.client.add(self.rng.normal(size=(5, 8)))
+        self.assertEqual(index.sync(self.client), 5)
+
+        # Within the overlap window: the first five rows are read again
+        self.client.add(self.rng.normal(size=(3, 8)), start=5, minutes=0.5)
+        self.assertEqual(index.sync(self.client), 3)
+        self.assertEqual(len(index), 8)
+        self.assertEqual(index.sync(self.client), 0)
+
+    def test_sync_reads_from_watermark_minus_overlap(self):
+        index = self.make_index()
+        self.client.add(self.rng.normal(size=(2, 8)))
+        index.sync(self.client)
+
+        index.sync(self.client)
+
+        self.assertEqual(self.client.since[-1], T0 + timedelta(seconds=1) - timedelta(seconds=60))
+
+    def test_rows_landing_behind_the_overlap_are_reconciled(self):
+        index = self.make_index(reconcile_interval=0)
+        self.client.add(self.rng.normal(size=(3, 8)), minutes=60)
+        index.sync(self.client)
+
+        # Analyzed 50 minutes before the watermark, flushed from a spool later
+        self.client.add(self.rng.normal(size=(2, 8)), start=3, minutes=10)
+        self.assertEqual(index.sync(self.client), 2)
+
+        self.assertEqual(len(index), 5)
+        self.assertEqual(self.client.fetched_ids, [["run-3", "run-4"]])
+        self.assertEqual(index.sync(self.client), 0)
+
+    def test_reconcile_waits_for_its_interval(self):
+        index = self.make_index(reconcile_interval=3600)
+        self.client.add(self.rng.normal(size=(3, 8)), minutes=60)
+        index.sync(self.client)
+        self.client.add(self.rng.normal(size=(2, 8)), start=3, minutes=10)
+
+        self.assertEqual(index.sync(self.client), 0)
+        self.assertEqual(self.client.fetched_ids, [])
+
+    def test_sync_is_throttled(self):
+        index = CaseIndex("p.d.cases", self.directory, sync_interval=3600)
+        self.addCleanup(index.close)
+        self.client.add(self.rng.normal(size=(2, 8)))
+        index.sync(self.client)
+        self.client.add(self.rng.normal(size=(2, 8)), start=2, minutes=1)
+
+        self.assertEqual(index.sync(self.client), 0)
+        self.assertEqual(index.sync(self.client, force=True), 2)
+
+    def test_search_returns_nearest_cases(self):
+        index = self.make_index()
+        embeddings = self.rng.normal(size=(20, 8))
+        self.client.add(embeddings)
+        index.sync(self.client)
+
+        result = index.search(embeddings[7], top_k=3)
+
+        self.assertEqual(result["run_id"].iloc[0], "run-7")
+        self.assertAlmostEqual(result["distance"].iloc[0], 0.0, places=5)
+        self.assertEqual(list(result.columns),
+                         ["run_id", "transcript", "metrics", "therapy_plan", "words_df", "processed_at", "distance"])
+
+    def test_vectors_grow_and_persist_across_instances(self):
+        index = self.make_index()
+        embeddings = self.rng.normal(size=(1500, 8))
+        self.client.add(embeddings[:1000])
+        index.sync(self.client)
+        self.client.add(embeddings[1000:], start=1000, minutes=60)
+        index.sync(self.client)
+        index.close()
+
+        reopened = self.make_index()
+
+        self.assertEqual(len(reopened), 1500)
+        self.assertEqual(reopened.search(embeddings[1200], top_k=1)["run_id"].iloc[0], "run-1200")
+
+    def test_ivf_is_built_past_threshold_and_kept_in_sync(self):
+        index = self.make_index(ivf_min_rows=200, nprobe=4)
+        embeddings = self.rng.normal(size=(300, 8))
+        self.client.add(embeddings[:250])
+        index.sync(self.client)
+        self.assertIsNotNone(index._ivf)
+
+        self.client.add(embeddings[250:], start=250, minutes=60)
+        index.sync(self.client)
+
+        self.assertEqual(len(index._ivf), 300)
+        self.assertEqual(len(self.make_index(ivf_min_rows=200)._ivf), 300)
+
+    def test_int8_codes_written_on_sync_and_built_on_precision_change(self):
+        embeddings = self.rng.normal(size=(300, 8))
+        self.client.add(embeddings)
+        index = self.make_index(ivf_min_rows=100, nprobe=4)
+        index.sync(self.client)
+        index.close()
+
+        quantized = self.make_index(ivf_min_rows=100, nprobe=4, precision="int8")
+        self.client.add(self.rng.normal(size=(10, 8)), start=300, minutes=60)
+        quantized.sync(self.client)
+
+        self.assertEqual(quantized._codes.dtype, np.int8)
+        self.assertEqual(quantized.matrix().dtype, np.float16)
+        for i in (5, 305):
+            query = embeddings[i] if i < 300 else quantized.matrix()[i]
+            self.assertEqual(quantized.search(query, top_k=1)["run_id"].iloc[0], f"run-{i}")
+
+    def test_reduced_precision_shrinks_storage(self):
+        embeddings = self.rng.normal(size=(300, 64))
+        self.client.add(embeddings)
+        index = self.make_index(precision="float32")
+        index.sync(self.client)
+        stored = {"float32": index.storage_bytes()}
+        index.close()
+
+        # Each reopen converts the vectors written at the previous precision
+        for precision in ("float16", "int8", "float32"):
+            index = self.make_index(precision=precision)
+            stored[precision] = index.storage_bytes()
+            self.assertEqual(index.search(embeddings[42], top_k=1)["run_id"].iloc[0], "run-42")
+            index.close()
+
+        capacity = 1024
+        self.assertEqual(stored["float32"], capacity * 64 * 4)
+        self.assertEqual(stored["float16"], capacity * 64 * 2)
+        self.assertEqual(stored["int8"], capacity * (64 * 3 + 4))
+        self.assertEqual(sorted(os.listdir(self.directory)), ["cases.sqlite", "vectors.f32"])
+
+
+class TestFetchSimilarCases(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.index = CaseIndex("p.d.cases", tmp.name, sync_interval=0)
+        self.addCleanup(self.index.close)
+        self.addCleanup(lambda: self.index._sync_thread and self.index._sync_thread.join(timeout=5))
+        self.client = FakeCaseClient()
+        self.embeddings = np.random.default_rng(0).normal(size=(4, 8))
+        self.client.add(self.embeddings)
+
+    def fetch(self, query):
+        with mock.patch.object(config, "CASE_INDEX_ENABLED", True), \
+                mock.patch("src.bigquery_utils.embeddings.get_case_index", return_value=self.index), \
+                mock.patch("src.bigquery_utils.embeddings._vector_search_cases", return_value="vector_search") as fallback:
+            return fetch_similar_cases(self.client, list(query), top_k=2), fallback
+
+    def test_uses_local_index_and_decodes_words(self):
+        self.index.sync(self.client)
+
+        result, fallback = self.fetch(self.embeddings[2])
+
+        fallback.assert_not_called()
+        self.assertEqual(result["run_id"].iloc[0], "run-2")
+        self.assertEqual(result["words_df"].iloc[0]["word"].tolist(), ["hello"])
+
+    def test_first_sync_runs_in_background_with_vector_search_meanwhile(self):
+        result, fallback = self.fetch(self.embeddings[2])
+
+        self.assertEqual(result, "vector_search")
+        self.index._sync_thread.join(timeout=5)
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.fetch(self.embeddings[2])[0]["run_id"].iloc[0], "run-2")
+
+
+if __name__ == "__main__":
+    unittest.main()
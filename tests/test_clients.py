@@ -0,0 +1,62 @@
+"""
+Unit tests for the shared client registry.
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from src import clients
+
+
+class TestClientRegistry(unittest.TestCase):
+    def setUp(self):
+        clients.reset_clients()
+        self.addCleanup(clients.reset_clients)
+
+    def test_concurrent_first_use_creates_once(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(clients._get_or_create("x", factory)))
+            for _ in range(16)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+    def test_bq_client_is_shared_and_pooled(self):
+        credentials = mock.Mock(project_id="p")
+        with mock.patch.object(clients.config, "SERVICE_ACCOUNT_KEY_FILE_PATH", "key.json"), \
+             mock.patch.object(clients.service_account.Credentials, "from_service_account_file", return_value=credentials) as load, \
+             mock.patch.object(clients.bigquery, "Client") as client_cls, \
+             mock.patch.object(clients, "_authorized_session") as session:
+            first = clients.get_bq_client()
+            second = clients.get_bq_client()
+
+        self.assertIs(first, second)
+        load.assert_called_once()
+        client_cls.assert_called_once_with(credentials=credentials, project="p", _http=session.return_value)
+
+    def test_lazy_client_defers_creation(self):
+        getter = mock.Mock()
+        lazy = clients.LazyClient(getter)
+        getter.assert_not_called()
+
+        lazy.query("SELECT 1")
+        getter.return_value.query.assert_called_once_with("SELECT 1")
+
+
+if __name__ == '__main__':
+    unittest.main()
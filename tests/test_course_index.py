@@ -0,0 +1,116 @@
+"""
+Unit tests for the in-process course index.
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src import config, course_index
+from src.bigquery_utils.retrieval_qa import fetch_top_courses_vector_search
+from src.course_index import CourseIndex
+from src.vector_index import top_k_cosine, normalize_rows
+
+
+class FakeCourseClient:
+    """get_table() reports a modified time; query() returns the course rows."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.modified = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.queries = 0
+
+    def get_table(self, table_id):
+        return mock.Mock(modified=self.modified)
+
+    def query(self, query):
+        self.queries += 1
+        df = pd.DataFrame({
+            "course_id": [f"c{i}" for i in range(len(self.embeddings))],
+            "title": [f"Course {i}" for i in range(len(self.embeddings))],
+            "description": ["d"] * len(self.embeddings),
+            "category": ["fluency"] * len(self.embeddings),
+            "url": ["https://example.com"] * len(self.embeddings),
+            "course_embedding": list(self.embeddings),
+        })
+        return mock.Mock(to_dataframe=mock.Mock(return_value=df))
+
+
+class TestTopKCosine(unittest.TestCase):
+    def test_matches_brute_force_ordering(self):
+        rng = np.random.default_rng(0)
+        matrix = normalize_rows(rng.normal(size=(50, 8)))
+        query = rng.normal(size=8)
+
+        idx, distances = top_k_cosine(matrix, query, 5)
+
+        expected = np.argsort(-(matrix @ (query / np.linalg.norm(query))))[:5]
+        np.testing.assert_array_equal(idx, expected)
+        self.assertTrue(np.all(np.diff(distances) >= 0))
+
+
+class TestCourseIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.snapshot = os.path.join(tmp.name, "courses.npz")
+        self.client = FakeCourseClient([[1.0, 0.0], [0.0, 2.0], [1.0, 1.0]])
+
+    def test_search_returns_nearest_by_cosine(self):
+        index = CourseIndex("p.d.courses", snapshot_path=self.snapshot)
+        index.refresh(self.client)
+
+        result = index.search([0.0, 5.0], top_k=2)
+
+        self.assertEqual(result["course_id"].tolist(), ["c1", "c2"])
+        self.assertAlmostEqual(result["distance"].iloc[0], 0.0, places=6)
+        self.assertEqual(list(result.columns), ["course_id", "title", "description", "category", "url", "distance"])
+
+    def test_reloads_only_when_version_changes(self):
+        index = CourseIndex("p.d.courses", refresh_interval=0, snapshot_path=None)
+        index.refresh(self.client)
+        self.assertFalse(index.refresh(self.client))
+        self.assertEqual(self.client.queries, 1)
+
+        self.client.modified = datetime(2025, 2, 1, tzinfo=timezone.utc)
+        self.client.embeddings = [[1.0, 0.0]]
+        self.assertTrue(index.refresh(self.client))
+        self.assertEqual(len(index), 1)
+
+    def test_version_checks_are_throttled(self):
+        index = CourseIndex("p.d.courses", refresh_interval=3600)
+        index.refresh(self.client)
+        with mock.patch.object(self.client, "get_table") as get_table:
+            index.refresh(self.client)
+        get_table.assert_not_called()
+
+    def test_snapshot_skips_load_query_in_new_process(self):
+        CourseIndex("p.d.courses", snapshot_path=self.snapshot).refresh(self.client)
+
+        reopened = CourseIndex("p.d.courses", snapshot_path=self.snapshot)
+        reopened.refresh(self.client)
+
+        self.assertEqual(self.client.queries, 1)
+        self.assertEqual(reopened.search([1.0, 0.0], top_k=1)["course_id"].iloc[0], "c0")
+
+
+class TestFetchTopCourses(unittest.TestCase):
+    def test_uses_in_memory_index_without_vector_search_job(self):
+        client = FakeCourseClient([[1.0, 0.0], [0.0, 1.0]])
+        index = CourseIndex("p.d.courses")
+        with mock.patch.object(course_index, "_index", index), \
+             mock.patch.object(config, "COURSE_INDEX_ENABLED", True), \
+             mock.patch("src.bigquery_utils.retrieval_qa.generate_transcript_embedding", return_value=[0.1, 0.9]):
+            result = fetch_top_courses_vector_search(client, "anything", top_k=1)
+
+        self.assertEqual(result["course_id"].tolist(), ["c1"])
+        self.assertEqual(client.queries, 1)  # the one-off index load
+
+
+if __name__ == '__main__':
+    unittest.main()
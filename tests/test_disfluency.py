@@ -0,0 +1,93 @@
+"""
+Unit tests for the disfluency detector registry.
+"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src import disfluency
+from src.disfluency import register_detector, detect_disfluencies
+from src.analyze_stammer import compute_speech_metrics, SpeechMetricsAccumulator
+
+
+def words_frame(words, gap=0.1):
+    starts = np.arange(len(words), dtype=np.float32)
+    return pd.DataFrame({"word": words, "start_time": starts, "end_time": starts + np.float32(1 - gap)})
+
+
+class TestDetectors(unittest.TestCase):
+    def test_part_word_repetition(self):
+        df = words_frame(["b-b-but", "well-known", "I-I", "st-st-stop", "go"])
+        _, result = detect_disfluencies(df, detectors=["part_word_repetition"])
+        self.assertEqual(result.masks["is_part_word_repetition"].tolist(), [True, False, True, True, False])
+
+    def test_word_patterns_share_one_pass(self):
+        df = words_frame(["sssso", "b-b-but", "Mmm-mmm", "go", "sssso"])
+        patterns = {**disfluency.WORD_PATTERNS, "hyphenated": r"\w+-\w+"}
+        with mock.patch.dict(disfluency.WORD_PATTERNS, patterns):
+            arrays = disfluency.build_word_arrays(df)
+            matches = arrays.pattern_matches
+
+        self.assertEqual(matches["prolongation"].tolist(), [True, False, True, False, True])
+        self.assertEqual(matches["part_word_repetition"].tolist(), [False, True, True, False, False])
+        self.assertEqual(matches["hyphenated"].tolist(), [False, True, True, False, False])
+        self.assertIs(arrays.pattern_matches, matches)  # computed once per WordArrays
+
+    def test_interjection_cluster(self):
+        df = words_frame(["um", "uh,", "hmm", "so", "um"])
+        _, result = detect_disfluencies(df, detectors=["interjection_cluster"])
+        self.assertEqual(result.masks["is_interjection_cluster"].tolist(), [False, True, True, False, False])
+
+    def test_group_boundaries(self):
+        df = words_frame(["go", "go", "go"])
+        df["uri"] = ["a", "a", "b"]
+        arrays, result = detect_disfluencies(df, group_col="uri")
+        self.assertEqual(result.masks["is_repetition"].tolist(), [False, True, False])
+        self.assertTrue(np.isnan(arrays.pause[1]))
+
+    def test_unknown_detector(self):
+        with self.assertRaises(ValueError):
+            detect_disfluencies(words_frame(["a"]), detectors=["nope"])
+
+    def test_timings_exposed(self):
+        summary, analysis = compute_speech_metrics(words_frame(["um", "go"]))
+        self.assertEqual(
+            set(analysis.attrs["detector_timings"]),
+            {"word_arrays", "filler", "repetition", "prolongation", "block"}
+        )
+
+
+class TestCustomDetector(unittest.TestCase):
+    def setUp(self):
+        @register_detector("long_word", column="is_long_word", summary_key="long_words", weight=0.5)
+        def detect_long_word(arrays):
+            return np.fromiter((len(w) > 6 for w in arrays.word), dtype=bool, count=len(arrays))
+
+    def tearDown(self):
+        disfluency.DETECTORS.pop("long_word", None)
+
+    def test_custom_detector_in_summary_and_severity(self):
+        df = words_frame(["extraordinary", "go", "um"])
+        summary, analysis = compute_speech_metrics(df, detectors=["filler", "long_word"])
+
+        self.assertEqual(summary["long_words"], 1)
+        self.assertEqual(summary["filler_count"], 1)
+        self.assertAlmostEqual(summary["severity_score"], 1.5 / 3)
+        self.assertIn("is_long_word", analysis.columns)
+
+    def test_streaming_matches_batch_with_extra_detectors(self):
+        names = ["filler", "repetition", "block", "interjection_cluster", "part_word_repetition", "long_word"]
+        df = words_frame(["um", "uh", "b-b-but", "go", "go", "extraordinary", "hmm", "er"] * 5, gap=0.6)
+        expected, _ = compute_speech_metrics(df, long_pause_thresh=0.5, detectors=names)
+
+        acc = SpeechMetricsAccumulator(long_pause_thresh=0.5, detectors=names)
+        for i in range(0, len(df), 3):
+            acc.update(df.iloc[i:i + 3])
+        self.assertEqual(acc.summary(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Unit tests for the two-tier embedding cache.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src import embedding_cache
+from src.bigquery_utils.embeddings import generate_text_embeddings
+from src.embedding_cache import EmbeddingCache, make_cache_key
+
+
+class FakeEmbeddingClient:
+    """Records ML.GENERATE_EMBEDDING jobs and embeds each text as [len(text), idx]."""
+
+    def __init__(self):
+        self.batches = []
+
+    def query(self, query, job_config=None):
+        texts = job_config.query_parameters[0].values
+        self.batches.append(list(texts))
+        df = pd.DataFrame({
+            "idx": range(len(texts)),
+            "embedding": [[float(len(t)), float(i)] for i, t in enumerate(texts)],
+            "status": [""] * len(texts),
+        })
+        return mock.Mock(to_dataframe=mock.Mock(return_value=df))
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "embeddings.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_normalizes_whitespace_and_separates_models(self):
+        self.assertEqual(
+            make_cache_key("m", None, "speak  slowly\n"),
+            make_cache_key("m", None, "speak slowly")
+        )
+        self.assertNotEqual(make_cache_key("m", None, "a"), make_cache_key("m", "RETRIEVAL_QUERY", "a"))
+        self.assertNotEqual(make_cache_key("m1", None, "a"), make_cache_key("m2", None, "a"))
+
+    def test_get_or_compute_computes_once(self):
+        cache = EmbeddingCache(self.path)
+        calls = []
+
+        def compute(text):
+            calls.append(text)
+            return [0.5, 1.5, 2.5]
+
+        first = cache.get_or_compute("m", None, "hello", compute)
+        second = cache.get_or_compute("m", None, "hello ", compute)
+
+        self.assertEqual(len(calls), 1)
+        np.testing.assert_array_equal(first, second)
+        self.assertEqual(first.dtype, np.float32)
+        stats = cache.stats()
+        self.assertEqual((stats["misses"], stats["memory_hits"]), (1, 1))
+
+    def test_disk_tier_survives_restart(self):
+        EmbeddingCache(self.path).put("k", [1.0, 2.0])
+
+        reopened = EmbeddingCache(self.path)
+        np.testing.assert_array_equal(reopened.get("k"), np.array([1.0, 2.0], dtype=np.float32))
+        self.assertEqual(reopened.stats()["disk_hits"], 1)
+
+    def test_memory_lru_is_bounded(self):
+        cache = EmbeddingCache(None, max_memory_items=2)
+        cache.put("a", [1.0])
+        cache.put("b", [2.0])
+        cache.get("a")
+        cache.put("c", [3.0])
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+
+    def test_disk_eviction_by_size(self):
+        vector = np.zeros(256, dtype=np.float32)  # 1 KiB
+        cache = EmbeddingCache(self.path, max_memory_items=1, max_disk_bytes=4 * 1024)
+        for i in range(10):
+            cache.put(f"k{i}", vector)
+
+        self.assertLessEqual(cache.stats()["disk_bytes"], 4 * 1024)
+        self.assertIsNone(cache.get("k0"))
+        self.assertIsNotNone(cache.get("k9"))
+
+
+class TestGenerateTextEmbeddings(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(embedding_cache, "_cache", EmbeddingCache(None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batches_dedupes_and_keeps_order(self):
+        client = FakeEmbeddingClient()
+        texts = ["a", "bbb", "a", "cc", "dddd", "bbb"]
+
+        vectors = generate_text_embeddings(client, texts, batch_size=2)
+
+        self.assertEqual(client.batches, [["a", "bbb"], ["cc", "dddd"]])
+        self.assertEqual([v[0] for v in vectors], [1.0, 3.0, 1.0, 2.0, 4.0, 3.0])
+
+    def test_cached_texts_skip_the_query(self):
+        client = FakeEmbeddingClient()
+        generate_text_embeddings(client, ["a", "bb"])
+        generate_text_embeddings(client, ["bb", "ccc"])
+
+        self.assertEqual(client.batches, [["a", "bb"], ["ccc"]])
+
+    def test_rejects_unknown_task_type(self):
+        with self.assertRaises(ValueError):
+            generate_text_embeddings(FakeEmbeddingClient(), ["a"], task_type="x'; DROP")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""
+Unit tests for lazy imports and the cold-start import budget.
+"""
+
+import subprocess
+import sys
+import unittest
+
+from benchmarks.import_time import eager_imports, profile_imports
+from src.lazy_imports import lazy_import
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_module_loads_on_first_attribute_access(self):
+        code = (
+            "import sys, types; from src.lazy_imports import lazy_import; "
+            "m = lazy_import('colorsys'); "
+            "before = type(m) is types.ModuleType; m.rgb_to_hsv(0, 0, 0); "
+            "print(before, type(m) is types.ModuleType)"
+        )
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.split(), ["False", "True"])
+
+    def test_already_imported_module_is_returned_as_is(self):
+        import json
+        self.assertIs(lazy_import("json"), json)
+
+    def test_missing_module_raises(self):
+        with self.assertRaises(ImportError):
+            lazy_import("src.no_such_module")
+
+
+class TestColdStart(unittest.TestCase):
+    def test_app_import_does_not_load_heavy_sdks(self):
+        entries = profile_imports("streamlit_app")
+        self.assertEqual(eager_imports(entries), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
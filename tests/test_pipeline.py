@@ -0,0 +1,67 @@
+"""
+Unit tests for the headless pipeline DAG.
+"""
+
+import io
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from src import pipeline
+from src.stage_dag import TimingRecorder
+
+
+def transcript_row(uri):
+    payload = (
+        '{"results": {"%s": {"inline_result": {"transcript": {"results": [{"alternatives": [{"words": ['
+        '{"word": "hello", "start_offset": "0.1s", "end_offset": "0.5s"}]}]}]}}}}}' % uri
+    )
+    return pd.DataFrame({"uri": [uri], "transcripts": ["hello"], "ml_transcribe_result": [payload]})
+
+
+class TestRunPipeline(unittest.TestCase):
+    def setUp(self):
+        for name, value in {
+            "generate_therapy_plan": mock.Mock(return_value="plan"),
+            "fetch_top_courses_vector_search": mock.Mock(return_value="courses"),
+            "generate_transcript_embedding": mock.Mock(return_value=[0.5]),
+            "insert_analysis_result_with_embedding": mock.Mock(),
+        }.items():
+            patcher = mock.patch(f"src.analyze_stammer.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(pipeline.config, "AUDIO_PREPROCESS_ENABLED", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reused_transcript_skips_upload_and_records_timings(self):
+        progress = TimingRecorder()
+        with mock.patch.object(pipeline, "fetch_existing_transcript", return_value=transcript_row("gs://b/audio/x.wav")), \
+             mock.patch.object(pipeline, "upload_audio") as upload, \
+             mock.patch.object(pipeline, "submit_transcription") as submit:
+            analysis, embedding, courses = pipeline.run_pipeline(io.BytesIO(b"RIFF"), progress, filename="x.wav")
+
+        upload.assert_not_called()
+        submit.assert_not_called()
+        self.assertEqual((analysis["therapy_plan"], embedding, courses), ("plan", [0.5], "courses"))
+        self.assertEqual(
+            [t.name for t in progress.timings][:5], ["prepare", "lookup", "upload", "submit", "transcribe"]
+        )
+        self.assertEqual(progress.messages, ["✅ Pipeline complete!"])
+
+    def test_failed_transcription_is_reported_not_raised(self):
+        progress = TimingRecorder()
+        with mock.patch.object(pipeline, "fetch_existing_transcript", return_value=None), \
+             mock.patch.object(pipeline, "upload_audio", return_value="gs://b/audio/x.wav"), \
+             mock.patch.object(pipeline, "submit_transcription", return_value=mock.Mock()), \
+             mock.patch.object(pipeline, "wait_for_transcription", return_value=(False, "❌ bad audio")):
+            outcome = pipeline.run_pipeline(io.BytesIO(b"RIFF"), progress, filename="x.wav")
+
+        self.assertEqual(outcome, (None, None, None))
+        self.assertEqual(len(progress.errors), 1)
+        self.assertIn("bad audio", progress.errors[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
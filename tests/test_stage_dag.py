@@ -0,0 +1,116 @@
+"""
+Unit tests for the stage DAG executor.
+"""
+
+import threading
+import time
+import unittest
+
+from src.stage_dag import REPORT, Stage, StageDAG, StageError, TimingRecorder
+
+
+def after(seconds, value):
+    def func(**kwargs):
+        time.sleep(seconds)
+        return value
+    return func
+
+
+class TestStageDAG(unittest.TestCase):
+    def test_independent_stages_overlap_and_outputs_flow(self):
+        dag = StageDAG([
+            Stage("total", lambda a, b: a + b, inputs=("a", "b"), outputs=("total",)),
+            Stage("a", after(0.2, 1), inputs=("x",), outputs=("a",)),
+            Stage("b", after(0.2, 2), inputs=("x",), outputs=("b",)),
+            Stage("split", lambda total: (total, -total), inputs=("total",), outputs=("pos", "neg")),
+        ])
+        self.assertEqual(dag.order[-2:], ["total", "split"])
+        self.assertEqual(dag.required_inputs(), ["x"])
+
+        start = time.perf_counter()
+        run = dag.run({"x": None})
+
+        self.assertLess(time.perf_counter() - start, 0.35)
+        self.assertEqual((run.values["total"], run.values["pos"], run.values["neg"]), (3, 3, -3))
+        self.assertEqual(run.timings["a"].status, "ok")
+        self.assertGreaterEqual(run.timings["a"].seconds, 0.2)
+
+    def test_retry_with_backoff(self):
+        calls = []
+
+        def flaky():
+            calls.append(time.perf_counter())
+            if len(calls) < 3:
+                raise ConnectionError("reset")
+            return "ok"
+
+        run = StageDAG([Stage("flaky", flaky, outputs=("out",), retries=2, backoff=0.05)]).run({})
+
+        self.assertEqual(run.values["out"], "ok")
+        self.assertEqual(run.timings["flaky"].attempts, 3)
+        self.assertGreaterEqual(calls[2] - calls[1], 0.1)
+
+    def test_failure_raises_with_timings_and_cancels_dependents(self):
+        dag = StageDAG([
+            Stage("bad", lambda: 1 / 0, outputs=("x",), retries=1, backoff=0, retry_on=(KeyError,)),
+            Stage("next", lambda x: x, inputs=("x",), outputs=("y",)),
+        ])
+        with self.assertRaises(StageError) as ctx:
+            dag.run({})
+
+        self.assertEqual(ctx.exception.stage, "bad")
+        self.assertIsInstance(ctx.exception.cause, ZeroDivisionError)
+        self.assertEqual(ctx.exception.timings["bad"].attempts, 1)  # not retryable
+        self.assertEqual(ctx.exception.timings["next"].status, "cancelled")
+
+    def test_timeout_is_retried_then_fails(self):
+        dag = StageDAG([Stage("hang", after(1.0, None), outputs=("x",), timeout=0.05, retries=1, backoff=0)])
+        start = time.perf_counter()
+        with self.assertRaises(StageError) as ctx:
+            dag.run({})
+
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(ctx.exception.timings["hang"].status, "timeout")
+        self.assertEqual(ctx.exception.timings["hang"].attempts, 2)
+
+    def test_timeout_counts_from_worker_start_not_queueing(self):
+        dag = StageDAG([
+            Stage("busy", after(0.3, 1), outputs=("a",)),
+            Stage("queued", after(0.1, 2), outputs=("b",), timeout=0.2),
+        ], max_workers=1)
+
+        run = dag.run({})
+
+        self.assertEqual(run.values["b"], 2)
+        self.assertEqual(run.timings["queued"].attempts, 1)
+
+    def test_worker_reports_reach_callback_on_calling_thread(self):
+        seen = []
+
+        class Progress(TimingRecorder):
+            def on_stage_progress(self, stage, fraction, message=None):
+                seen.append((stage, fraction, threading.current_thread()))
+
+        def work(report):
+            for fraction in (0.5, 1.0):
+                report(fraction)
+                time.sleep(0.06)
+
+        progress = Progress()
+        StageDAG([Stage("upload", work, inputs=(REPORT,))]).run({}, progress)
+
+        self.assertEqual([(s, f) for s, f, _ in seen], [("upload", 0.5), ("upload", 1.0)])
+        self.assertEqual({t for _, _, t in seen}, {threading.current_thread()})
+        self.assertEqual([t.name for t in progress.timings], ["upload"])
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            StageDAG([Stage("a", None, inputs=("y",), outputs=("x",)), Stage("b", None, inputs=("x",), outputs=("y",))])
+        with self.assertRaises(ValueError):
+            StageDAG([Stage("a", None, outputs=("x",)), Stage("b", None, outputs=("x",))])
+        with self.assertRaises(ValueError):
+            StageDAG([Stage("a", None, inputs=("missing",))]).run({})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,280 @@
+"""
+Unit tests for non-blocking transcription job handles.
+"""
+
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src import config, write_spool
+from src.bigquery_utils.transcription import (
+    TranscriptionJob, submit_transcription, poll_transcription, load_transcription_job, transcribe_audio_batch,
+    fetch_existing_transcript, shift_word_offsets, merge_segment_transcripts
+)
+from src.analyze_stammer import extract_word_level
+
+
+def use_temp_spool(test):
+    """Route spooled writes to a temporary spool without a background flusher."""
+    tmp = tempfile.TemporaryDirectory()
+    test.addCleanup(tmp.cleanup)
+    spool = write_spool.WriteSpool(f"{tmp.name}/spool.sqlite")
+    spool.start = mock.Mock()
+    patcher = mock.patch.object(write_spool, "_spool", spool)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return spool
+
+
+def make_payload(uri, start_offsets, words=None):
+    """ml_transcribe_result JSON with one word per start offset (None → omitted)."""
+    words = words or [{"word": f"w{i}", **({"start_offset": s} if s else {})} for i, s in enumerate(start_offsets)]
+    return json.dumps({"results": {uri: {"inline_result": {"transcript": {
+        "results": [{"alternatives": [{"words": words}]}]
+    }}}}})
+
+
+class FakeTranscribeClient:
+    """Minimal BigQuery client: query() starts jobs, get_job() reports their state."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.queries = []
+        self.parameters = []
+
+    def query(self, query, job_config=None):
+        self.queries.append(query)
+        self.parameters.append({p.name: p.values if hasattr(p, "values") else p.value
+                                for p in job_config.query_parameters})
+        job = mock.Mock(job_id=f"job-{len(self.jobs)}", location="US", state="RUNNING", error_result=None)
+        job.to_dataframe.return_value = pd.DataFrame({
+            "uri": ["gs://b/audio/a.wav"], "transcripts": ["hello world"], "ml_transcribe_status": [""]
+        })
+        self.jobs[job.job_id] = job
+        return job
+
+    def get_job(self, job_id, location=None):
+        return self.jobs[job_id]
+
+
+class TestTranscriptionJobs(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(config, "CACHE_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.spool = use_temp_spool(self)
+        self.client = FakeTranscribeClient()
+
+    def test_submit_persists_and_reattaches(self):
+        handle = submit_transcription("gs://b/audio/a.wav", self.client)
+        again = submit_transcription("gs://b/audio/a.wav", self.client)
+
+        self.assertEqual(again.job_id, handle.job_id)
+        self.assertEqual(len(self.client.jobs), 1)
+        self.assertEqual(load_transcription_job(job_id=handle.job_id), handle)
+        self.assertIn("uri = @uri", self.client.queries[0])
+        self.assertEqual(self.client.parameters[0], {"uri": "gs://b/audio/a.wav"})
+
+    def test_failed_job_is_not_reattached(self):
+        handle = submit_transcription("gs://b/audio/a.wav", self.client)
+        self.client.jobs[handle.job_id].error_result = {"message": "boom"}
+
+        again = submit_transcription("gs://b/audio/a.wav", self.client)
+        self.assertNotEqual(again.job_id, handle.job_id)
+
+    def test_poll_until_done_stores_once(self):
+        handle = submit_transcription("gs://b/audio/a.wav", self.client)
+        self.assertEqual(poll_transcription(handle, self.client), (None, "RUNNING"))
+
+        self.client.jobs[handle.job_id].state = "DONE"
+        ok, transcripts = poll_transcription(handle, self.client)
+        self.assertTrue(ok)
+        self.assertEqual(transcripts["transcripts"].iloc[0], "hello world")
+
+        # A second session reattaching to the finished job does not store it again
+        reattached = load_transcription_job(uri="gs://b/audio/a.wav")
+        self.assertTrue(reattached.stored)
+        poll_transcription(reattached, self.client)
+        self.assertEqual(self.spool.pending_count(), 1)
+
+    def test_stale_copies_of_one_handle_store_once(self):
+        handle = submit_transcription("gs://b/audio/a.wav", self.client)
+        # Two sessions holding snapshots taken before the job finished
+        first, second = (TranscriptionJob.from_dict(handle.to_dict()) for _ in range(2))
+        self.client.jobs[handle.job_id].state = "DONE"
+
+        self.assertTrue(poll_transcription(first, self.client)[0])
+        self.assertTrue(poll_transcription(second, self.client)[0])
+        self.assertTrue(poll_transcription(TranscriptionJob.from_dict(handle.to_dict()), self.client)[0])
+
+        self.assertEqual(self.spool.pending_count(), 1)
+
+    def test_finished_job_with_status_error_is_resubmitted(self):
+        handle = submit_transcription("gs://b/audio/a.wav", self.client)
+        job = self.client.jobs[handle.job_id]
+        job.state = "DONE"
+        job.to_dataframe.return_value = pd.DataFrame({
+            "uri": ["gs://b/audio/a.wav"], "transcripts": [""], "ml_transcribe_status": ["INVALID_ARGUMENT: bad audio"]
+        })
+        ok, message = poll_transcription(handle, self.client)
+        self.assertFalse(ok)
+        self.assertIn("INVALID_ARGUMENT", message)
+
+        again = submit_transcription("gs://b/audio/a.wav", self.client)
+
+        self.assertNotEqual(again.job_id, handle.job_id)
+        self.assertEqual(self.spool.pending_count(), 0)
+
+    def test_trimmed_offset_is_applied_before_storing(self):
+        handle = submit_transcription("gs://b/audio/a.wav", self.client, audio_offset=1.5)
+        job = self.client.jobs[handle.job_id]
+        job.state = "DONE"
+        job.to_dataframe.return_value["ml_transcribe_result"] = [make_payload("gs://b/audio/a.wav", ["0.5s", None])]
+
+        ok, transcripts = poll_transcription(load_transcription_job(job_id=handle.job_id), self.client)
+
+        self.assertTrue(ok)
+        stored = self.spool.pending_rows(f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.TRANSCRIBE_TABLE_ID}")
+        words = json.loads(stored[0]["ml_transcribe_result"])["results"]["gs://b/audio/a.wav"][
+            "inline_result"]["transcript"]["results"][0]["alternatives"][0]["words"]
+        self.assertEqual([w["start_offset"] for w in words], ["2.000s", "1.500s"])
+
+
+class TestShiftWordOffsets(unittest.TestCase):
+    def test_shift_keeps_payload_type_and_skips_empty(self):
+        payload = json.loads(make_payload("gs://b/a.wav", ["1s"]))
+        df = pd.DataFrame({"ml_transcribe_result": [payload, None]})
+
+        shift_word_offsets(df, 0.25)
+
+        words = df["ml_transcribe_result"].iloc[0]["results"]["gs://b/a.wav"]["inline_result"][
+            "transcript"]["results"][0]["alternatives"][0]["words"]
+        self.assertEqual((words[0]["start_offset"], words[0]["end_offset"]), ("1.250s", "0.250s"))
+        self.assertIsNone(df["ml_transcribe_result"].iloc[1])
+
+
+def timed_words(*words):
+    return [{"word": w, "start_offset": f"{s}s", "end_offset": f"{e}s"} for w, s, e in words]
+
+
+class TestSegmentedTranscription(unittest.TestCase):
+    SEGMENTS = [
+        {"uri": "gs://b/audio/p0.wav", "offset": 1.0, "duration": 11.0},   # 1-12 s
+        {"uri": "gs://b/audio/p1.wav", "offset": 10.0, "duration": 10.0},  # 10-20 s, overlap 10-12 → cut at 11
+    ]
+
+    def segment_rows(self):
+        return pd.DataFrame({
+            "uri": ["gs://b/audio/p1.wav", "gs://b/audio/p0.wav"],
+            "transcripts": ["again done", "hello there again"],
+            "ml_transcribe_result": [
+                make_payload("gs://b/audio/p1.wav", None, timed_words(("again", 0.4, 0.8), ("done", 2.0, 2.5))),
+                make_payload("gs://b/audio/p0.wav", None, timed_words(
+                    ("hello", 0.0, 0.5), ("there", 1.0, 1.5), ("again", 9.4, 9.8)
+                )),
+            ],
+            "ml_transcribe_status": ["", ""],
+        })
+
+    def test_merge_dedupes_overlap_and_keeps_word_schema(self):
+        merged = merge_segment_transcripts(self.segment_rows(), "gs://b/audio/full.wav", self.SEGMENTS)
+
+        self.assertEqual(list(merged.columns), ["uri", "transcripts", "ml_transcribe_result", "ml_transcribe_status"])
+        self.assertEqual(merged["transcripts"].iloc[0], "hello there again done")
+
+        words = extract_word_level(merged)
+        self.assertEqual(words["uri"].unique().tolist(), ["gs://b/audio/full.wav"])
+        self.assertEqual(words["word"].tolist(), ["hello", "there", "again", "done"])
+        np.testing.assert_allclose(words["start_time"], [1.0, 2.0, 10.4, 12.0])
+
+    def test_failed_or_missing_segment_is_an_error(self):
+        rows = self.segment_rows()
+        rows.loc[0, "ml_transcribe_status"] = "INVALID_ARGUMENT"
+        self.assertIn("failed", merge_segment_transcripts(rows, "gs://b/audio/full.wav", self.SEGMENTS))
+        self.assertIn("not transcribed", merge_segment_transcripts(rows[1:], "gs://b/audio/full.wav", self.SEGMENTS))
+
+    def test_submit_one_query_and_store_merged_row(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with mock.patch.object(config, "CACHE_DIR", tmp.name):
+            spool = use_temp_spool(self)
+            client = FakeTranscribeClient()
+            handle = submit_transcription("gs://b/audio/full.wav", client, segments=self.SEGMENTS)
+
+            job = client.jobs[handle.job_id]
+            self.assertIn("uri IN UNNEST(@uris)", client.queries[0])
+            self.assertEqual(client.parameters[0], {"uris": ["gs://b/audio/p0.wav", "gs://b/audio/p1.wav"]})
+            job.state = "DONE"
+            job.to_dataframe.return_value = self.segment_rows()
+
+            ok, transcripts = poll_transcription(load_transcription_job(uri="gs://b/audio/full.wav"), client)
+
+        self.assertTrue(ok)
+        self.assertEqual(len(transcripts), 1)
+        stored = spool.pending_rows(f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.TRANSCRIBE_TABLE_ID}")
+        self.assertEqual([row["uri"] for row in stored], ["gs://b/audio/full.wav"])
+
+
+class TestTranscribeAudioBatch(unittest.TestCase):
+    def test_one_query_one_load_and_failures_by_uri(self):
+        spool = use_temp_spool(self)
+        client = mock.Mock()
+        client.query.return_value.to_dataframe.return_value = pd.DataFrame({
+            "uri": ["gs://b/a.wav", "gs://b/b.wav", "gs://b/c.wav"],
+            "transcripts": ["hello", None, "world"],
+            "ml_transcribe_status": ["", "INVALID_ARGUMENT: bad audio", None],
+        })
+
+        transcripts, failures = transcribe_audio_batch(
+            ["gs://b/a.wav", "gs://b/b.wav", "gs://b/c.wav", "gs://b/missing.wav", "gs://b/a.wav"], client
+        )
+
+        self.assertEqual(client.query.call_count, 1)
+        params = client.query.call_args.kwargs["job_config"].query_parameters
+        self.assertEqual(params[0].values, ["gs://b/a.wav", "gs://b/b.wav", "gs://b/c.wav", "gs://b/missing.wav"])
+
+        self.assertEqual(sorted(transcripts), ["gs://b/a.wav", "gs://b/c.wav"])
+        self.assertEqual(transcripts["gs://b/c.wav"]["transcripts"].iloc[0], "world")
+        self.assertEqual(failures, {
+            "gs://b/b.wav": "INVALID_ARGUMENT: bad audio",
+            "gs://b/missing.wav": "Not found in the audio object table",
+        })
+
+        stored = spool.pending_rows(f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.TRANSCRIBE_TABLE_ID}")
+        self.assertEqual([row["uri"] for row in stored], ["gs://b/a.wav", "gs://b/c.wav"])
+        self.assertIn("processed_at", stored[0])
+
+
+class TestFetchExistingTranscript(unittest.TestCase):
+    def setUp(self):
+        self.spool = use_temp_spool(self)
+        self.table_id = f"{config.PROJECT_ID}.{config.DATASET_ID}.{config.TRANSCRIBE_TABLE_ID}"
+
+    def test_spooled_transcript_is_found_without_query(self):
+        self.spool.enqueue(self.table_id, [{"uri": "gs://b/audio/abc.mp3", "transcripts": "hi"}], ["abc"])
+        client = mock.Mock()
+
+        found = fetch_existing_transcript("gs://b/audio/abc.mp3", client)
+
+        self.assertEqual(found["transcripts"].iloc[0], "hi")
+        client.query.assert_not_called()
+
+    def test_table_hit_and_miss(self):
+        client = mock.Mock()
+        client.query.return_value.to_dataframe.return_value = pd.DataFrame({"uri": ["gs://b/audio/x.mp3"], "transcripts": ["yo"]})
+        self.assertEqual(len(fetch_existing_transcript("gs://b/audio/x.mp3", client)), 1)
+        params = client.query.call_args.kwargs["job_config"].query_parameters
+        self.assertEqual(params[0].value, "gs://b/audio/x.mp3")
+
+        client.query.return_value.to_dataframe.return_value = pd.DataFrame()
+        self.assertIsNone(fetch_existing_transcript("gs://b/audio/y.mp3", client))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Unit tests for BigQuery vector index lifecycle management.
+"""
+
+import json
+import unittest
+from unittest import mock
+
+from src import config
+from src.bigquery_utils import vector_indexes
+from src.bigquery_utils.vector_indexes import (
+    VectorIndexSpec, ensure_vector_index, get_index_status, ivf_num_lists, vector_search_options
+)
+
+SPEC = VectorIndexSpec("cases_index", "cases", "transcript_embedding", fraction_lists_to_search=0.05)
+
+
+class FakeIndexClient:
+    """Serves one INFORMATION_SCHEMA.VECTOR_INDEXES row (or none) and records DDL."""
+
+    def __init__(self, table_rows, index=None):
+        self.table_rows = table_rows
+        self.index = index
+        self.ddl = []
+
+    def get_table(self, table_id):
+        return mock.Mock(num_rows=self.table_rows)
+
+    def query(self, query, job_config=None):
+        if "INFORMATION_SCHEMA" in query:
+            rows = [mock.Mock(**self.index)] if self.index else []
+        else:
+            self.ddl.append(query)
+            rows = []
+        return mock.Mock(result=mock.Mock(return_value=rows))
+
+
+def index_row(status="ACTIVE", coverage=100, num_lists=100):
+    return {
+        "index_status": status,
+        "coverage_percentage": coverage,
+        "ddl": f'CREATE VECTOR INDEX cases_index ON t(c) OPTIONS(index_type="IVF", '
+               f'ivf_options="{{\\"num_lists\\": {num_lists}}}")',
+    }
+
+
+class TestIndexStatus(unittest.TestCase):
+    def test_reads_status_coverage_and_lists(self):
+        status = get_index_status(FakeIndexClient(10000, index_row(coverage=80, num_lists=120)), SPEC)
+
+        self.assertTrue(status.exists)
+        self.assertEqual((status.status, status.coverage, status.num_lists), ("ACTIVE", 80.0, 120))
+
+    def test_missing_index(self):
+        status = get_index_status(FakeIndexClient(10000), SPEC)
+
+        self.assertFalse(status.exists)
+        self.assertFalse(status.usable)
+
+
+class TestVectorSearchOptions(unittest.TestCase):
+    def setUp(self):
+        vector_indexes._status_cache.clear()
+        self.addCleanup(vector_indexes._status_cache.clear)
+        patcher = mock.patch.dict(vector_indexes.VECTOR_INDEXES, {"cases": SPEC})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def options(self, client, fraction=None):
+        return json.loads(vector_search_options(client, "cases", fraction))
+
+    def test_uses_index_with_site_fraction(self):
+        self.assertEqual(self.options(FakeIndexClient(10000, index_row())), {"fraction_lists_to_search": 0.05})
+
+    def test_fraction_override(self):
+        self.assertEqual(self.options(FakeIndexClient(10000, index_row()), 0.2), {"fraction_lists_to_search": 0.2})
+
+    def test_brute_force_for_small_missing_or_partial_indexes(self):
+        for client in [
+            FakeIndexClient(100, index_row()),
+            FakeIndexClient(10000),
+            FakeIndexClient(10000, index_row(status="PENDING")),
+            FakeIndexClient(10000, index_row(coverage=config.VECTOR_INDEX_MIN_COVERAGE - 1)),
+        ]:
+            vector_indexes._status_cache.clear()
+            self.assertEqual(self.options(client), {"use_brute_force": True})
+
+    def test_status_is_cached(self):
+        client = FakeIndexClient(10000, index_row())
+        client.query = mock.Mock(wraps=client.query)
+
+        self.options(client)
+        self.options(client)
+
+        self.assertEqual(client.query.call_count, 1)
+
+    def test_brute_force_when_status_unavailable(self):
+        client = mock.Mock()
+        client.get_table.side_effect = RuntimeError("no access")
+
+        self.assertEqual(self.options(client), {"use_brute_force": True})
+
+
+class TestEnsureVectorIndex(unittest.TestCase):
+    def test_small_table_skipped(self):
+        client = FakeIndexClient(config.VECTOR_INDEX_MIN_ROWS - 1)
+
+        self.assertEqual(ensure_vector_index(client, SPEC), "skipped")
+        self.assertEqual(client.ddl, [])
+
+    def test_creates_missing_index_sized_to_table(self):
+        client = FakeIndexClient(40000)
+
+        self.assertEqual(ensure_vector_index(client, SPEC), "created")
+        self.assertIn("CREATE VECTOR INDEX IF NOT EXISTS cases_index", client.ddl[0])
+        self.assertIn(f'"num_lists": {ivf_num_lists(40000)}', client.ddl[0])
+
+    def test_existing_index_kept_while_sized_right(self):
+        client = FakeIndexClient(40000, index_row(num_lists=ivf_num_lists(40000)))
+
+        self.assertEqual(ensure_vector_index(client, SPEC), "exists")
+        self.assertEqual(client.ddl, [])
+
+    def test_rebuilt_after_table_growth(self):
+        client = FakeIndexClient(1_000_000, index_row(num_lists=ivf_num_lists(40000)))
+
+        self.assertEqual(ensure_vector_index(client, SPEC), "rebuilt")
+        self.assertIn("CREATE OR REPLACE VECTOR INDEX cases_index", client.ddl[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
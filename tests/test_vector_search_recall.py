@@ -0,0 +1,68 @@
+"""
+Unit tests for the vector search recall benchmark harness.
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.vector_search_recall import (
+    choose_operating_point, load_embeddings, main, recall_at_k, split_queries, sweep_ivf, synthetic_embeddings
+)
+
+
+class TestRecallHelpers(unittest.TestCase):
+    def test_recall_at_k(self):
+        self.assertEqual(recall_at_k([1, 2, 9], [1, 2, 3]), 2 / 3)
+        self.assertEqual(recall_at_k([], []), 1.0)
+
+    def test_operating_point_is_cheapest_reaching_target(self):
+        curve = [{"param": 1, "recall": 0.8}, {"param": 4, "recall": 0.99}, {"param": 8, "recall": 1.0}]
+
+        self.assertEqual(choose_operating_point(curve, 0.95)["param"], 4)
+        self.assertEqual(choose_operating_point(curve[:1], 0.95)["param"], 1)
+
+    def test_split_holds_out_queries(self):
+        matrix = synthetic_embeddings(500, 16)
+        base, queries = split_queries(matrix, 20)
+
+        self.assertEqual((len(base), len(queries)), (480, 20))
+        np.testing.assert_allclose(np.linalg.norm(queries, axis=1), 1.0, rtol=1e-5)
+
+
+class TestSweep(unittest.TestCase):
+    def test_recall_rises_to_exact_when_all_lists_probed(self):
+        base, queries = split_queries(synthetic_embeddings(3000, 16), 30)
+
+        baseline, curve = sweep_ivf(base, queries, k=5, nprobes=[1, 1000], nlist=20)
+
+        self.assertEqual(baseline["param"], "exact")
+        self.assertEqual([p["param"] for p in curve], [1, 20])  # clamped to nlist
+        self.assertLessEqual(curve[0]["recall"], curve[1]["recall"])
+        self.assertEqual(curve[1]["recall"], 1.0)
+
+    def test_quantized_scan_keeps_recall(self):
+        base, queries = split_queries(synthetic_embeddings(3000, 16), 30)
+
+        _, curve = sweep_ivf(base, queries, k=5, nprobes=[20], nlist=20, precision="int8")
+
+        # Probing every list: only float16 rounding near the k-th neighbour can differ
+        self.assertGreaterEqual(curve[0]["recall"], 0.98)
+
+    def test_main_on_exported_embeddings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cases.npy")
+            np.save(path, synthetic_embeddings(2000, 16))
+            self.assertEqual(load_embeddings(path).shape, (2000, 16))
+
+            status = main(["--embeddings", path, "--queries", "20", "--nprobe", "64",
+                           "--output", os.path.join(tmp, "curve.json")])
+
+            self.assertEqual(status, 0)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "curve.json")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Unit tests for the compact words_df storage encoding.
+"""
+
+import json
+import unittest
+
+import pandas as pd
+
+from benchmarks.synthetic import make_transcripts_df
+from src.analyze_stammer import extract_word_level, compute_speech_metrics
+from src.word_encoding import encode_words_df, encode_words_df_json, decode_words_df
+
+
+def analysis_frame(n_words):
+    words = extract_word_level(make_transcripts_df(n_words, disfluency_density=0.3))
+    _, analysis = compute_speech_metrics(words)
+    return analysis.reset_index(drop=True)
+
+
+class TestWordEncoding(unittest.TestCase):
+    def test_round_trip_is_exact(self):
+        analysis = analysis_frame(500)
+        decoded = decode_words_df(encode_words_df_json(analysis))
+        pd.testing.assert_frame_equal(decoded, analysis)
+
+    def test_round_trip_from_dict_and_empty(self):
+        analysis = analysis_frame(3)
+        pd.testing.assert_frame_equal(decode_words_df(encode_words_df(analysis)), analysis)
+        self.assertTrue(decode_words_df(encode_words_df(analysis.iloc[:0])).empty)
+
+    def test_much_smaller_than_records(self):
+        analysis = analysis_frame(1000)
+        compact = encode_words_df_json(analysis)
+        records = analysis.to_json(orient="records")
+        self.assertLess(len(compact) * 5, len(records))
+
+    def test_legacy_records_still_decode(self):
+        analysis = analysis_frame(20)
+        legacy = analysis.to_json(orient="records")
+
+        decoded = decode_words_df(legacy)
+        self.assertEqual(decoded["word"].tolist(), analysis["word"].tolist())
+        self.assertEqual(decoded["is_filler"].tolist(), analysis["is_filler"].tolist())
+
+        decoded_list = decode_words_df(json.loads(legacy))
+        self.assertEqual(len(decoded_list), len(analysis))
+
+    def test_missing_value(self):
+        self.assertTrue(decode_words_df(None).empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
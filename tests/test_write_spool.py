@@ -0,0 +1,112 @@
+"""
+Unit tests for the durable write-behind spool.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from google.api_core.exceptions import BadRequest, Conflict, NotFound, ServiceUnavailable
+
+from src.write_spool import WriteSpool, LOAD
+
+
+class TestWriteSpool(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "spool.sqlite")
+        self.spool = WriteSpool(self.path, batch_rows=2, max_age=5)
+
+    def test_rows_survive_restart(self):
+        self.spool.enqueue("p.d.t", [{"run_id": "a"}], ["a"])
+        reopened = WriteSpool(self.path)
+        self.assertEqual(reopened.pending_rows("p.d.t"), [{"run_id": "a"}])
+
+    def test_stream_flush_batches_with_row_ids(self):
+        client = mock.Mock()
+        client.insert_rows_json.return_value = []
+        self.spool.enqueue("p.d.t", [{"run_id": r} for r in "abc"], list("abc"))
+
+        self.assertEqual(self.spool.flush(client), 3)
+        self.assertEqual(
+            [c.kwargs["row_ids"] for c in client.insert_rows_json.call_args_list],
+            [["a", "b"], ["c"]]
+        )
+        self.assertEqual(self.spool.pending_count(), 0)
+
+    def test_outage_backs_off_then_retries(self):
+        client = mock.Mock()
+        client.insert_rows_json.side_effect = ServiceUnavailable("down")
+        self.spool.enqueue("p.d.t", [{"run_id": "a"}], ["a"])
+
+        self.assertEqual(self.spool.flush(client, now=1000), 0)
+        self.assertEqual(self.spool.flush(client, now=1001), 0)
+        self.assertEqual(client.insert_rows_json.call_count, 1)  # still backing off
+
+        client.insert_rows_json.side_effect = None
+        client.insert_rows_json.return_value = []
+        self.assertEqual(self.spool.flush(client, now=1003), 1)
+
+    def test_invalid_rows_are_parked(self):
+        client = mock.Mock()
+        client.insert_rows_json.return_value = [
+            {"index": 0, "errors": [{"reason": "invalid", "message": "bad"}]},
+            {"index": 1, "errors": [{"reason": "stopped"}]},
+        ]
+        self.spool.enqueue("p.d.t", [{"x": 1}, {"x": 2}], ["a", "b"])
+
+        self.assertEqual(self.spool.flush(client, now=0), 0)
+        self.assertEqual(self.spool.stats()["dead"], 1)
+        self.assertEqual(self.spool.pending_rows("p.d.t"), [{"x": 2}])
+
+    def test_replayed_load_batch_is_not_duplicated(self):
+        client = mock.Mock()
+        client.get_table.side_effect = NotFound("missing")
+        client.load_table_from_json.return_value.result.side_effect = Conflict("exists")
+        client.get_job.return_value = mock.Mock(state="DONE", error_result=None)
+        self.spool.enqueue("p.d.t", [{"uri": "a"}], ["a"], mode=LOAD)
+
+        self.assertEqual(self.spool.flush(client), 1)
+        job_id = client.load_table_from_json.call_args.kwargs["job_id"]
+        self.assertTrue(job_id.startswith("spool_"))
+        self.assertEqual(client.load_table_from_json.call_count, 1)
+
+    def test_failed_load_job_is_retried_under_new_id(self):
+        jobs = {}
+
+        def load(rows, table_id, job_config=None, job_id=None):
+            if job_id in jobs:
+                raise Conflict("exists")
+            failed = not jobs  # the first job fails on the server
+            jobs[job_id] = mock.Mock(state="DONE", error_result={"message": "backend"} if failed else None)
+            return mock.Mock(result=mock.Mock(side_effect=BadRequest("backend") if failed else None))
+
+        client = mock.Mock()
+        client.get_table.side_effect = NotFound("missing")
+        client.load_table_from_json.side_effect = load
+        client.get_job.side_effect = lambda job_id: jobs[job_id]
+        self.spool.enqueue("p.d.t", [{"uri": "a"}], ["a"], mode=LOAD)
+
+        self.assertEqual(self.spool.flush(client, now=0), 0)
+        self.assertEqual(self.spool.pending_count(), 1)  # not dropped
+
+        self.assertEqual(self.spool.flush(client, now=100), 1)
+        first, second = [c.kwargs["job_id"] for c in client.load_table_from_json.call_args_list][1:]
+        self.assertEqual(second, f"{first}_1")
+        self.assertEqual(self.spool.pending_count(), 0)
+
+    def test_running_load_job_is_waited_for(self):
+        client = mock.Mock()
+        client.get_table.side_effect = NotFound("missing")
+        client.load_table_from_json.return_value.result.side_effect = Conflict("exists")
+        client.get_job.return_value.state = "RUNNING"
+        client.get_job.return_value.result.side_effect = BadRequest("failed while running")
+        self.spool.enqueue("p.d.t", [{"uri": "a"}], ["a"], mode=LOAD)
+
+        self.assertEqual(self.spool.flush(client, now=0), 0)
+        self.assertEqual(self.spool.pending_count(), 1)
+
+if __name__ == '__main__':
+    unittest.main()